@@ -1,62 +1,13 @@
 import pandas as pd
-import json
 import os
-import re
-import ast
 
-def get_keyword_bank():
-    json_path = os.path.join(os.path.dirname(__file__), 'uat.json')
-    if not os.path.exists(json_path):
-        print(f"Error: {json_path} not found.")
-        return []
+import uat_keywords
+from uat_keywords import UAT_JSON, uat_matcher, uat_ranker
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    keywords = set()
-    # Keys for labels in UAT (SKOS/RDF)
-    label_keys = [
-        "http://www.w3.org/2004/02/skos/core#prefLabel",
-        "http://www.w3.org/2004/02/skos/core#altLabel",
-        "http://www.w3.org/2000/01/rdf-schema#label"
-    ]
-
-    for concept_uri, properties in data.items():
-        for key in label_keys:
-            if key in properties:
-                for item in properties[key]:
-                    # User requirement: filter "value" field where "type" : "literal"
-                    if isinstance(item, dict) and item.get("type") == "literal":
-                        val = item.get("value")
-                        if val:
-                            keywords.add(val)
-    
-    return list(keywords)
-
-def recommend_keywords(title, abstract, bank):
-    # Combine title and abstract
-    text = f"{str(title)} {str(abstract)}".lower()
-    
-    # Extract unique tokens from text (bag of words)
-    # Using regex to match alphanumeric words, effectively ignoring punctuation
-    text_tokens = set(re.findall(r'\b\w+\b', text))
-    
-    matches = []
-    # Check each keyword
-    for kw in bank:
-        # Tokenize the keyword phrase
-        kw_tokens = re.findall(r'\b\w+\b', kw.lower())
-        
-        if not kw_tokens:
-            continue
-            
-        # Optimization: Fast check with sets
-        # If all tokens in the keyword phrase appear in the text tokens (regardless of order)
-        if set(kw_tokens).issubset(text_tokens):
-            matches.append(kw)
-            
-    # Return all unique matches
-    return sorted(list(set(matches)))[:3]
+# 'ranked': BM25-scored UAT concepts, most specific first (needs scipy)
+# 'alphabetical': the first three matching labels in alphabetical order (previous behaviour)
+KEYWORD_MODE = 'ranked'
+TOP_K = 3
 
 def main():
     csv_path = '2025_Data_missing.csv'
@@ -67,24 +18,27 @@ def main():
     print("Loading data...")
     df = pd.read_csv(csv_path)
     
-    print("Loading keyword bank from uat.json...")
-    bank = get_keyword_bank()
-    print(f"Loaded {len(bank)} unique keywords from UAT.")
-
-    print("Generating smart keywords for all papers...")
-    # Apply recommendation logic
-    # depending on dataset size, this might take a moment
-    smart_keywords_column = []
-    
-    total_rows = len(df)
-    for index, row in df.iterrows():
-        if index % 100 == 0:
-            print(f"Processing row {index}/{total_rows}...")
-            
-        recs = recommend_keywords(row['title'], row['abstract'], bank)
-        smart_keywords_column.append(str(recs)) # Store as string representation of list to match csv format
+    if not os.path.exists(UAT_JSON):
+        print(f"Error: {UAT_JSON} not found.")
+        return
 
-    df['smart_keywords'] = smart_keywords_column
+    print("Loading keyword bank from uat.json...")
+    matcher = uat_matcher()
+    print(f"Loaded {len(matcher.labels)} unique keywords from UAT.")
+
+    mode = KEYWORD_MODE
+    if mode == 'ranked' and uat_keywords.sparse is None:
+        print("scipy is not installed, falling back to alphabetical keywords.")
+        mode = 'alphabetical'
+
+    print(f"Generating smart keywords for all papers ({mode})...")
+    if mode == 'ranked':
+        # Whole dataset scored at once; the dataset itself is the BM25 corpus
+        recs = uat_ranker().rank_many(df['title'], df['abstract'], k=TOP_K)
+    else:
+        # Compiled label index: only labels whose rarest token is in the paper are checked
+        recs = matcher.match_many(df['title'], df['abstract'], limit=TOP_K)
+    df['smart_keywords'] = [str(r) for r in recs] # Store as string representation of list to match csv format
     
     print("Saving updated CSV...")
     df.to_csv(csv_path, index=False)
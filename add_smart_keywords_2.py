@@ -1,40 +1,9 @@
 import pandas as pd
 import os
-import re
 
-def get_keyword_bank():
-    dat_path = os.path.join(os.path.dirname(__file__), 'top_500_keywords.dat')
-    if not os.path.exists(dat_path):
-        print(f"Error: {dat_path} not found.")
-        return []
+from uat_keywords import keyword_list_matcher
 
-    keywords = set()
-    with open(dat_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            # Assuming one keyword per line. Strip whitespace.
-            kw = line.strip()
-            if kw:
-                keywords.add(kw)
-    
-    return list(keywords)
-
-def recommend_keywords(title, abstract, bank):
-    # Combine title and abstract
-    text = f"{str(title)} {str(abstract)}".lower()
-    
-    matches = []
-    # Check each keyword
-    for kw in bank:
-        kw_lower = kw.lower()
-        
-        # Search for the exact phrase in the text
-        # We use regex word boundaries (\b) to ensure we don't match partial words
-        # e.g., ensuring "star" doesn't match inside "starting"
-        if re.search(r'\b' + re.escape(kw_lower) + r'\b', text):
-            matches.append(kw)
-            
-    # Return all unique matches
-    return sorted(list(set(matches)))[:3]
+KEYWORDS_DAT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'top_500_keywords.dat')
 
 def main():
     csv_path = '/Users/ainsleylewis/Documents/Astronomy/arXiver/2025_Data_missing.csv'
@@ -45,26 +14,23 @@ def main():
     print("Loading data...")
     df = pd.read_csv(csv_path)
     
+    if not os.path.exists(KEYWORDS_DAT):
+        print(f"Error: {KEYWORDS_DAT} not found.")
+        return
+
     print("Loading keyword bank from top_500_keywords.dat...")
-    bank = get_keyword_bank()
-    print(f"Loaded {len(bank)} unique keywords.")
+    matcher = keyword_list_matcher(KEYWORDS_DAT)
+    print(f"Loaded {len(matcher.labels)} unique keywords.")
 
     print("Generating smart keywords for all papers...")
-    # Apply recommendation logic
-    # depending on dataset size, this might take a moment
-    smart_keywords_column = []
-    
-    total_rows = len(df)
-    for index, row in df.iterrows():
-        if index % 100 == 0:
-            print(f"Processing row {index}/{total_rows}...")
-
-        # Already has keywords
-        if pd.notna(row.get('keywords', None)) and str(row['keywords']).strip():
-            smart_keywords_column.append(str(row['keywords']))
-            continue
-        recs = recommend_keywords(row['title'], row['abstract'], bank)
-        smart_keywords_column.append(str(recs)) # Store as string representation of list to match csv format
+    # Exact whole-word phrases; the label index narrows the phrases checked per paper.
+    # Papers that already have keywords keep them.
+    keywords = df['keywords'] if 'keywords' in df else pd.Series(None, index=df.index, dtype=object)
+    has_keywords = keywords.notna() & (keywords.astype(str).str.strip() != '')
+    smart_keywords_column = [
+        str(existing) if has else str(matcher.recommend(title, abstract, limit=3, phrase=True))
+        for title, abstract, existing, has in zip(df['title'], df['abstract'], keywords, has_keywords)
+    ] # Store as string representation of list to match csv format
 
     df['smart_keywords_2'] = smart_keywords_column
     
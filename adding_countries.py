@@ -1,70 +1,49 @@
-import pandas as pd
-import requests
-import tarfile
+"""
+Tags every paper with the countries named in its LaTeX source (latex_countries column).
+
+Sources are read from the local e-print store written by download_arxiv.py
+(SOURCE_DIR/<arxiv_id>.tar.gz, which may also be a single gzipped .tex); papers missing from
+it are downloaded there first, one at a time and rate-limited. Tagging then runs across a
+process pool: each worker streams the .tex members straight out of the archive, nothing is
+extracted to disk, and stops decompressing as soon as BUFFER_LINES lines pass without a new
+country (the affiliation block is over).
+
+    python adding_countries.py                    # INPUT_FILE -> OUTPUT_FILE, whole dataset
+    python adding_countries.py --workers 1 --limit 100
+"""
+
+import argparse
+import gzip
 import os
-import shutil
 import re
+import tarfile
 import time
-import threading
-import queue
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import requests
 from tqdm import tqdm
 
+from countries import country_matcher
+
 # ==========================================
 # CONFIGURATION
 # ==========================================
 
 INPUT_FILE = '2025_Data.csv'
-COORDS_FILE = 'world_coords.csv'
 OUTPUT_FILE = '2025_Data_processed_1.csv'
-TEMP_DIR = 'temp_arxiv_source'
-SAVE_INTERVAL = 10
-ARXIV_RATE_LIMIT = 3  # Seconds (strict)
-BUFFER_LINES = 30     # Stop reading if no new countries found for this many lines
+SOURCE_DIR = os.path.join("/Volumes", "T7 Shield", "arXiv 2025")  # download_arxiv.py output
+DOWNLOAD_MISSING = True  # Fetch sources missing from SOURCE_DIR before tagging
+ARXIV_RATE_LIMIT = 3     # Seconds (strict)
+BUFFER_LINES = 30        # Stop reading if no new countries found for this many lines
 
-# Thread-safe Queue
-work_queue = queue.Queue()
+# Parallel tagging (set TAG_WORKERS = 1 to run serially in this process)
+TAG_WORKERS = os.cpu_count() or 1
+TAG_CHUNK_SIZE = 32      # Sources sent to a worker at a time
+SAVE_INTERVAL = 10       # Chunks between saves
 
-# ==========================================
-# DATA LOADING & REGEX PREP
-# ==========================================
-
-replacement_dict = {
-    'USA': 'United States',
-    'UK': 'United Kingdom',
-    'UAE': 'United Arab Emirates',
-    'United States of America': 'United States',
-    "People's Republic of China": 'China',
-    'The Netherlands': 'Netherlands',
-    'Republic of Korea': 'South Korea',
-    'The United Kingdom': 'United Kingdom'
-}
-
-if not os.path.exists(TEMP_DIR):
-    os.makedirs(TEMP_DIR)
-
-print("Loading datasets...")
-try:
-    df = pd.read_csv(INPUT_FILE)
-    # Only first 10000 rows
-    df = df.head(10000)
-
-    world_df = pd.read_csv(COORDS_FILE)
-except FileNotFoundError as e:
-    print(f"Error: {e}")
-    exit()
-
-if 'latex_countries' not in df.columns:
-    df['latex_countries'] = None
-
-# Build Regex
-base_countries = set(world_df['country'].dropna().unique())
-search_map = {country: country for country in base_countries}
-search_map.update(replacement_dict)
-
-# Sort by length (descending) to match "United States" before "United"
-search_terms = sorted(search_map.keys(), key=len, reverse=True)
-pattern_str = r'\b(' + '|'.join(map(re.escape, search_terms)) + r')\b'
-country_regex = re.compile(pattern_str, re.IGNORECASE) 
+# Country names and aliases (countries.py), resolved to canonical names in the same scan
+countries = country_matcher()
 
 # ==========================================
 # HELPER FUNCTIONS
@@ -74,197 +53,158 @@ def get_arxiv_id(url):
     match = re.search(r'(\d+\.\d+)', str(url))
     return match.group(1) if match else None
 
-def get_all_latex_lines(directory):
+def find_source(arxiv_id, source_dir=SOURCE_DIR):
+    """Path of the stored e-print of arxiv_id (<id>.tar.gz, or <id>.pdf for PDF-only submissions), or None."""
+    for ext in (".tar.gz", ".pdf"):
+        path = os.path.join(source_dir, f"{arxiv_id}{ext}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+def download_source(arxiv_id, source_dir=SOURCE_DIR):
+    """Saves the e-print of arxiv_id into source_dir the way download_arxiv.py does; returns its path or None."""
+    headers = {'User-Agent': 'Mozilla/5.0 (DataProcessingScript/1.0)'}
+    try:
+        response = requests.get(f"https://arxiv.org/e-print/{arxiv_id}", headers=headers, timeout=30)
+    except Exception:
+        return None
+    if response.status_code != 200:
+        return None
+    ext = ".pdf" if "application/pdf" in response.headers.get('content-type', '') else ".tar.gz"
+    path = os.path.join(source_dir, f"{arxiv_id}{ext}")
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    return path
+
+def iter_latex_lines(path):
     """
-    Reads all .tex files and returns a single list of strings (lines).
+    Lines of every .tex file of an e-print, read lazily from the archive itself: a tarball is
+    streamed member by member, a single gzipped file is read only if it is LaTeX.
     """
-    all_lines = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.tex'):
-                path = os.path.join(root, file)
-                try:
-                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
-                        all_lines.extend(f.readlines())
-                except:
-                    continue
-    return all_lines
+    started = False
+    try:
+        with tarfile.open(path, 'r|*') as tar:
+            for member in tar:
+                started = True
+                if member.isfile() and member.name.endswith('.tex'):
+                    for raw in tar.extractfile(member):
+                        yield raw.decode('utf-8', errors='replace')
+            return
+    except tarfile.ReadError:
+        if started:
+            raise  # Truncated tarball, not a single gzipped file
+
+    with gzip.open(path, 'rb') as f:
+        head = f.read(1 << 16)
+        if b'\\documentclass' not in head and b'\\begin' not in head:
+            return
+        rest = f.read()
+    yield from (head + rest).decode('utf-8', errors='replace').splitlines(keepends=True)
 
 def process_lines_with_buffer(lines):
     """
-    Scans lines for countries. 
+    Scans lines for countries.
     Stops if 30 lines pass after a match without finding a new match.
     STORES DUPLICATES (e.g. Germany, Germany).
     """
     found_matches = []  # CHANGED: List instead of Set to allow duplicates
     lines_since_last_match = 0
     has_found_any = False
-    
+
     for line in lines:
-        # Quick regex search on single line
-        matches = country_regex.findall(line)
-        
+        # One scan of the line, matches already resolved to standard names
+        matches = countries.find_all(line)
+
         if matches:
             # Match found in this line
             has_found_any = True
             lines_since_last_match = 0 # Reset buffer
-            
-            for match in matches:
-                # Resolve to standard name
-                for key in search_map:
-                    if key.lower() == match.lower():
-                        # CHANGED: Append directly to keep duplicates
-                        found_matches.append(search_map[key])
-                        break
+
+            # CHANGED: Append directly to keep duplicates
+            found_matches.extend(matches)
         else:
             # No match in this line
             if has_found_any:
                 lines_since_last_match += 1
-                
+
                 # CHECK BUFFER LIMIT
                 if lines_since_last_match >= BUFFER_LINES:
                     # We assume the affiliation section is over
                     break
-                    
+
     # CHANGED: Return the list directly (preserves order of appearance)
     return found_matches
 
 # ==========================================
-# THREAD 1: DOWNLOADER (PRODUCER)
-# ==========================================
-
-def downloader_thread(df_to_process, pbar):
-    headers = {'User-Agent': 'Mozilla/5.0 (DataProcessingScript/1.0)'}
-
-    for index, row in df_to_process.iterrows():
-        # Skip if already done
-        if pd.notna(row['latex_countries']) and row['latex_countries'] != "":
-            pbar.update(1)
-            continue
-
-        pdf_link = row['pdf_link']
-        arxiv_id = get_arxiv_id(pdf_link)
-        
-        if not arxiv_id:
-            pbar.update(1)
-            continue
-
-        pbar.set_description(f"Downloading {arxiv_id}")
-        
-        paper_dir = os.path.join(TEMP_DIR, arxiv_id)
-        if not os.path.exists(paper_dir):
-            os.makedirs(paper_dir)
-
-        url = f"https://arxiv.org/e-print/{arxiv_id}"
-        download_success = False
-
-        try:
-            response = requests.get(url, headers=headers, stream=True, timeout=30)
-            if response.status_code == 200:
-                temp_filepath = os.path.join(paper_dir, 'source_file')
-                with open(temp_filepath, 'wb') as f:
-                    f.write(response.content)
-                download_success = True
-        except Exception:
-            pass
-
-        if download_success:
-            work_queue.put((index, arxiv_id, paper_dir))
-        else:
-            try: shutil.rmtree(paper_dir) 
-            except: pass
-            pbar.update(1)
-
-        # Strict Sleep for ArXiv Rate Limit
-        time.sleep(ARXIV_RATE_LIMIT)
-
-    work_queue.put(None) # Sentinel
-
-# ==========================================
-# THREAD 2: PROCESSOR (CONSUMER)
+# PARALLEL TAGGING
 # ==========================================
 
-def processor_thread(pbar):
-    processed_count = 0
-    
-    while True:
-        item = work_queue.get()
-        if item is None: break
-            
-        index, arxiv_id, paper_dir = item
-        source_file = os.path.join(paper_dir, 'source_file')
-        
-        pbar.set_description(f"Processing {arxiv_id}")
-
-        # 1. Extract
-        extraction_success = False
+def _tag_chunk(chunk):
+    """Worker: (position, countries, error) for a list of (position, source path) items."""
+    rows = []
+    for pos, path in chunk:
         try:
-            if tarfile.is_tarfile(source_file):
-                with tarfile.open(source_file) as tar:
-                    tar.extractall(path=paper_dir)
-                extraction_success = True
-            else:
-                # Try Gzip
-                import gzip
-                with gzip.open(source_file, 'rb') as f_in:
-                    content = f_in.read()
-                    if b'\\documentclass' in content or b'\\begin' in content:
-                        with open(os.path.join(paper_dir, 'main.tex'), 'wb') as f_out:
-                            f_out.write(content)
-                        extraction_success = True
-        except:
-            pass
-
-        # 2. Analyze (With Buffer Logic)
-        countries_found = []
-        if extraction_success:
-            # Get all lines as a list
-            all_lines = get_all_latex_lines(paper_dir)
-            
-            # Run the smart buffer search
-            countries_found = process_lines_with_buffer(all_lines)
-            
-            if countries_found:
-                # Only print first few to keep log clean, but process all
-                display_str = ', '.join(countries_found[:5])
-                if len(countries_found) > 5: display_str += "..."
-                tqdm.write(f"   [{arxiv_id}] Found: {display_str}")
-
-        # 3. Update & Save
-        df.at[index, 'latex_countries'] = ", ".join(countries_found)
-        
-        processed_count += 1
-        if processed_count % SAVE_INTERVAL == 0:
-            df.to_csv(OUTPUT_FILE, index=False)
-
-        # 4. Cleanup
-        try: shutil.rmtree(paper_dir)
-        except: pass
-        
-        pbar.update(1)
-        work_queue.task_done()
+            rows.append((pos, process_lines_with_buffer(iter_latex_lines(path)), None))
+        except Exception as e:
+            rows.append((pos, [], str(e) or type(e).__name__))
+    return rows
+
+def tag_sources(paths, workers=TAG_WORKERS, chunk_size=TAG_CHUNK_SIZE):
+    """Yields the _tag_chunk rows of every chunk of paths, in order, across a process pool."""
+    items = list(enumerate(paths))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if workers <= 1:
+        for chunk in tqdm(chunks, desc="Tagging sources"):
+            yield _tag_chunk(chunk)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            yield from tqdm(executor.map(_tag_chunk, chunks), total=len(chunks), desc="Tagging sources")
 
 # ==========================================
 # MAIN EXECUTION
 # ==========================================
 
-print("Starting Optimized Processing (Buffer Stop Mode - Allowing Duplicates)...")
-
-total_papers = df.shape[0]
-pbar = tqdm(total=total_papers, unit="paper")
-
-t_consumer = threading.Thread(target=processor_thread, args=(pbar,))
-t_consumer.start()
-
-t_producer = threading.Thread(target=downloader_thread, args=(df, pbar,))
-t_producer.start()
-
-t_producer.join()
-t_consumer.join()
-
-pbar.close()
-
-df.to_csv(OUTPUT_FILE, index=False)
-try: shutil.rmtree(TEMP_DIR)
-except: pass
-print("Done.")
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description="Tag papers with the countries named in their LaTeX sources")
+    parser.add_argument('--input', default=INPUT_FILE)
+    parser.add_argument('--output', default=OUTPUT_FILE)
+    parser.add_argument('--source-dir', default=SOURCE_DIR)
+    parser.add_argument('--workers', type=int, default=TAG_WORKERS)
+    parser.add_argument('--limit', type=int, help="only tag the first LIMIT rows")
+    parser.add_argument('--no-download', action='store_true', help="skip papers missing from --source-dir")
+    args = parser.parse_args()
+
+    print("Loading datasets...")
+    df = pd.read_csv(args.input)
+    if 'latex_countries' not in df.columns:
+        df['latex_countries'] = None
+    df['latex_countries'] = df['latex_countries'].astype(object)
+
+    rows = df.head(args.limit) if args.limit else df
+    todo = rows.index[rows['latex_countries'].isna() | (rows['latex_countries'] == "")]
+    ids = df.loc[todo, 'pdf_link'].map(get_arxiv_id).dropna()
+    sources = ids.map(lambda arxiv_id: find_source(arxiv_id, args.source_dir))
+
+    missing = sources.index[sources.isna()]
+    if len(missing) and DOWNLOAD_MISSING and not args.no_download:
+        os.makedirs(args.source_dir, exist_ok=True)
+        for index in tqdm(missing, desc="Downloading sources"):
+            sources[index] = download_source(ids[index], args.source_dir)
+            time.sleep(ARXIV_RATE_LIMIT)
+    sources = sources[sources.map(lambda path: isinstance(path, str) and path.endswith(".tar.gz"))]
+    print(f"Tagging {len(sources)} of {len(todo)} untagged papers with {args.workers} worker(s)...")
+
+    failed = 0
+    for n, chunk_rows in enumerate(tag_sources(list(sources), args.workers), 1):
+        for pos, countries_found, error in chunk_rows:
+            df.at[sources.index[pos], 'latex_countries'] = ", ".join(countries_found)
+            failed += error is not None
+        if n % SAVE_INTERVAL == 0:
+            df.to_csv(args.output, index=False)
+
+    df.to_csv(args.output, index=False)
+    print(f"Done. {len(sources) - failed} tagged, {failed} unreadable -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Rule-first, LLM-fallback affiliation router.
+
+Runs the deterministic parse_latex_section chain (finding_author_rem_11) over the
+latex_filtered files first and fills every missing affiliation slot it can, with the engine's
+own filling (fill_affiliations: word-overlap title match, then collaboration and shared
+affiliation passes), so the router resolves exactly what finding_author_rem_11 does. Each paper is
+then scored by completeness: the share of its metadata `authors` that ended up with an
+affiliation. Only papers below ROUTER_MIN_COMPLETENESS (no LaTeX, parser found nothing,
+quarantined, or some authors still None) are written to the LLM queue, so the LLM scripts
+only see the hard residue.
+
+Outputs:
+- OUTPUT_CSV_PATH: the dataset with rule-based affiliations filled in
+- LLM_QUEUE_CSV:   original_index, arxiv_id, title, reason, completeness for the residue
+                   (read by gemini_api_t2 / kimi.py / affils_from_latex_test.py via LLM_QUEUE_CSV)
+- METRICS_PATH:    router hit rates and timings as JSON
+
+Usage:
+    python affiliation_router.py
+"""
+
+import ast
+import json
+import re
+import time
+from collections import Counter
+
+import pandas as pd
+
+import finding_author_rem_11 as parsers
+
+# ========================
+# CONFIG
+# ========================
+
+CSV_PATH = "2025_Data.csv"  # Same dataset (and index) the LLM scripts read
+OUTPUT_CSV_PATH = "2025_Data_routed.csv"
+LATEX_FILES = parsers.LATEX_FILES
+LLM_QUEUE_CSV = "llm_queue.csv"
+METRICS_PATH = "router_metrics.json"
+
+ROUTER_MIN_COMPLETENESS = 1.0  # Papers below this share of filled authors go to the LLM
+
+
+# ========================
+# HELPERS
+# ========================
+
+def get_arxiv_id(pdf_link):
+    if not isinstance(pdf_link, str): return None
+    match = re.search(r'arxiv.org/(?:pdf|abs)/([\d\.]+)', pdf_link)
+    return match.group(1) if match else None
+
+
+def parse_list(value):
+    try:
+        parsed = ast.literal_eval(str(value))
+        return parsed if isinstance(parsed, list) else None
+    except Exception:
+        return None
+
+
+def filtered_titles(files):
+    """Normalized titles of every paper block present in the latex_filtered files."""
+    titles = set()
+    for filepath in files:
+        content = parsers.read_filtered_file(filepath)
+        if content is None: continue
+        for title, _ in parsers.iter_paper_sections(content):
+            titles.add(parsers.normalize_name(title))
+    return titles
+
+
+# ========================
+# ROUTER
+# ========================
+
+def route(df, paper_affiliations, quarantined_titles, titles_with_latex):
+    """
+    Fills df['affiliations'] in place from the rule parser and returns (queue_rows, counts).
+    counts keys: already_filled, rule_resolved, and one per LLM reason.
+    """
+    preprocessed = parsers.preprocess_affiliations(paper_affiliations)
+    queue_rows, counts = [], Counter()
+
+    for idx, row in df.iterrows():
+        authors = parse_list(row.get('authors'))
+        if not authors:
+            counts['no_metadata_authors'] += 1
+            continue
+        affiliations = parse_list(row.get('affiliations')) or []
+        affiliations = (affiliations + [None] * len(authors))[:len(authors)]
+
+        if None not in affiliations:
+            counts['already_filled'] += 1
+            continue
+
+        candidates = parsers.matching_papers(row['title'], preprocessed)
+        if parsers.fill_affiliations(authors, affiliations, row['title'], preprocessed, candidates):
+            df.at[idx, 'affiliations'] = str(affiliations)
+
+        completeness = sum(a is not None for a in affiliations) / len(authors)
+        if completeness >= ROUTER_MIN_COMPLETENESS:
+            counts['rule_resolved'] += 1
+            continue
+
+        key = parsers.normalize_name(row['title'])
+        if key in quarantined_titles:
+            reason = 'quarantined'
+        elif not candidates and key not in titles_with_latex:
+            reason = 'no_latex'
+        elif not candidates:
+            reason = 'parser_empty'
+        else:
+            reason = 'incomplete'
+        counts[reason] += 1
+        queue_rows.append({
+            'original_index': idx,
+            'arxiv_id': get_arxiv_id(row.get('pdf_link')),
+            'title': row['title'],
+            'reason': reason,
+            'completeness': round(completeness, 3),
+        })
+    return queue_rows, counts
+
+
+def build_metrics(counts, total_papers, parse_seconds, route_seconds):
+    routed = sum(v for k, v in counts.items() if k not in ('already_filled', 'no_metadata_authors'))
+    llm = routed - counts['rule_resolved']
+    return {
+        'total_papers': total_papers,
+        'needing_affiliations': routed,
+        'rule_resolved': counts['rule_resolved'],
+        'sent_to_llm': llm,
+        'rule_hit_rate': counts['rule_resolved'] / routed if routed else 0.0,
+        'llm_rate': llm / routed if routed else 0.0,
+        'counts': dict(counts),
+        'parse_seconds': round(parse_seconds, 2),
+        'route_seconds': round(route_seconds, 2),
+    }
+
+
+def main():
+    print("=" * 60)
+    print("Affiliation Router - rule parser first, LLM for the residue")
+    print("=" * 60)
+
+    df = pd.read_csv(CSV_PATH)
+
+    start = time.perf_counter()
+    print(f"Parsing {', '.join(LATEX_FILES)} with {parsers.PARSE_WORKERS} worker(s)...")
+    paper_affiliations, quarantined = parsers.parse_filtered_files_parallel(LATEX_FILES)
+    titles_with_latex = filtered_titles(LATEX_FILES)
+    parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    quarantined_titles = {parsers.normalize_name(t) for t, _ in quarantined}
+    queue_rows, counts = route(df, paper_affiliations, quarantined_titles, titles_with_latex)
+    route_seconds = time.perf_counter() - start
+
+    df.to_csv(OUTPUT_CSV_PATH, index=False)
+    pd.DataFrame(queue_rows, columns=['original_index', 'arxiv_id', 'title', 'reason', 'completeness']).to_csv(LLM_QUEUE_CSV, index=False)
+
+    metrics = build_metrics(counts, len(df), parse_seconds, route_seconds)
+    with open(METRICS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+
+    print(f"Papers needing affiliations: {metrics['needing_affiliations']}")
+    print(f"  resolved by rules: {metrics['rule_resolved']} ({metrics['rule_hit_rate']:.1%})")
+    print(f"  queued for LLM:    {metrics['sent_to_llm']} ({metrics['llm_rate']:.1%})")
+    for reason in ('no_latex', 'parser_empty', 'quarantined', 'incomplete'):
+        print(f"    {reason:<13} {counts[reason]}")
+    print(f"Filled dataset: {OUTPUT_CSV_PATH}, LLM queue: {LLM_QUEUE_CSV}, metrics: {METRICS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 import re
 
+from month_reconcile import MONTHS, load_manifest
+
 # Load data
 data = pd.read_csv("FINAL_ARXIV_2025.csv")
 
@@ -9,9 +11,10 @@ def extract_id(url):
     match = re.search(r'(\d{4}\.\d{4,5})', str(url))
     return match.group(1) if match else ""
 
-# The target counts
-check = [1344, 1287, 1585, 1467, 1386, 1478, 1816, 1304, 1860, 1889, 1551, 1694]
-months = [f"2025-{i:02d}" for i in range(1, 13)]
+# The target counts, from the stored month manifests (month_reconcile.py --fetch-all)
+manifest_counts = load_manifest()['month'].value_counts()
+months = MONTHS
+check = [int(manifest_counts.get(m, 0)) for m in months]
 
 print("Comparing CSV counts to ArXiv Target:")
 counts = data['date'].str[:7].value_counts().sort_index()
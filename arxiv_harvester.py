@@ -0,0 +1,331 @@
+"""
+Incremental astro-ph harvester over arXiv's OAI-PMH interface.
+
+Instead of scraping /catchup/ pages day by day and rewriting arxiv_papers.csv each time
+(missing_days.py), this pulls metadata in bulk with ListRecords, following resumption tokens,
+over date windows that start at a persisted high-water mark. A daily refresh is one window and
+usually one or two requests.
+
+State and storage:
+- STATE_PATH:  {"high_water_mark": "YYYY-MM-DD", "resumption_token": ..., "window": [from, until]}
+               The mark only moves once a window has been fully read; an interrupted window
+               resumes from its saved token (or restarts if the token expired).
+- STORE_PATH:  append-only JSONL, one record per line, keyed by arxiv_id. A record is appended
+               only when it is new or its content changed (replacements, new journal-refs);
+               the last line for an id wins when the store is loaded.
+- EXPORT_CSV:  optional export of the store in the arxiv_papers.csv column layout.
+
+Usage:
+    python arxiv_harvester.py                       # from the high-water mark to today
+    python arxiv_harvester.py --from 2025-01-01     # (re)harvest from a given date
+    python arxiv_harvester.py --export              # also write EXPORT_CSV
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+import certifi
+
+from arxiv_listing import comment_fields
+
+os.environ['SSL_CERT_FILE'] = certifi.where()
+
+# ========================
+# CONFIG
+# ========================
+
+OAI_ENDPOINT = "https://oaipmh.arxiv.org/oai"
+OAI_SET = "physics:astro-ph"
+METADATA_PREFIX = "arXiv"
+
+STATE_PATH = "datasets/harvest_state.json"
+STORE_PATH = "datasets/arxiv_oai_records.jsonl"
+EXPORT_CSV = "datasets/arxiv_papers_oai.csv"
+
+DEFAULT_START = "2025-01-01"  # First window when there is no high-water mark yet
+WINDOW_DAYS = 7               # Bootstrap/backfill windows; the mark is saved after each one
+MAX_RETRIES = 5
+DEFAULT_RETRY_AFTER = 10      # Seconds, when a 503 carries no Retry-After header
+
+NS = {
+    'oai': 'http://www.openarchives.org/OAI/2.0/',
+    'arXiv': 'http://arxiv.org/OAI/arXiv/',
+}
+
+ASTRO_PH_NAMES = {
+    'astro-ph': 'Astrophysics',
+    'astro-ph.CO': 'Cosmology and Nongalactic Astrophysics',
+    'astro-ph.EP': 'Earth and Planetary Astrophysics',
+    'astro-ph.GA': 'Astrophysics of Galaxies',
+    'astro-ph.HE': 'High Energy Astrophysical Phenomena',
+    'astro-ph.IM': 'Instrumentation and Methods for Astrophysics',
+    'astro-ph.SR': 'Solar and Stellar Astrophysics',
+}
+
+CSV_COLUMNS = ['title', 'abstract', 'authors', 'figures', 'pages', 'tables', 'pdf_link',
+               'primary_subject', 'secondary_subjects', 'submitted_journal', 'published_journal', 'date']
+
+
+# ========================
+# STATE
+# ========================
+
+def load_state(path=STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, path=STATE_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def harvest_windows(start, end, days=WINDOW_DAYS):
+    """[(from, until)] ISO date pairs covering start..end inclusive."""
+    windows = []
+    while start <= end:
+        until = min(start + timedelta(days=days - 1), end)
+        windows.append((start.isoformat(), until.isoformat()))
+        start = until + timedelta(days=1)
+    return windows
+
+
+# ========================
+# RECORD STORE
+# ========================
+
+def record_hash(record):
+    payload = json.dumps({k: v for k, v in record.items() if k != 'datestamp'}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RecordStore:
+    """Append-only JSONL of harvested records; upsert writes only new or changed ones."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.hashes = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from an interrupted run
+                    self.hashes[record['arxiv_id']] = record_hash(record)
+
+    def upsert(self, records):
+        """Returns (new, changed) counts."""
+        new = changed = 0
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in records:
+                digest = record_hash(record)
+                previous = self.hashes.get(record['arxiv_id'])
+                if previous == digest:
+                    continue
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self.hashes[record['arxiv_id']] = digest
+                if previous is None:
+                    new += 1
+                else:
+                    changed += 1
+        return new, changed
+
+    def latest(self):
+        """{arxiv_id: record}, the last version of each record."""
+        records = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    records[record['arxiv_id']] = record
+        return records
+
+
+# ========================
+# OAI-PMH
+# ========================
+
+class OAIError(RuntimeError):
+    def __init__(self, code, message):
+        super().__init__(f"OAI-PMH error {code}: {message}")
+        self.code = code
+
+
+def oai_request(params):
+    """Raw XML of one OAI-PMH request, waiting out 503 Retry-After responses."""
+    url = f"{OAI_ENDPOINT}?{urllib.parse.urlencode(params)}"
+    for attempt in range(MAX_RETRIES):
+        try:
+            with urllib.request.urlopen(url, timeout=120) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code != 503 or attempt == MAX_RETRIES - 1:
+                raise
+            wait = int(e.headers.get('Retry-After') or DEFAULT_RETRY_AFTER)
+            print(f"  OAI server busy, retrying in {wait}s")
+            time.sleep(wait)
+
+
+def _clean(text):
+    return re.sub(r'\s+', ' ', text).strip() if text else None
+
+
+def _subject_name(category):
+    return ASTRO_PH_NAMES.get(category, category)
+
+
+def parse_record(record):
+    """Dataset row (arxiv_papers.csv layout plus arxiv_id/datestamp) from an OAI <record>."""
+    header = record.find('oai:header', NS)
+    if header is None or header.get('status') == 'deleted':
+        return None
+    meta = record.find('oai:metadata/arXiv:arXiv', NS)
+    if meta is None:
+        return None
+
+    def field(name):
+        return _clean(meta.findtext(f'arXiv:{name}', default=None, namespaces=NS))
+
+    arxiv_id = field('id')
+    authors = []
+    for author in meta.findall('arXiv:authors/arXiv:author', NS):
+        parts = [author.findtext('arXiv:forenames', default='', namespaces=NS),
+                 author.findtext('arXiv:keyname', default='', namespaces=NS),
+                 author.findtext('arXiv:suffix', default='', namespaces=NS)]
+        authors.append(' '.join(p.strip() for p in parts if p and p.strip()))
+
+    categories = (field('categories') or '').split()
+    comments = field('comments') or ''
+    fields = comment_fields(comments)
+    return {
+        'arxiv_id': arxiv_id,
+        'datestamp': header.findtext('oai:datestamp', default=None, namespaces=NS),
+        'title': field('title'),
+        'abstract': field('abstract'),
+        'authors': authors,
+        'figures': fields['figures'],
+        'pages': fields['pages'],
+        'tables': fields['tables'],
+        'pdf_link': f"arxiv.org/pdf/{arxiv_id}",
+        'primary_subject': _subject_name(categories[0]) if categories else None,
+        'secondary_subjects': [_subject_name(c) for c in categories[1:]] or None,
+        'submitted_journal': fields['submitted_journal'],
+        'published_journal': field('journal-ref'),
+        'date': field('created'),
+    }
+
+
+def list_records(params):
+    """
+    One ListRecords page. Returns (records, resumption_token); the token is None on the
+    last page. noRecordsMatch is an empty page, not an error.
+    """
+    root = ET.fromstring(oai_request(params))
+    error = root.find('oai:error', NS)
+    if error is not None:
+        if error.get('code') == 'noRecordsMatch':
+            return [], None
+        raise OAIError(error.get('code'), error.text)
+    list_node = root.find('oai:ListRecords', NS)
+    records = [r for r in (parse_record(rec) for rec in list_node.findall('oai:record', NS)) if r]
+    token = list_node.findtext('oai:resumptionToken', default='', namespaces=NS).strip()
+    return records, token or None
+
+
+def harvest_window(store, state, window):
+    """Reads one date window to the end, persisting the resumption token after every page."""
+    from_date, until_date = window
+    if state.get('window') == list(window) and state.get('resumption_token'):
+        params = {'verb': 'ListRecords', 'resumptionToken': state['resumption_token']}
+    else:
+        params = {'verb': 'ListRecords', 'metadataPrefix': METADATA_PREFIX, 'set': OAI_SET,
+                  'from': from_date, 'until': until_date}
+    totals = {'requests': 0, 'records': 0, 'new': 0, 'changed': 0}
+    while True:
+        try:
+            records, token = list_records(params)
+        except OAIError as e:
+            if e.code != 'badResumptionToken' or 'resumptionToken' not in params:
+                raise
+            print("  Resumption token expired, restarting window")
+            params = {'verb': 'ListRecords', 'metadataPrefix': METADATA_PREFIX, 'set': OAI_SET,
+                      'from': from_date, 'until': until_date}
+            continue
+        new, changed = store.upsert(records)
+        totals['requests'] += 1
+        totals['records'] += len(records)
+        totals['new'] += new
+        totals['changed'] += changed
+
+        state.update({'window': list(window), 'resumption_token': token})
+        if token is None:
+            state['high_water_mark'] = max(state.get('high_water_mark') or until_date, until_date)
+            save_state(state)
+            return totals
+        save_state(state)
+        params = {'verb': 'ListRecords', 'resumptionToken': token}
+
+
+def export_csv(store, path=EXPORT_CSV):
+    import pandas as pd
+    df = pd.DataFrame(list(store.latest().values()))
+    df = df.reindex(columns=CSV_COLUMNS).sort_values('date', kind='stable')
+    df.to_csv(path, index=False)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental astro-ph OAI-PMH harvester")
+    parser.add_argument('--from', dest='from_date', help="YYYY-MM-DD; overrides the high-water mark")
+    parser.add_argument('--until', dest='until_date', help="YYYY-MM-DD; defaults to today (UTC)")
+    parser.add_argument('--export', action='store_true', help=f"write {EXPORT_CSV} after harvesting")
+    args = parser.parse_args()
+
+    state = load_state()
+    store = RecordStore()
+    if args.from_date:
+        start = datetime.strptime(args.from_date, '%Y-%m-%d').date()
+        state.pop('resumption_token', None)
+    elif state.get('high_water_mark'):
+        # OAI datestamps have day granularity and `from` is inclusive, so the mark's day is re-read
+        start = datetime.strptime(state['high_water_mark'], '%Y-%m-%d').date()
+    else:
+        start = datetime.strptime(DEFAULT_START, '%Y-%m-%d').date()
+    end = datetime.strptime(args.until_date, '%Y-%m-%d').date() if args.until_date else datetime.utcnow().date()
+
+    # An interrupted window is finished first, from its saved token
+    windows = harvest_windows(start, end)
+    if state.get('resumption_token') and state.get('window') and tuple(state['window']) not in windows:
+        windows.insert(0, tuple(state['window']))
+
+    print(f"Harvesting {OAI_SET} from {start} to {end} in {len(windows)} window(s); "
+          f"{len(store.hashes)} records already stored")
+    for window in windows:
+        totals = harvest_window(store, state, window)
+        print(f"  {window[0]} .. {window[1]}: {totals['records']} records in {totals['requests']} request(s), "
+              f"{totals['new']} new, {totals['changed']} changed")
+    print(f"High-water mark: {state.get('high_water_mark')}, store: {STORE_PATH} ({len(store.hashes)} records)")
+
+    if args.export:
+        print(f"Exported {export_csv(store)} records to {EXPORT_CSV}")
+
+
+if __name__ == "__main__":
+    main()
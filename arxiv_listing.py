@@ -0,0 +1,235 @@
+"""
+Single-pass parser for arXiv listing pages (/list/<subject>/new and /catchup/<subject>/<day>).
+
+The page is parsed once and each paper's metadata is read straight from its <dt> (links) /
+<dd> (meta) pair. This replaces slicing str(soup) between <a name=...> anchors and re-parsing
+every slice, which was O(papers x page size). lxml.html is used when installed (a 2000-entry
+listing parses in a fraction of a second); otherwise BeautifulSoup keeps only the <h3>, <dt>
+and <dd> elements. Text is read like get_text(strip=True), so records match the old parser.
+
+Shared by missing_days.py, script2.py and old/arxiv_dataframe.py.
+"""
+
+import re
+from typing import List, Optional, TypedDict
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Tag
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+LISTING_ELEMENTS = SoupStrainer(['h3', 'dt', 'dd'])
+_XPATHS = {}  # Compiled lxml lookups, keyed by (tag, class, title)
+_TEXT_XPATH = lxml.etree.XPath('.//text()') if lxml is not None else None
+
+JOURNAL_PREFIXES = ['Submitted to ', 'Accepted to ', 'Accepted for publication in ', 'Accepted by ', 'Submitted by ']
+
+# Every field of a comments string in one match: each optional lookahead captures the first
+# "N pages" / "N figures" / "N tables", and the journal is whatever follows the last prefix.
+# Also run over whole columns with Series.str.extract (comment_metrics.parse_comments).
+COMMENTS_RE = re.compile(
+    r'(?s)'
+    r'(?=(?:.*?(?P<pages>\d+)\s+pages)?)'
+    r'(?=(?:.*?(?P<figures>\d+)\s+figures)?)'
+    r'(?=(?:.*?(?P<tables>\d+)\s+table[s]?)?)'
+    r'(?=(?:.*(?:' + '|'.join(re.escape(prefix) for prefix in JOURNAL_PREFIXES) + r')(?P<submitted_journal>.*))?)'
+)
+ARXIV_ID_RE = re.compile(r'(\d{4}\.\d{4,5})')
+
+
+class ListingRecord(TypedDict):
+    title: Optional[str]
+    abstract: Optional[str]
+    authors: List[str]
+    figures: Optional[int]
+    pages: Optional[int]
+    tables: Optional[int]
+    pdf_link: Optional[str]
+    primary_subject: Optional[str]
+    secondary_subjects: Optional[List[str]]
+    submitted_journal: Optional[str]
+    published_journal: Optional[str]
+
+
+# =======================
+# TREE ACCESS (lxml or BeautifulSoup)
+# =======================
+def parse_listing_html(html):
+    """Parses the page once; an lxml root element, or a stripped-down soup without lxml."""
+    if lxml is not None:
+        return lxml.html.fromstring(html)
+    return BeautifulSoup(html, 'html.parser', parse_only=LISTING_ELEMENTS)
+
+
+def _is_soup(node):
+    return isinstance(node, Tag)
+
+
+def _find(node, tag, class_=None, title=None):
+    """First descendant <tag> with the given class token / title attribute, or None."""
+    if _is_soup(node):
+        attrs = {'title': title} if title else {}
+        return node.find(tag, class_=class_, attrs=attrs) if class_ else node.find(tag, attrs=attrs)
+    key = (tag, class_, title)
+    if key not in _XPATHS:
+        conditions = ''
+        if class_:
+            conditions += f"[contains(concat(' ', normalize-space(@class), ' '), ' {class_} ')]"
+        if title:
+            conditions += f"[@title='{title}']"
+        _XPATHS[key] = lxml.etree.XPath(f'.//{tag}{conditions}[1]')
+    found = _XPATHS[key](node)
+    return found[0] if found else None
+
+
+def _find_all(node, tag):
+    return node.find_all(tag) if _is_soup(node) else node.iter(tag)
+
+
+def _stripped_text(node):
+    """Same as BeautifulSoup's get_text(strip=True): every text piece stripped, then joined."""
+    if _is_soup(node):
+        return node.get_text(strip=True)
+    return ''.join(piece.strip() for piece in _TEXT_XPATH(node))
+
+
+def _plain_text(node):
+    """All text of the node as it reads on the page (spacing kept)."""
+    return node.get_text() if _is_soup(node) else node.text_content()
+
+
+def _text(node, prefix=''):
+    return _stripped_text(node).replace(prefix, '').strip() if node is not None else None
+
+
+def find_h3(tree, text):
+    """Text of the first <h3> containing `text`, or None."""
+    for h3 in _find_all(tree, 'h3'):
+        h3_text = _plain_text(h3)
+        if text in h3_text:
+            return h3_text.strip()
+    return None
+
+
+def new_submission_count(tree):
+    """Number of new submissions from the 'New submissions (showing N of N entries)' header."""
+    h3_text = find_h3(tree, 'New submissions')
+    if not h3_text:
+        return None
+    try:
+        return int(h3_text.split('(')[1].split()[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def comment_fields(comments):
+    """figures, pages, tables and submitted_journal from an arXiv comments string."""
+    fields = COMMENTS_RE.match(comments or '').groupdict()
+    return {
+        'figures': int(fields['figures']) if fields['figures'] else None,
+        'pages': int(fields['pages']) if fields['pages'] else None,
+        'tables': int(fields['tables']) if fields['tables'] else None,
+        'submitted_journal': fields['submitted_journal'],
+    }
+
+
+# =======================
+# RECORDS
+# =======================
+def record_from_entry(dt, dd) -> ListingRecord:
+    """Metadata of one paper from its <dt> (links) and <dd> (meta) elements."""
+    title = _text(_find(dd, 'div', 'list-title'), 'Title:')
+    abstract = _text(_find(dd, 'p', 'mathjax'))
+
+    authors_section = _find(dd, 'div', 'list-authors')
+    authors = [_stripped_text(a) for a in _find_all(authors_section, 'a')] if authors_section is not None else []
+
+    comments = _text(_find(dd, 'div', 'list-comments'), 'Comments:') or ''
+
+    pdf_tag = _find(dt, 'a', title='Download PDF')
+    pdf_href = pdf_tag.get('href') if pdf_tag is not None else None
+    pdf_link = f"arxiv.org{pdf_href}" if pdf_href else None
+
+    primary_subject = _text(_find(dd, 'span', 'primary-subject'))
+
+    subjects_section = _find(dd, 'div', 'list-subjects')
+    secondary_subjects = None
+    if subjects_section is not None:
+        subjects_split = _stripped_text(subjects_section).split(';')
+        if len(subjects_split) > 1:
+            secondary_subjects = [subject.strip() for subject in subjects_split[1:]]
+
+    fields = comment_fields(comments)
+    return {
+        'title': title,
+        'abstract': abstract,
+        'authors': authors,
+        'figures': fields['figures'],
+        'pages': fields['pages'],
+        'tables': fields['tables'],
+        'pdf_link': pdf_link,
+        'primary_subject': primary_subject,
+        'secondary_subjects': secondary_subjects,
+        'submitted_journal': fields['submitted_journal'],
+        'published_journal': _text(_find(dd, 'div', 'list-journal-ref'), 'Journal-ref:'),
+    }
+
+
+def _next_dd(dt):
+    if _is_soup(dt):
+        return dt.find_next_sibling('dd')
+    node = dt.getnext()
+    while node is not None and node.tag != 'dd':
+        node = node.getnext()
+    return node
+
+
+def iter_entries(tree, limit=None):
+    """Yields the (dt, dd) pair of every paper in page order, stopping after `limit` papers."""
+    for count, dt in enumerate(_find_all(tree, 'dt')):
+        if limit is not None and count >= limit:
+            break
+        dd = _next_dd(dt)
+        if dd is None:
+            break
+        yield dt, dd
+
+
+def iter_listing_records(tree, limit=None):
+    """Yields a ListingRecord per <dt>/<dd> pair in page order, stopping after `limit` papers."""
+    for dt, dd in iter_entries(tree, limit):
+        yield record_from_entry(dt, dd)
+
+
+def entry_arxiv_id(dt):
+    """arXiv id (without version) from the entry's Abstract link, or None."""
+    abs_tag = _find(dt, 'a', title='Abstract')
+    if abs_tag is None:
+        return None
+    match = ARXIV_ID_RE.search(abs_tag.get('href') or '') or ARXIV_ID_RE.search(_plain_text(abs_tag))
+    return match.group(1) if match else None
+
+
+def entry_notes(dt, dd):
+    """arxiv_id plus the raw comments and journal-ref text of one entry (None when absent)."""
+    comments = _find(dd, 'div', 'list-comments')
+    journal = _find(dd, 'div', 'list-journal-ref')
+    return {
+        'arxiv_id': entry_arxiv_id(dt),
+        'comments': _plain_text(comments).replace('Comments:', '', 1).strip() if comments is not None else None,
+        'journal_ref': _plain_text(journal).replace('Journal-ref:', '', 1).strip() if journal is not None else None,
+    }
+
+
+def parse_listing(html, new_only=True) -> List[ListingRecord]:
+    """
+    All papers on a listing page. With new_only the cross-lists and replacements after the
+    new submissions are left out (the count comes from the 'New submissions' header).
+    """
+    tree = parse_listing_html(html)
+    limit = new_submission_count(tree) if new_only else None
+    return list(iter_listing_records(tree, limit))
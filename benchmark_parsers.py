@@ -0,0 +1,172 @@
+"""
+Benchmark and regression harness for the LaTeX affiliation parsers.
+
+Runs every parse_*_style strategy of finding_author_rem_11, plus the full parse_latex_section
+chain, over the frozen fixture corpus in datasets/parser_fixtures.json: front-matter snippets,
+one or more per document class, with the expected author -> affiliations mapping. Each fixture
+names its source (temp_sample.txt, extracted_affiliations*.csv); the ones marked
+"synthetic": true were written by hand because the local extracts lack that markup, so their
+scores say less about the real corpus.
+
+For each strategy it reports:
+- papers/second and p95 per-paper latency
+- fill rate: expected authors that received any affiliation
+- accuracy: expected authors whose affiliations match exactly (after normalisation)
+
+Usage:
+    python benchmark_parsers.py                  # report only
+    python benchmark_parsers.py --save-baseline  # store this run as the baseline
+    python benchmark_parsers.py --compare        # report deltas, exit 1 if fill/accuracy dropped
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import finding_author_rem_11 as parsers
+
+# ========================
+# CONFIG
+# ========================
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets", "parser_fixtures.json")
+BASELINE_PATH = "parser_benchmark_baseline.json"
+REPEATS = 20  # Timing repeats per fixture
+
+STRATEGIES = {
+    "parbox": parsers.parse_parbox_style,
+    "mnras": parsers.parse_mnras_style,
+    "altaffil": parsers.parse_altaffil_style,
+    "elsarticle": parsers.parse_elsarticle_style,
+    "robust_mapping": parsers.parse_robust_mapping_style,
+    "chain": parsers.parse_latex_section,
+}
+
+
+# ========================
+# SCORING
+# ========================
+
+def _normalize(text):
+    """Lowercase ASCII with every non-alphanumeric character dropped."""
+    text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]', '', text.lower())
+
+
+def score(result, expected):
+    """Returns (filled, correct, total) for one fixture."""
+    found = {_normalize(name): [_normalize(a) for a in affs] for name, affs in (result or {}).items()}
+    filled = correct = 0
+    for name, affs in expected.items():
+        got = found.get(_normalize(name))
+        if got:
+            filled += 1
+            if got == [_normalize(a) for a in affs]:
+                correct += 1
+    return filled, correct, len(expected)
+
+
+def percentile(values, q):
+    if not values: return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+# ========================
+# BENCHMARK
+# ========================
+
+def load_fixtures(path=FIXTURES_PATH):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["fixtures"]
+
+
+def run_strategy(func, fixtures, repeats=REPEATS):
+    latencies = []
+    filled = correct = total = 0
+    per_class = {}
+    for fx in fixtures:
+        result = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = func(fx["section"])
+            latencies.append(time.perf_counter() - start)
+        f, c, t = score(result, fx["expected"])
+        filled += f; correct += c; total += t
+        cls = per_class.setdefault(fx["document_class"], [0, 0])
+        cls[0] += c; cls[1] += t
+
+    elapsed = sum(latencies)
+    return {
+        "papers_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "fill_rate": filled / total if total else 0.0,
+        "accuracy": correct / total if total else 0.0,
+        "accuracy_by_class": {k: v[0] / v[1] for k, v in per_class.items() if v[1]},
+    }
+
+
+def run_all(fixtures, repeats=REPEATS):
+    return {name: run_strategy(func, fixtures, repeats) for name, func in STRATEGIES.items()}
+
+
+def print_report(report, baseline=None):
+    print(f"{'strategy':<16} {'papers/s':>10} {'p95 ms':>9} {'fill':>7} {'accuracy':>9}")
+    for name, r in report.items():
+        line = f"{name:<16} {r['papers_per_second']:>10.0f} {r['p95_ms']:>9.3f} {r['fill_rate']:>7.1%} {r['accuracy']:>9.1%}"
+        if baseline and name in baseline:
+            b = baseline[name]
+            speedup = r['papers_per_second'] / b['papers_per_second'] if b['papers_per_second'] else 0.0
+            line += f"   x{speedup:.2f} speed, {r['fill_rate'] - b['fill_rate']:+.1%} fill, {r['accuracy'] - b['accuracy']:+.1%} acc"
+        print(line)
+
+    print("\nChain accuracy by document class:")
+    for cls, acc in sorted(report["chain"]["accuracy_by_class"].items()):
+        print(f"  {cls:<14} {acc:.0%}")
+
+
+def regressions(report, baseline):
+    """Strategies whose fill rate or accuracy dropped below the baseline."""
+    return [name for name, r in report.items() if name in baseline and (
+        r['fill_rate'] < baseline[name]['fill_rate'] - 1e-9 or
+        r['accuracy'] < baseline[name]['accuracy'] - 1e-9)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LaTeX affiliation parsers.")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write this run to {BASELINE_PATH}")
+    parser.add_argument("--compare", action="store_true", help=f"compare against {BASELINE_PATH}")
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    synthetic = sum(1 for fx in fixtures if fx.get("synthetic"))
+    print(f"Loaded {len(fixtures)} fixtures ({synthetic} synthetic), {args.repeats} repeats each.\n")
+    report = run_all(fixtures, args.repeats)
+
+    baseline = None
+    if args.compare and os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {BASELINE_PATH}")
+
+    if baseline:
+        bad = regressions(report, baseline)
+        if bad:
+            print(f"\nREGRESSION in: {', '.join(bad)}")
+            sys.exit(1)
+        print("\nNo fill-rate or accuracy regressions.")
+
+
+if __name__ == "__main__":
+    main()
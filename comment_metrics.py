@@ -0,0 +1,80 @@
+"""
+Vectorized parsing of the arXiv comments column and canonical journal names.
+
+parse_comments runs arxiv_listing.COMMENTS_RE once over a whole comments column with
+Series.str.extract (named groups -> pages, figures, tables, submitted_journal), instead of
+three re.search calls and a chain of prefix splits per paper. backfill_from_comments fills the
+metric gaps of a dataset from its comments in milliseconds, so only papers whose comments do
+not state their counts still need their PDF (pdf_analysis.compute_pdf_metrics).
+
+normalize_journals maps free-text journal names ("ApJ", "the Astrophysical Journal (ApJ)",
+"Astronomy & Astrophysics", ...) onto the canonical names of JOURNALS_CSV, which follow the
+ADS `pub` names used for journal_flag. The alias that starts the string wins (longest first),
+as long as it is the whole journal field: it must not run on into a capitalized word
+("Nature Physics", "Science Advances" are not Nature / Science), while separators, numbers and
+lowercase text ("ApJ, 18 pages", "MNRAS in press") may follow. Names without a known alias keep
+the old cleaning, the text up to the first , ; : or .
+
+    fields = parse_comments(data['comments'])
+    data = backfill_from_comments(data)
+    data['submitted_journal'] = normalize_journals(data['submitted_journal'])
+"""
+
+import os
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+from arxiv_listing import COMMENTS_RE
+
+# ========================
+# CONFIG
+# ========================
+
+JOURNALS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets", "journals.csv")
+COUNT_COLUMNS = ['pages', 'figures', 'tables']
+
+
+# ========================
+# COMMENTS
+# ========================
+
+def parse_comments(comments):
+    """pages, figures, tables (nullable ints) and submitted_journal for a whole comments column."""
+    fields = comments.astype('string').fillna('').str.extract(COMMENTS_RE)
+    fields[COUNT_COLUMNS] = fields[COUNT_COLUMNS].astype('Int64')
+    return fields
+
+
+def backfill_from_comments(df, columns=('pages', 'figures', 'tables', 'submitted_journal')):
+    """Fills missing values of columns from df['comments']; existing values are kept."""
+    fields = parse_comments(df['comments'])
+    for column in columns:
+        df[column] = df[column].combine_first(fields[column]) if column in df else fields[column]
+    return df
+
+
+# ========================
+# JOURNALS
+# ========================
+
+@lru_cache(maxsize=None)
+def load_journal_table(path=JOURNALS_CSV):
+    """(alias regex, {lowercased alias: canonical name}), read once per path."""
+    table = pd.read_csv(path, dtype=str).dropna()
+    aliases = dict(zip(table['alias'].str.lower(), table['journal']))
+    alternation = '|'.join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+    # No word continuing the alias, and no capitalized word after it (case-sensitive lookahead)
+    pattern = re.compile(rf'^\W*(?:the\s+)?({alternation})(?![\w&])(?!\s+(?-i:[A-Z]))', re.IGNORECASE)
+    return pattern, aliases
+
+
+def normalize_journals(journals, path=JOURNALS_CSV):
+    """Canonical journal name for every entry of a column of free-text journal names."""
+    pattern, aliases = load_journal_table(path)
+    text = journals.astype('string').str.replace(r'\s+', ' ', regex=True).str.strip()
+    canonical = text.str.extract(pattern, expand=False).str.lower().map(aliases)
+    cleaned = text.str.split(r'[,;:.]').str[0].str.strip()
+    normalized = canonical.fillna(cleaned)
+    return normalized.astype(object).where(normalized.notna(), None)
@@ -0,0 +1,159 @@
+"""
+Country resolution shared by adding_countries.py, kimi.py, hetansh_stats/map_utils.py and
+hetansh_stats/global_keyword_analysis.ipynb, so there is one list of names and aliases.
+
+Names come from world_coords.csv (country, country_code) plus COUNTRY_ALIASES. They are
+compiled once into a single trie-shaped regex (shared prefixes such as "United ..." are tested
+once instead of once per name): names match case-insensitively, ISO codes and acronyms such
+as USA / UK case-sensitively, and the longest name wins ("United States of America" over
+"United States"). One scan of a text yields every (canonical name, start, end):
+
+    matcher = country_matcher()                  # names + aliases (codes=True adds ISO codes)
+    matcher.find_all("MPIA, Heidelberg, Germany; Caltech, USA")   # ['Germany', 'United States']
+    matcher.first(latex_text)                    # (name, start, end) or None
+    extract_countries(data['affiliations'])      # Series of lists, one str.findall over the column
+    affiliation_countries(data['affiliations'])  # the country ending each ';'-separated affiliation
+"""
+
+import os
+import re
+from functools import lru_cache
+
+import pandas as pd
+
+# ========================
+# CONFIG
+# ========================
+
+COUNTRY_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'world_coords.csv')
+
+# Other spellings -> canonical world_coords.csv name
+COUNTRY_ALIASES = {
+    'USA': 'United States',
+    'US': 'United States',
+    'United States of America': 'United States',
+    'UK': 'United Kingdom',
+    'The United Kingdom': 'United Kingdom',
+    'UAE': 'United Arab Emirates',
+    "People's Republic of China": 'China',
+    'P. R. China': 'China',
+    'P.R. China': 'China',
+    'The Netherlands': 'Netherlands',
+    'Republic of Korea': 'South Korea',
+    'Czechia': 'Czech Republic',
+    'Russian Federation': 'Russia',
+    'Türkiye': 'Turkey',
+    'Viet Nam': 'Vietnam',
+}
+
+_END = ''
+
+
+# ========================
+# MATCHER
+# ========================
+
+def _trie_pattern(words):
+    """Regex alternation of words laid out as a trie, longest continuation tried first."""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_END] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != _END]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if _END in node:
+            body = f'(?:{body})?'
+        return body
+
+    return build(trie) if words else '(?!)'
+
+
+def _is_code(name):
+    """ISO codes and acronyms (USA, UK) are matched case-sensitively."""
+    return len(name) <= 3 and name.isupper()
+
+
+class CountryMatcher:
+    def __init__(self, names, codes=None):
+        """names: {spelling: canonical}; codes: {case-sensitive code: canonical}."""
+        codes = dict(codes or {})
+        self.names = {}
+        for spelling, canonical in names.items():
+            if _is_code(spelling):
+                codes[spelling] = canonical
+            else:
+                self.names[spelling.lower()] = canonical
+        self.codes = codes
+        self.pattern = re.compile(
+            rf'(?<!\w)((?i:{_trie_pattern(self.names)})|{_trie_pattern(self.codes)})(?!\w)')
+
+    def resolve(self, text):
+        """Canonical name of an exact spelling or code, or None."""
+        if not isinstance(text, str):
+            return None
+        text = text.strip()
+        return self.codes.get(text) or self.names.get(text.lower())
+
+    def finditer(self, text):
+        """(canonical, start, end) of every country mention, in order of appearance."""
+        for match in self.pattern.finditer(text):
+            yield self.resolve(match.group(1)), match.start(), match.end()
+
+    def find_all(self, text):
+        """Canonical names of every mention, duplicates kept."""
+        return [self.resolve(found) for found in self.pattern.findall(text)]
+
+    def first(self, text):
+        return next(self.finditer(text), None)
+
+
+@lru_cache(maxsize=None)
+def country_matcher(codes=False, path=COUNTRY_DB_PATH):
+    """Matcher over world_coords.csv names and COUNTRY_ALIASES (plus ISO codes when codes)."""
+    world = pd.read_csv(path, keep_default_na=False)
+    names = {name.strip(): name.strip() for name in world['country'] if name.strip()}
+    names.update(COUNTRY_ALIASES)
+    iso_codes = {}
+    if codes:
+        iso_codes = {code.strip(): name.strip() for code, name in zip(world['country_code'], world['country'])
+                     if code.strip() and name.strip()}
+    return CountryMatcher(names, iso_codes)
+
+
+def resolve_country(name):
+    """Canonical name of a country spelling or ISO code, or None."""
+    return country_matcher(codes=True).resolve(name)
+
+
+# ========================
+# SERIES
+# ========================
+
+def _resolve_found(found, matcher):
+    """Resolves the lists of a str.findall result in one exploded lookup."""
+    exploded = found.reset_index(drop=True).explode()
+    resolved = exploded.map(matcher.codes).fillna(exploded.str.lower().map(matcher.names))
+    grouped = resolved.dropna().groupby(level=0).agg(list).reindex(range(len(found)))
+    return pd.Series([names if isinstance(names, list) else [] for names in grouped], index=found.index)
+
+
+def extract_countries(texts, codes=False):
+    """Every country mention of each text of a Series, as lists of canonical names."""
+    matcher = country_matcher(codes=codes)
+    return _resolve_found(texts.astype('string').fillna('').str.findall(matcher.pattern), matcher)
+
+
+def affiliation_countries(affiliations, codes=False):
+    """
+    For each ';'-separated affiliation, the country that ends it ("..., Pasadena, CA, USA."),
+    as lists of canonical names (one entry per affiliation with a trailing country).
+    """
+    matcher = country_matcher(codes=codes)
+    trailing = re.compile(matcher.pattern.pattern + r'\.?\s*(?=;|$)')
+    return _resolve_found(affiliations.astype('string').fillna('').str.findall(trailing), matcher)
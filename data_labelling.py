@@ -2,8 +2,8 @@ import streamlit as st
 import pandas as pd
 import os
 import ast
-import json
-import re
+
+from uat_keywords import UAT_JSON, uat_matcher
 
 # Set page config for a premium, wide layout
 st.set_page_config(
@@ -144,60 +144,18 @@ def get_data():
         return pd.DataFrame()
     return pd.read_csv(CSV_PATH)
 
-@st.cache_data
-def get_keyword_bank():
-    json_path = os.path.join(os.path.dirname(__file__), 'uat.json')
-    if not os.path.exists(json_path):
-        # Fallback if not found, or warn
-        return []
-
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    keywords = set()
-    # Keys for labels in UAT (SKOS/RDF)
-    label_keys = [
-        "http://www.w3.org/2004/02/skos/core#prefLabel",
-        "http://www.w3.org/2004/02/skos/core#altLabel",
-        "http://www.w3.org/2000/01/rdf-schema#label"
-    ]
-
-    for concept_uri, properties in data.items():
-        for key in label_keys:
-            if key in properties:
-                for item in properties[key]:
-                    # User requirement: filter "value" field where "type" : "literal"
-                    if isinstance(item, dict) and item.get("type") == "literal":
-                        val = item.get("value")
-                        if val:
-                            keywords.add(val)
-    
-    return list(keywords)
+@st.cache_resource
+def get_keyword_matcher():
+    # uat.json labels compiled once into a token index (uat_keywords.py), shared across reruns
+    if not os.path.exists(UAT_JSON):
+        return None
+    return uat_matcher()
 
-def recommend_keywords(title, abstract, bank):
-    # Combine title and abstract
-    text = f"{str(title)} {str(abstract)}".lower()
-    
-    # Extract unique tokens from text (bag of words)
-    # Using regex to match alphanumeric words, effectively ignoring punctuation
-    text_tokens = set(re.findall(r'\b\w+\b', text))
-    
-    matches = []
-    # Check each keyword
-    for kw in bank:
-        # Tokenize the keyword phrase
-        kw_tokens = re.findall(r'\b\w+\b', kw.lower())
-        
-        if not kw_tokens:
-            continue
-            
-        # Optimization: Fast check with sets
-        # If all tokens in the keyword phrase appear in the text tokens (regardless of order)
-        if set(kw_tokens).issubset(text_tokens):
-            matches.append(kw)
-            
+def recommend_keywords(title, abstract, matcher):
     # Return all unique matches, no limit
-    return sorted(list(set(matches)))
+    if matcher is None:
+        return []
+    return matcher.recommend(title, abstract)
 
 # We use session state to track index to avoid losing place on rerun
 if 'current_idx' not in st.session_state:
@@ -253,8 +211,8 @@ with col1:
     """, unsafe_allow_html=True)
 
     # Recommendations Box
-    bank = get_keyword_bank()
-    recommendations = recommend_keywords(paper['title'], paper['abstract'], bank)
+    matcher = get_keyword_matcher()
+    recommendations = recommend_keywords(paper['title'], paper['abstract'], matcher)
     
     if recommendations:
         st.markdown(f"""
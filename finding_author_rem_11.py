@@ -9,15 +9,24 @@ Handles:
 5. NEW: MNRAS style (\author[...] containing authors and affiliations).
 6. NEW: Generalized nested tags (\aff{...}) in authors, affiliations, parbox, institute.
 7. NEW: Updates latex_filtered files by removing processed papers.
+8. NEW: Process-pool parsing with a per-paper time budget (slow papers are quarantined).
 """
 
 import pandas as pd
 import ast
 import re
 import os
+import signal
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
+from latex_patterns import (
+    BRACE_RE, COMMAND_RE, EDGE_PUNCT_RE, SUPERSCRIPT_MARK_RE, WHITESPACE_RE,
+    resolve_affiliation_keys, strip_name_marks, strip_text_tags, unwrap_nested_commands,
+)
+
 # ========================
 # CONFIG
 # ========================
@@ -27,6 +36,12 @@ OUTPUT_CSV_PATH = "test_filled_11.csv"
 LATEX_FILES = ["latex_filtered_1.txt", "latex_filtered_2.txt"]
 REPORT_PATH = "missing_affiliations_report.txt"
 
+# Parallel parsing (set PARSE_WORKERS = 1 to parse serially in this process)
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_CHUNK_SIZE = 64           # Papers sent to a worker at a time
+PAPER_TIMEOUT_SECONDS = 10      # Wall-clock budget per paper before it is quarantined
+QUARANTINE_PATH = "quarantined_papers.txt"
+
 
 # ========================
 # PARSING UTILITIES
@@ -57,37 +72,27 @@ def extract_balanced_content(text, start_token):
 
 def clean_latex_text(text):
     if not text: return ""
-    text = re.sub(r'\\aff\{[^}]*\}', '', text) # Remove label tags from text body if they remain
-    text = re.sub(r'\\email\{[^}]*\}', '', text)
-    text = re.sub(r'\\thanks\{[^}]*\}', '', text)
-    text = re.sub(r'\\fnmsep', '', text)
-    text = re.sub(r'\\vspace\{[^}]*\}', '', text)
-    text = re.sub(r'\\corref\{[^}]*\}', '', text)
-    
-    for _ in range(4):
-        new_text = re.sub(r'\\[a-zA-Z]+\{((?:[^{}]|\{[^{}]*\})*)\}', r'\1', text)
-        if new_text == text: break
-        text = new_text
-    
-    text = re.sub(r'\\[a-zA-Z]+', ' ', text)
-    text = re.sub(r'[{}]', ' ', text)
+    text = strip_text_tags(text) # Remove \aff, \email, \thanks, \vspace, \corref tags from text body
+    text = text.replace('\\fnmsep', '')
+    
+    # Nested-brace regex for normal input, brace tokenizer for pathological input
+    text = unwrap_nested_commands(text)
+    
+    text = COMMAND_RE.sub(' ', text)
+    text = BRACE_RE.sub(' ', text)
     text = text.replace('\\\\', ', ')
     text = text.replace('\\', ' ')
     text = text.replace('$', '') 
     text = text.replace('~', ' ') # Handle non-breaking space
-    text = re.sub(r'\s+', ' ', text).strip()
-    text = re.sub(r'^[\s,;.]+|[\s,;.]+$', '', text)
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    text = EDGE_PUNCT_RE.sub('', text)
     return text
 
 
 def extract_name_from_author(author_str):
     if not author_str: return ""
-    author_str = re.sub(r'\\altaffilmark\{[^}]*\}', '', author_str)
-    author_str = re.sub(r'\\inst\{[^}]*\}', '', author_str)
-    author_str = re.sub(r'\\aff\{[^}]*\}', '', author_str) # Remove \aff{...} from name
-    author_str = re.sub(r'\\orcidlink\{[^}]*\}', '', author_str)
-    author_str = re.sub(r'\\footnote\{[^}]*\}', '', author_str)
-    author_str = re.sub(r'\$[\^]*\{?[\w, \-$\star\dagger]*\}?\$', '', author_str)
+    author_str = strip_name_marks(author_str) # \altaffilmark, \inst, \aff, \orcidlink, \footnote
+    author_str = SUPERSCRIPT_MARK_RE.sub('', author_str)
     name = clean_latex_text(author_str)
     return name.strip()
 
@@ -212,7 +217,7 @@ def parse_parbox_style(section):
             indices.extend(parts)
 
         if indices:
-            affs = [label_map[i] for i in indices if i in label_map]
+            affs = resolve_affiliation_keys(indices, label_map)
             if affs: author_affiliations[name] = affs
     
     return author_affiliations
@@ -333,7 +338,7 @@ def parse_mnras_style(section):
             indices.extend(parts)
             
         if indices:
-            affs = [label_map[i] for i in indices if i in label_map]
+            affs = resolve_affiliation_keys(indices, label_map)
             if affs: author_affiliations[name] = affs
             
     return author_affiliations
@@ -381,7 +386,7 @@ def parse_altaffil_style(section):
 
                 name = extract_name_from_author(raw)
                 if not name: continue
-                affs = [label_map[i] for i in indices if i in label_map]
+                affs = resolve_affiliation_keys(indices, label_map)
                 if affs: 
                     author_affiliations[name] = affs
                 elif label_map and not indices:
@@ -410,7 +415,7 @@ def parse_elsarticle_style(section):
         name = extract_name_from_author(content)
         if not name: continue
         labels = [l.strip() for l in label_str.split(',') if l.strip()]
-        affs = [label_map[l] for l in labels if l in label_map]
+        affs = resolve_affiliation_keys(labels, label_map)
         if affs: author_affiliations[name] = affs
     return author_affiliations
 
@@ -500,7 +505,7 @@ def parse_robust_mapping_style(section):
                 for m in aff_matches: indices.extend([i.strip() for i in m.group(1).split(',')])
                 
                 if indices:
-                    affs = [label_map[i] for i in indices if i in label_map]
+                    affs = resolve_affiliation_keys(indices, label_map)
                     if affs: author_affiliations[name] = affs
                 elif label_map:
                     if len(label_map) == 1: author_affiliations[name] = list(label_map.values())
@@ -532,14 +537,8 @@ def parse_latex_section(section):
     return {}
 
 
-def parse_filtered_file(filepath):
-    paper_affiliations = {}
-    if not os.path.exists(filepath): return {}
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except: return {}
-    
+def iter_paper_sections(content):
+    """Yields (title, section) for every paper block of a latex_filtered file, in file order."""
     paper_sections = re.split(r'(?=PAPER:)', content)
     current_title = None
     for section in paper_sections:
@@ -549,13 +548,118 @@ def parse_filtered_file(filepath):
         
         if 'AFFILIATION SECTION:' in section or (current_title and 'ERROR:' not in section):
             if current_title:
-                author_affils = parse_latex_section(section)
-                if author_affils:
-                    paper_affiliations[current_title] = author_affils
+                yield current_title, section
                 current_title = None
+
+
+def read_filtered_file(filepath):
+    if not os.path.exists(filepath): return None
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return f.read()
+    except: return None
+
+
+def parse_filtered_file(filepath):
+    paper_affiliations = {}
+    content = read_filtered_file(filepath)
+    if content is None: return {}
+    
+    for title, section in iter_paper_sections(content):
+        author_affils = parse_latex_section(section)
+        if author_affils:
+            paper_affiliations[title] = author_affils
     return paper_affiliations
 
 
+# ========================
+# PARALLEL PARSING
+# ========================
+
+class PaperTimeout(Exception):
+    pass
+
+
+def _raise_paper_timeout(signum, frame):
+    raise PaperTimeout()
+
+
+def _parse_chunk(chunk, timeout=PAPER_TIMEOUT_SECONDS):
+    """
+    Worker: parses a list of (position, title, section) items.
+    Each paper gets `timeout` seconds of wall clock. Where SIGALRM exists (Linux/macOS) the
+    parse is interrupted; elsewhere the paper finishes but is still reported as slow.
+    Returns (results, quarantined) where both carry the original positions.
+    """
+    results, quarantined = [], []
+    use_alarm = hasattr(signal, 'SIGALRM')
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_paper_timeout)
+
+    for pos, title, section in chunk:
+        start = time.perf_counter()
+        try:
+            if use_alarm: signal.setitimer(signal.ITIMER_REAL, timeout)
+            author_affils = parse_latex_section(section)
+        except PaperTimeout:
+            quarantined.append((pos, title, f"timeout after {timeout}s"))
+            continue
+        except Exception as e:
+            quarantined.append((pos, title, f"error: {e}"))
+            continue
+        finally:
+            if use_alarm: signal.setitimer(signal.ITIMER_REAL, 0)
+
+        elapsed = time.perf_counter() - start
+        if elapsed > timeout:
+            quarantined.append((pos, title, f"slow ({elapsed:.1f}s)"))
+        if author_affils:
+            results.append((pos, title, author_affils))
+    return results, quarantined
+
+
+def parse_filtered_files_parallel(files, workers=PARSE_WORKERS, chunk_size=PARSE_CHUNK_SIZE):
+    """
+    Parses several latex_filtered files across a process pool.
+    Papers are dispatched in chunks and merged back in file order, so the output is
+    identical to calling parse_filtered_file on each file in turn (later titles win).
+    Returns (paper_affiliations, quarantined) where quarantined is a list of (title, reason).
+    """
+    items = []
+    for filepath in files:
+        content = read_filtered_file(filepath)
+        if content is None: continue
+        for title, section in iter_paper_sections(content):
+            items.append((len(items), title, section))
+
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    all_results, all_quarantined = [], []
+
+    if workers <= 1:
+        for chunk in tqdm(chunks, desc="Parsing chunks"):
+            results, quarantined = _parse_chunk(chunk)
+            all_results.extend(results)
+            all_quarantined.extend(quarantined)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for results, quarantined in tqdm(executor.map(_parse_chunk, chunks), total=len(chunks), desc="Parsing chunks"):
+                all_results.extend(results)
+                all_quarantined.extend(quarantined)
+
+    paper_affiliations = {}
+    for _, title, author_affils in sorted(all_results, key=lambda r: r[0]):
+        paper_affiliations[title] = author_affils
+    quarantined = [(title, reason) for _, title, reason in sorted(all_quarantined, key=lambda r: r[0])]
+    return paper_affiliations, quarantined
+
+
+def write_quarantine_report(quarantined, path=QUARANTINE_PATH):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"=== QUARANTINED PAPERS ({len(quarantined)}) ===\n\n")
+        for title, reason in quarantined:
+            f.write(f"{title}\t{reason}\n")
+
+
 def normalize_name(name):
     if not name: return ""
     name = name.lower()
@@ -580,17 +684,52 @@ def names_match(name1, name2):
 
 _common_words = {'the', 'a', 'an', 'of', 'in', 'on', 'for', 'and', 'with', 'from', 'to', 'by', 'its', 'their', 'using', 'study', 'new', 'based'}
 
-def match_author_to_affiliations(author_name, paper_title, preprocessed):
+def preprocess_affiliations(paper_affiliations):
+    """{title: {'words': title words, 'authors': {latex_author: affs}}} for title matching."""
+    return {t: {'words': set(normalize_name(t).split()) - _common_words, 'authors': a} for t, a in paper_affiliations.items()}
+
+def matching_papers(paper_title, preprocessed):
+    """Author maps of the parsed papers sharing enough title words with paper_title."""
     title_words1 = set(normalize_name(paper_title).split()) - _common_words
-    if not title_words1: return None
+    if not title_words1: return []
     min_overlap = min(3, len(title_words1))
-    
-    for t, data in preprocessed.items():
-        if len(title_words1 & data['words']) >= min_overlap:
-            for la, affs in data['authors'].items():
-                if names_match(author_name, la): return affs
+    return [data['authors'] for data in preprocessed.values() if len(title_words1 & data['words']) >= min_overlap]
+
+def match_author_to_affiliations(author_name, paper_title, preprocessed, candidates=None):
+    if candidates is None:
+        candidates = matching_papers(paper_title, preprocessed)
+    for authors in candidates:
+        for la, affs in authors.items():
+            if names_match(author_name, la): return affs
     return None
 
+def fill_affiliations(authors, affiliations, paper_title, preprocessed, candidates=None):
+    """
+    Fills the None slots of affiliations in place: parsed matches first, then collaboration /
+    team authors and a single shared affiliation. Returns True if anything changed.
+    """
+    if candidates is None:
+        candidates = matching_papers(paper_title, preprocessed)
+    changed = False
+    for i, (author, affil) in enumerate(zip(authors, affiliations)):
+        if affil is None:
+            new_affs = match_author_to_affiliations(author, paper_title, preprocessed, candidates)
+            if new_affs:
+                affiliations[i] = "; ".join(new_affs) if isinstance(new_affs, list) else new_affs
+                changed = True
+            elif "collaboration" in author.lower() or "team" in author.lower():
+                valid = [a for a in affiliations if a]
+                if valid: 
+                    affiliations[i] = valid[0]
+                    changed = True
+
+    valid_affs = [a for a in affiliations if a]
+    if None in affiliations and len(set(valid_affs)) == 1:
+        shared = valid_affs[0]
+        affiliations[:] = [shared if a is None else a for a in affiliations]
+        changed = True
+    return changed
+
 def update_latex_files(processed_titles, files):
     """
     Rewrites latex files, removing sections corresponding to papers that are marked as done (fully filled).
@@ -643,12 +782,13 @@ def main():
     print("=" * 60)
     
     df = pd.read_csv(CSV_PATH)
-    all_paper_affiliations = {}
-    for f in LATEX_FILES:
-        print(f"Parsing {f}...")
-        all_paper_affiliations.update(parse_filtered_file(f))
+    print(f"Parsing {', '.join(LATEX_FILES)} with {PARSE_WORKERS} worker(s)...")
+    all_paper_affiliations, quarantined = parse_filtered_files_parallel(LATEX_FILES)
+    if quarantined:
+        write_quarantine_report(quarantined)
+        print(f"Quarantined {len(quarantined)} papers (see {QUARANTINE_PATH}).")
     
-    preprocessed = {t: {'words': set(normalize_name(t).split()) - _common_words, 'authors': a} for t, a in all_paper_affiliations.items()}
+    preprocessed = preprocess_affiliations(all_paper_affiliations)
     
     def is_missing(x):
         try:
@@ -667,25 +807,8 @@ def main():
         except: continue
         while len(affiliations) < len(authors): affiliations.append(None)
         
-        changed = False
-        for i, (author, affil) in enumerate(zip(authors, affiliations)):
-            if affil is None:
-                new_affs = match_author_to_affiliations(author, row['title'], preprocessed)
-                if new_affs:
-                    affiliations[i] = "; ".join(new_affs) if isinstance(new_affs, list) else new_affs
-                    changed = True
-                elif "collaboration" in author.lower() or "team" in author.lower():
-                    valid = [a for a in affiliations if a]
-                    if valid: 
-                        affiliations[i] = valid[0]
-                        changed = True
-
-        valid_affs = [a for a in affiliations if a]
-        if None in affiliations and len(set(valid_affs)) == 1:
-            shared = valid_affs[0]
-            affiliations = [shared if a is None else a for a in affiliations]
-            changed = True
-        if changed: df.at[idx, 'affiliations'] = str(affiliations)
+        if fill_affiliations(authors, affiliations, row['title'], preprocessed):
+            df.at[idx, 'affiliations'] = str(affiliations)
 
     df.to_csv(OUTPUT_CSV_PATH, index=False)
     
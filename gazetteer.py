@@ -0,0 +1,295 @@
+"""
+Institution gazetteer: affiliation string -> institution, country and coordinates, no LLM.
+
+The index is built once from datasets/world-universities.csv (country code, name, url) and the
+user-extensible INSTITUTION_ALIASES_CSV (alias, institution, country_code: research institutes,
+acronyms such as INAF / MPIA and spellings the university list lacks). Countries and their
+coordinates come from world_coords.csv through countries.py.
+
+An affiliation ("Department of Astronomy, University of California, Berkeley, CA 94720, USA")
+is split at its commas and resolved in three steps, cheapest first:
+
+1. exact: a part, or two adjacent parts for names that contain a comma, equals a normalized name
+   or alias (accents, case, punctuation and "&"/"and" ignored): one dict lookup each;
+2. acronym: a token of a part is a case-sensitive acronym of the alias table (INAF-Osservatorio...);
+3. fuzzy: names sharing a rare token with a part (token inverted index; "university", "of", ...
+   are too common to propose candidates) are scored by trigram Dice against it, best score
+   wins if at least FUZZY_MIN_SCORE. Both sides are compared in a language-neutral form
+   (Università / Universidad / Universität -> university, "of" / "di" / "degli studi" dropped),
+   and candidates located in another country than the one the affiliation states are skipped.
+
+The country stated in the affiliation wins over the institution's; coordinates are the
+country's (world_coords.csv has no per-institution positions). Results are cached per string,
+so a dataset's ~150k author slots cost one resolution per distinct affiliation.
+
+    gazetteer = load_gazetteer()
+    gazetteer.resolve("MPIA, Königstuhl 17, 69117 Heidelberg, Germany")
+    # {'institution': 'Max Planck Institute for Astronomy', 'country': 'Germany',
+    #  'latitude': 51.17, 'longitude': 10.45, 'match': 'acronym'}
+    gazetteer.resolve_affiliations("...; ...")   # one dict per ';'-separated affiliation
+
+    python gazetteer.py --csv 2025_Data.csv      # adds author_institutions / author_countries
+"""
+
+import argparse
+import ast
+import html
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+import pandas as pd
+
+from countries import COUNTRY_DB_PATH, country_matcher
+
+# ========================
+# CONFIG
+# ========================
+
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+UNIVERSITIES_CSV = os.path.join(DATASETS_DIR, "world-universities.csv")
+INSTITUTION_ALIASES_CSV = os.path.join(DATASETS_DIR, "institution_aliases.csv")
+
+FUZZY_MIN_SCORE = 0.8     # Trigram Dice a fuzzy candidate needs to be accepted
+MAX_TOKEN_SHARE = 0.005   # Tokens in more names than this share never propose candidates
+MIN_PART_CHARS = 4        # Shorter comma parts (zip codes, "CA") are not looked up
+CACHE_SIZE = 2 ** 18      # Distinct affiliation strings remembered per gazetteer
+
+# Last resort when nothing resolves: the first part naming an organisation (institutions.ipynb)
+INSTITUTION_KEYWORDS = ('university', 'institute', 'centre', 'center', 'observatory', 'academy',
+                        'laboratory', 'lab')
+
+# Fuzzy keys: generic words in other languages -> English, filler words dropped
+FUZZY_SYNONYMS = {
+    'universita': 'university', 'universitat': 'university', 'universidad': 'university',
+    'universidade': 'university', 'universite': 'university', 'universiteit': 'university',
+    'uniwersytet': 'university', 'universitet': 'university', 'istituto': 'institute',
+    'instituto': 'institute', 'institut': 'institute', 'osservatorio': 'observatory',
+    'observatorio': 'observatory', 'observatoire': 'observatory', 'sternwarte': 'observatory',
+}
+FUZZY_STOP_WORDS = {'of', 'the', 'and', 'for', 'di', 'de', 'del', 'della', 'degli', 'studi', 'la',
+                    'le', 'des', 'du', 'der', 'fur', 'y', 'e'}
+
+LATEX_MARKUP_RE = re.compile(r'\$[^$]*\$|\\\\|\\[a-zA-Z]+\s*')
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+ACRONYM_TOKEN_RE = re.compile(r'[A-Za-z0-9]+')
+
+
+# ========================
+# NORMALIZATION
+# ========================
+
+def normalize_name(text):
+    """Lowercase ASCII words: accents dropped, '&' -> 'and', punctuation -> spaces."""
+    text = unicodedata.normalize('NFKD', html.unescape(text)).encode('ascii', 'ignore').decode()
+    text = NON_WORD_RE.sub(' ', text.lower().replace('&', ' and ')).strip()
+    return text[4:] if text.startswith('the ') else text
+
+
+def fuzzy_key(normalized):
+    words = (FUZZY_SYNONYMS.get(word, word) for word in normalized.split())
+    return ' '.join(word for word in words if word not in FUZZY_STOP_WORDS)
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def clean_affiliation(text):
+    """An affiliation without HTML entities, LaTeX markers ($^{1}$, \\\\) and stray whitespace."""
+    text = LATEX_MARKUP_RE.sub(' ', html.unescape(text))
+    return re.sub(r'\s+', ' ', text).strip(' .;')
+
+
+# ========================
+# GAZETTEER
+# ========================
+
+class Gazetteer:
+    def __init__(self, institutions, aliases=None, acronyms=None):
+        """
+        institutions: [(name, country)]; aliases: {spelling: index into institutions};
+        acronyms: {case-sensitive acronym: index into institutions}.
+        """
+        self.institutions = list(institutions)
+        self.acronyms = dict(acronyms or {})
+        self.exact = {}
+        for index, (name, _) in enumerate(self.institutions):
+            self.exact.setdefault(normalize_name(name), index)
+        for spelling, index in (aliases or {}).items():
+            self.exact[normalize_name(spelling)] = index
+
+        # Fuzzy spellings (institution index, trigrams) and token -> spellings, rare tokens only
+        self.fuzzy_names = []
+        postings = defaultdict(list)
+        for key, index in self.exact.items():
+            key = fuzzy_key(key)
+            for token in set(key.split()):
+                postings[token].append(len(self.fuzzy_names))
+            self.fuzzy_names.append((index, trigrams(key)))
+        limit = max(1, int(MAX_TOKEN_SHARE * len(self.fuzzy_names)))
+        self.token_index = {token: spellings for token, spellings in postings.items() if len(spellings) <= limit}
+
+        self.country_coords = _country_coords()
+        self.countries = country_matcher()
+        self.resolve = lru_cache(maxsize=CACHE_SIZE)(self._resolve)
+
+    # ---- lookups ----
+
+    def _exact(self, parts):
+        for i, part in enumerate(parts):
+            if i + 1 < len(parts):
+                index = self.exact.get(normalize_name(f'{part}, {parts[i + 1]}'))
+                if index is not None:
+                    return index
+            index = self.exact.get(normalize_name(part))
+            if index is not None:
+                return index
+        return None
+
+    def _acronym(self, parts):
+        for part in parts:
+            for token in ACRONYM_TOKEN_RE.findall(part):
+                if token in self.acronyms:
+                    return self.acronyms[token]
+        return None
+
+    def _fuzzy(self, parts, country=None):
+        best_score, best_index = 0.0, None
+        for part in parts:
+            key = fuzzy_key(normalize_name(part))
+            if len(key) < MIN_PART_CHARS:
+                continue
+            candidates = set()
+            for token in key.split():
+                candidates.update(self.token_index.get(token, ()))
+            grams = trigrams(key)
+            for candidate in candidates:
+                index, other = self.fuzzy_names[candidate]
+                if country and self.institutions[index][1] not in (None, country):
+                    continue
+                score = 2 * len(grams & other) / (len(grams) + len(other))
+                if score > best_score:
+                    best_score, best_index = score, index
+        return best_index if best_score >= FUZZY_MIN_SCORE else None
+
+    def _stated_country(self, affiliation):
+        """The last country named in the affiliation (it normally ends the address)."""
+        found = self.countries.find_all(affiliation)
+        return found[-1] if found else None
+
+    # ---- resolution ----
+
+    def _resolve(self, affiliation):
+        """{'institution', 'country', 'latitude', 'longitude', 'match'} for one affiliation."""
+        affiliation = clean_affiliation(affiliation) if isinstance(affiliation, str) else ''
+        parts = [part.strip() for part in affiliation.split(',') if part.strip()]
+        stated_country = self._stated_country(affiliation)
+        match, index = None, self._exact(parts)
+        if index is not None:
+            match = 'exact'
+        else:
+            index = self._acronym(parts)
+            if index is not None:
+                match = 'acronym'
+            else:
+                index = self._fuzzy(parts, stated_country)
+                match = 'fuzzy' if index is not None else None
+
+        if index is not None:
+            institution, institution_country = self.institutions[index]
+        else:
+            institution = next((part for part in parts if any(k in part.lower() for k in INSTITUTION_KEYWORDS)),
+                               parts[0] if parts else None)
+            institution_country = None
+
+        country = stated_country or institution_country
+        latitude, longitude = self.country_coords.get(country, (None, None))
+        return {'institution': institution, 'country': country, 'latitude': latitude,
+                'longitude': longitude, 'match': match}
+
+    def resolve_affiliations(self, text):
+        """One resolution per ';'-separated affiliation of an author slot."""
+        if not isinstance(text, str):
+            return []
+        return [self.resolve(segment) for segment in html.unescape(text).split(';') if segment.strip()]
+
+    def resolve_series(self, affiliations):
+        """DataFrame (index of affiliations) of the first affiliation of every entry, distinct strings resolved once."""
+        unique = affiliations.dropna().unique()
+        first = {text: (self.resolve_affiliations(text) or [self.resolve('')])[0] for text in unique}
+        return pd.DataFrame([first.get(text, self.resolve('')) for text in affiliations], index=affiliations.index)
+
+
+def _country_coords(path=COUNTRY_DB_PATH):
+    world = pd.read_csv(path, keep_default_na=False)
+    return {row.country: (float(row.latitude), float(row.longitude))
+            for row in world.itertuples() if row.country and row.latitude != ''}
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(universities_path=UNIVERSITIES_CSV, aliases_path=INSTITUTION_ALIASES_CSV,
+                   countries_path=COUNTRY_DB_PATH):
+    """Gazetteer over world-universities.csv and the alias table, built once per set of paths."""
+    world = pd.read_csv(countries_path, keep_default_na=False)
+    code_to_country = {code: name for code, name in zip(world['country_code'], world['country']) if code}
+
+    universities = pd.read_csv(universities_path, header=None, names=['country_code', 'name', 'url'],
+                               keep_default_na=False)
+    institutions = [(name.strip(), code_to_country.get(code))
+                    for code, name in zip(universities['country_code'], universities['name'])]
+    positions = {name: i for i, (name, _) in enumerate(institutions)}
+
+    aliases, acronyms = {}, {}
+    if os.path.exists(aliases_path):
+        table = pd.read_csv(aliases_path, keep_default_na=False)
+        for alias, name, code in zip(table['alias'], table['institution'], table['country_code']):
+            if name not in positions:
+                positions[name] = len(institutions)
+                institutions.append((name, code_to_country.get(code)))
+            if alias.isupper() and ' ' not in alias:
+                acronyms[alias] = positions[name]
+            else:
+                aliases[alias] = positions[name]
+    return Gazetteer(institutions, aliases, acronyms)
+
+
+# ========================
+# MAIN
+# ========================
+
+def parse_list(value):
+    try:
+        parsed = ast.literal_eval(str(value))
+        return parsed if isinstance(parsed, list) else None
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag every author slot with its institution and country")
+    parser.add_argument('--csv', required=True, help="dataset with an affiliations column; updated in place unless --output")
+    parser.add_argument('--output', help="where to write the tagged dataset")
+    args = parser.parse_args()
+
+    gazetteer = load_gazetteer()
+    data = pd.read_csv(args.csv)
+    slots = data['affiliations'].map(parse_list).explode()
+    has_affiliation = slots.map(lambda a: isinstance(a, str))
+    resolved = gazetteer.resolve_series(slots.where(has_affiliation))
+    resolved = resolved.astype(object).where(resolved.notna(), None)
+
+    data['author_institutions'] = resolved['institution'].groupby(level=0).agg(list).reindex(data.index)
+    data['author_countries'] = resolved['country'].groupby(level=0).agg(list).reindex(data.index)
+    data.to_csv(args.output or args.csv, index=False)
+
+    tagged = resolved['country'].notna().sum()
+    print(f"{tagged} of {int(has_affiliation.sum())} author affiliations tagged with a country, "
+          f"match types: {resolved['match'].value_counts().to_dict()} -> {args.output or args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,19 +12,21 @@ from collections import Counter
 from typing import Dict, List, Optional, Tuple, Any, Callable
 from IPython.display import HTML, IFrame
 import base64
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from countries import resolve_country
 
 # GeoJSON URL for country boundaries
 GEOJSON_URL = "http://geojson.xyz/naturalearth-3.3.0/ne_50m_admin_0_countries.geojson"
 
-# Standard country name mapping for GeoJSON compatibility
+# Canonical country names (countries.py resolves aliases such as USA / UK) spelled
+# differently in the GeoJSON
 COUNTRY_NAME_MAPPING = {
-    'USA': 'United States',
-    'United States of America': 'United States',
-    'UK': 'United Kingdom',
     'Czech Republic': 'Czech Rep.',
     'South Korea': 'Korea',
     'Vatican City': 'Vatican',
-    'The Netherlands': 'Netherlands',
 }
 
 # Reverse mapping for GeoJSON -> DataFrame
@@ -121,6 +123,7 @@ class MapManager:
             The normalized country name.
         """
         if for_geojson:
+            name = resolve_country(name) or name
             return COUNTRY_NAME_MAPPING.get(name, name)
         else:
             return GEOJSON_TO_DATA_MAPPING.get(name, name)
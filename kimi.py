@@ -1,3 +1,8 @@
+"""
+Single-paper Kimi extraction: downloads each paper's source, condenses it and queries Kimi.
+For batched, rate-limited runs use predictions/gemini_api_t2.py with BACKEND = "kimi";
+both go through the same OpenAI-compatible backend in predictions/llm_backends.py.
+"""
 import pandas as pd
 import requests
 import tarfile
@@ -5,21 +10,22 @@ import os
 import shutil
 import time
 import re
+import sys
 import json
-from openai import OpenAI
 from tqdm import tqdm
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'predictions'))
+from batch_scheduler import estimate_tokens
+from latex_condenser import CondenseReport, condense_latex
+from llm_backends import make_backend
+from llm_cache import LLMCache, cache_key
+from countries import country_matcher
+
 # API Configuration
 load_dotenv()
-API_KEY = os.getenv("KIMI_API")
 BASE_URL = "https://api.moonshot.ai/v1"
 
-client = OpenAI(
-    api_key=API_KEY,
-    base_url=BASE_URL,
-)
-
 # Configuration
 DATASET_PATH = '2025_Data.csv'
 OUTPUT_CSV = 'kimi_output.csv'
@@ -28,10 +34,22 @@ ARXIV_DIR = 'arxiv_papers'
 START_INDEX = 103
 STOP_INDEX = 1000000  # Run until end or manually stopped
 COUNTRY_DB_PATH = 'world_coords.csv'
+MODEL = "kimi-k2-turbo-preview"
+backend = make_backend({"type": "openai", "model": MODEL, "base_url": BASE_URL, "api_key_env": "KIMI_API"})
+MAX_INPUT_CHARS = 120000
 
-# Global regex patterns (initialized in main)
-SHORT_COUNTRY_PATTERN = None
-LONG_COUNTRY_PATTERN = None
+# Result cache keyed by (model, prompt version, normalized filtered LaTeX), see predictions/llm_cache.py.
+# Bump PROMPT_VERSION whenever the prompt in query_kimi changes.
+LLM_CACHE_PATH = 'llm_cache.jsonl'
+PROMPT_VERSION = "kimi-v2"
+cache = LLMCache(LLM_CACHE_PATH)
+condense_report = CondenseReport()
+
+# Set to the llm_queue.csv written by affiliation_router.py to only send papers the rule parsers missed
+LLM_QUEUE_CSV = None
+
+# Country matcher over names, aliases and ISO codes (countries.py; initialized once in main)
+COUNTRY_MATCHER = None
 
 
 def setup_directories():
@@ -42,44 +60,18 @@ def setup_directories():
     if not os.path.exists(OUTPUT_CSV):
         pd.DataFrame(columns=['original_index', 'arxiv_id', 'extracted_authors', 'extracted_affiliations', 'extracted_countries', 'first_author_country']).to_csv(OUTPUT_CSV, index=False)
 
-def load_country_keywords(csv_path):
-    """Loads country names/codes and returns regex patterns."""
-    country_keywords = set()
-    
-    if os.path.exists(csv_path):
-        try:
-            df = pd.read_csv(csv_path)
-            for _, row in df.iterrows():
-                if pd.notna(row['country']):
-                    country_keywords.add(str(row['country']).strip())
-                if pd.notna(row['country_code']):
-                    country_keywords.add(str(row['country_code']).strip())
-        except Exception as e:
-            print(f"Error loading country DB: {e}")
-    
-    # Manual aliases
-    country_keywords.add("USA")
-    country_keywords.add("UK")
-    country_keywords.add("US") # Ensure US is in if not in CSV
-    
-    short_codes = {k for k in country_keywords if len(k) == 2 and k.isupper()}
-    long_names = {k for k in country_keywords if len(k) > 2 or not k.isupper()}
-    
-    # Regex 1: Short codes - strict case, word boundaries
-    # We explicitly treat them as strict case sensitive keys
-    if short_codes:
-        short_pattern = r'\b(' + '|'.join(re.escape(k) for k in short_codes) + r')\b'
-    else:
-        short_pattern = r'(?!)' # Match nothing
-
-    # Regex 2: Long names - ignore case (handled by re.IGNORECASE flag later), word boundaries
-    if long_names:
-        long_pattern = r'\b(' + '|'.join(re.escape(k) for k in long_names) + r')\b'
-    else:
-        long_pattern = r'(?!)'
-        
-    print(f"Loaded {len(short_codes)} short codes and {len(long_names)} long names.")
-    return short_pattern, long_pattern
+# JSON schema of the answer (sent with the request by the OpenAI-compatible backend)
+KIMI_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "authors": {"type": "array", "items": {"type": "object", "properties": {
+            "name": {"type": "string"},
+            "affiliations": {"type": "array", "items": {"type": "string"}},
+            "countries": {"type": "array", "items": {"type": "string"}},
+        }}},
+        "first_author_countries": {"type": "array", "items": {"type": "string"}},
+    },
+}
 
 def filter_latex_by_country(latex_text):
     """
@@ -87,21 +79,13 @@ def filter_latex_by_country(latex_text):
     Returns 500 lines starting from that match.
     If no match, returns first 10k chars.
     """
-    if not latex_text or (not SHORT_COUNTRY_PATTERN and not LONG_COUNTRY_PATTERN):
+    if not latex_text or not COUNTRY_MATCHER:
         return latex_text[:10000]
 
+    # One scan over the whole text, then map the offset back to its line
+    first = COUNTRY_MATCHER.first(latex_text)
+    first_match_index = latex_text.count('\n', 0, first[1]) if first else -1
     lines = latex_text.split('\n')
-    
-    # Compiled regexes
-    re_short = re.compile(SHORT_COUNTRY_PATTERN)
-    re_long = re.compile(LONG_COUNTRY_PATTERN, re.IGNORECASE)
-    
-    first_match_index = -1
-    
-    for i, line in enumerate(lines):
-        if re_short.search(line) or re_long.search(line):
-             first_match_index = i
-             break
             
     if first_match_index == -1:
         print("No country keywords found. Returning first 10k chars.")
@@ -221,11 +205,8 @@ def cleanup(arxiv_id):
     except Exception as e:
         print(f"Error cleaning up {arxiv_id}: {e}")
 
-def query_kimi(latex_text):
-    """Sends LaTeX content to Kimi API."""
-    
-    # Filter text first
-    filtered_text = filter_latex_by_country(latex_text)
+def query_kimi(filtered_text):
+    """Sends LaTeX content (already condensed or filtered by extract_with_cache) to Kimi API."""
     
     prompt = """
 From this LaTeX extract all the author names and their corresponding affiliations. Preserve the order of the authors and account for the fact that one author can have multiple affiliations. Also, extract the country associated with each affiliation as well as the country ot countires associated with the first author. Give the output as json with the authors their respective affiliations and country and finally a first author country/countries.
@@ -243,18 +224,14 @@ Output format should be a JSON object ONLY:
 }
 """
     # Truncate to avoid context limit if necessary (though filtering should help)
-    truncated_latex = filtered_text[:120000] # Increased limit since we filtered for relevance
+    truncated_latex = filtered_text[:MAX_INPUT_CHARS] # Increased limit since we filtered for relevance
 
     try:
-        completion = client.chat.completions.create(
-            model="kimi-k2-turbo-preview",  # Using user specific model
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts structured data from LaTeX."},
-                {"role": "user", "content": f"{prompt}\n\nLaTeX Content (Filtered):\n{truncated_latex}"}
-            ],
-            temperature=0.3,
+        return backend.generate(
+            "You are a helpful assistant that extracts structured data from LaTeX.",
+            f"{prompt}\n\nLaTeX Content (Filtered):\n{truncated_latex}",
+            KIMI_SCHEMA,
         )
-        return completion.choices[0].message.content
     except Exception as e:
         print(f"API Error: {e}")
         return None
@@ -276,6 +253,25 @@ def parse_kimi_response(response_text):
         print(f"JSON Parse Error: {e}")
         return None
 
+def extract_with_cache(latex_text):
+    """Condenses the LaTeX, then answers from the result cache or queries Kimi. Returns parsed JSON or None."""
+    # Author/affiliation constructs only; the country window is the fallback when there are none
+    filtered_text, stats = condense_latex(latex_text)
+    if not filtered_text:
+        filtered_text = filter_latex_by_country(latex_text)
+    condense_report.add(stats, estimate_tokens(filtered_text[:MAX_INPUT_CHARS]))
+    print(f"Prompt LaTeX: ~{stats['tokens_before']} -> ~{estimate_tokens(filtered_text[:MAX_INPUT_CHARS])} tokens")
+    key = cache_key(MODEL, PROMPT_VERSION, filtered_text[:MAX_INPUT_CHARS])
+    json_data = cache.get(key)
+    if json_data is not None:
+        print("Cache hit, skipping API call.")
+        return json_data
+
+    json_data = parse_kimi_response(query_kimi(filtered_text))
+    if json_data:
+        cache.put(key, json_data)
+    return json_data
+
 def format_for_csv(json_data):
     if not json_data:
         return '[]', '[]', '[]', '[]'
@@ -312,12 +308,13 @@ def format_for_csv(json_data):
     return json.dumps(authors), json.dumps(affiliations), json.dumps(countries), first_author_country
 
 def main():
-    global SHORT_COUNTRY_PATTERN, LONG_COUNTRY_PATTERN
+    global COUNTRY_MATCHER
     setup_directories()
     
     # Load country data
     print("Loading country data...")
-    SHORT_COUNTRY_PATTERN, LONG_COUNTRY_PATTERN = load_country_keywords(COUNTRY_DB_PATH)
+    COUNTRY_MATCHER = country_matcher(codes=True, path=COUNTRY_DB_PATH)
+    print(f"Loaded {len(COUNTRY_MATCHER.codes)} codes and {len(COUNTRY_MATCHER.names)} names.")
     
     print(f"Reading dataset {DATASET_PATH}...")
     df = pd.read_csv(DATASET_PATH)
@@ -355,6 +352,11 @@ def main():
     # Filter out already processed entries
     subset_to_process = subset[~subset.index.isin(processed_indices)]
     
+    if LLM_QUEUE_CSV and os.path.exists(LLM_QUEUE_CSV):
+        routed = set(pd.read_csv(LLM_QUEUE_CSV)['original_index'])
+        subset_to_process = subset_to_process[subset_to_process.index.isin(routed)]
+        print(f"Restricted to {len(subset_to_process)} papers routed to the LLM by {LLM_QUEUE_CSV}")
+    
     if subset_to_process.empty:
         print("No new entries to process.")
         return
@@ -378,9 +380,7 @@ def main():
         
         if latex_text:
             tqdm.write(f"[{index}] Querying API for {arxiv_id}...")
-            response = query_kimi(latex_text)
-            
-            json_data = parse_kimi_response(response)
+            json_data = extract_with_cache(latex_text)
             
             if json_data:
                 # Log JSON
@@ -412,5 +412,8 @@ def main():
         if elapsed < 3:
             time.sleep(3 - elapsed)  # Rate limit
 
+    print(f"Cache: {cache.stats()}")
+    print(f"Condenser: {condense_report.summary()}")
+
 if __name__ == "__main__":
     main()
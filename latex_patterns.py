@@ -0,0 +1,281 @@
+"""
+Precompiled LaTeX cleaning patterns shared by the affiliation parsers.
+
+Every pattern here has been audited for catastrophic backtracking: a repeated group
+never overlaps with the token that follows it, so a single match attempt is linear in
+the input. Inputs that would still be slow for the regex path (very long or with
+unbalanced braces) are routed to a linear brace tokenizer instead.
+
+Run this file directly to fuzz the patterns with worst-case inputs and time them:
+    python latex_patterns.py
+"""
+
+import random
+import re
+import time
+
+# ========================
+# CONFIG
+# ========================
+
+# Inputs longer than this (or with unbalanced braces) skip the regex unwrap loop
+MAX_REGEX_INPUT = 20000
+NESTED_UNWRAP_ITERATIONS = 4
+
+# Commands whose argument is dropped entirely by process_papers.clean_latex_text
+COMMANDS_WITH_ARGS = [
+    'orcidlink', 'orcid', 'thanks', 'email', 'corref', 'cortext', 'fnref', 'tnoteref',
+    'inst', 'label', 'altaffiliation', 'altaffilmark', 'affil', 'titlerunning',
+    'authorrunning', 'emailAdd', 'href', 'url'
+]
+
+
+# ========================
+# PATTERNS
+# ========================
+
+def _alternation(names):
+    # Longest first so 'orcidlink' is tried before 'orcid'
+    return '|'.join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+
+
+# Openers of \cmd[opt]{arg} for all COMMANDS_WITH_ARGS in one alternation. The argument is
+# cut at the first `}` (the DOTALL `.*?\}` of the old per-command loop) by strip_args, which
+# stops as soon as no `}` is left instead of rescanning the tail for every opener.
+COMMANDS_WITH_ARGS_RE = re.compile(
+    r'\\(?:' + _alternation(COMMANDS_WITH_ARGS) + r')(?:\[[^\]{}]*\])?\{'
+)
+
+# Label/markup tags removed from affiliation text (finding_author_rem_11.clean_latex_text)
+TEXT_TAGS_RE = re.compile(r'\\(?:aff|email|thanks|vspace|corref)\{')
+
+# Affiliation markers removed from author names (extract_name_from_author)
+NAME_MARKS_RE = re.compile(r'\\(?:altaffilmark|inst|aff|orcidlink|footnote)\{')
+
+# Superscript markers such as $^{1,2}$ or $^\star$. The old class also contained `$`, which
+# let one match run across several math segments and backtrack on every `$`; the old
+# `\star\dagger` inside the class never matched a backslash, so $^\star$ was left behind.
+SUPERSCRIPT_MARK_RE = re.compile(r'\$\^*\{?(?:[\w\s,\-]|\\(?:star|dagger|ast))*\}?\$')
+LEGACY_SUPERSCRIPT_MARK_RE = re.compile(r'\$[\^]*\{?[\w, \-$\star\dagger]*\}?\$')
+
+# \cmd{...} with up to one level of nested braces (unwrapped iteratively)
+NESTED_CMD_RE = re.compile(r'\\[a-zA-Z]+\{((?:[^{}]|\{[^{}]*\})*)\}')
+CMD_OPEN_RE = re.compile(r'\\[a-zA-Z]+\{')
+BRACE_RE = re.compile(r'[{}]')
+COMMAND_RE = re.compile(r'\\[a-zA-Z]+')
+COMMENT_RE = re.compile(r'%.*$', re.MULTILINE)
+WHITESPACE_RE = re.compile(r'\s+')
+EDGE_PUNCT_RE = re.compile(r'^[\s,;.]+|[\s,;.]+$')
+
+
+# ========================
+# SUBSTITUTIONS
+# ========================
+
+def strip_args(open_re, text):
+    """Removes every `open_re` match together with its argument up to the next `}`."""
+    out, last = [], 0
+    while True:
+        m = open_re.search(text, last)
+        if not m: break
+        close = text.find('}', m.end())
+        if close == -1: break
+        out.append(text[last:m.start()])
+        last = close + 1
+    if not out:
+        return text
+    out.append(text[last:])
+    return ''.join(out)
+
+
+def strip_commands_with_args(text):
+    return strip_args(COMMANDS_WITH_ARGS_RE, text)
+
+
+def strip_text_tags(text):
+    return strip_args(TEXT_TAGS_RE, text)
+
+
+def strip_name_marks(text):
+    return strip_args(NAME_MARKS_RE, text)
+
+
+# ========================
+# AFFILIATION KEYS
+# ========================
+# Shared by the LaTeX parsers (finding_author_rem_11) and the arXiv HTML extractor
+# (new_approach.py), so a marker such as $^{1,2}$ or <sup>1,2</sup> maps the same way in both.
+
+AFFILIATION_KEY_SPLIT_RE = re.compile(r'[,;]')
+
+
+def split_affiliation_keys(marker):
+    """'1,2' / '$^{a; b}$' / '\\star' -> ['1', '2'] / ['a', 'b'] / ['star']"""
+    keys = []
+    for part in AFFILIATION_KEY_SPLIT_RE.split(marker or ''):
+        key = part.replace('\\', '').strip().strip('${}^').strip()
+        if key:
+            keys.append(key)
+    return keys
+
+
+def resolve_affiliation_keys(keys, label_map):
+    """Affiliations of an author's marker keys, in key order; unknown keys are skipped."""
+    return [label_map[k] for k in keys if k in label_map]
+
+
+# ========================
+# BRACE TOKENIZER
+# ========================
+
+def match_braces(text):
+    """Returns {open_index: close_index} for every balanced brace pair in text."""
+    pairs, stack = {}, []
+    for m in BRACE_RE.finditer(text):
+        if m.group() == '{':
+            stack.append(m.start())
+        elif stack:
+            pairs[stack.pop()] = m.start()
+    return pairs
+
+
+def unwrap_commands(text):
+    """
+    Replaces every \\cmd{content} with its content at any nesting depth, in linear time.
+    Commands whose brace is never closed are left untouched.
+    """
+    pairs = match_braces(text)
+    cuts = []
+    for m in CMD_OPEN_RE.finditer(text):
+        open_idx = m.end() - 1
+        if open_idx in pairs:
+            cuts.append((m.start(), m.end()))
+            cuts.append((pairs[open_idx], pairs[open_idx] + 1))
+    if not cuts:
+        return text
+    cuts.sort()
+    out, last = [], 0
+    for start, end in cuts:
+        out.append(text[last:start])
+        last = end
+    out.append(text[last:])
+    return ''.join(out)
+
+
+def is_pathological(text):
+    return len(text) > MAX_REGEX_INPUT or text.count('{') != text.count('}')
+
+
+def unwrap_nested_commands(text, iterations=NESTED_UNWRAP_ITERATIONS):
+    """
+    Unwraps \\cmd{...} groups with the nested-brace regex, falling back to the brace
+    tokenizer for inputs where repeated regex attempts would crawl.
+    """
+    if is_pathological(text):
+        return unwrap_commands(text)
+    for _ in range(iterations):
+        new_text = NESTED_CMD_RE.sub(r'\1', text)
+        if new_text == text: break
+        text = new_text
+    return text
+
+
+# ========================
+# FUZZ / BENCHMARK HARNESS
+# ========================
+
+def _worst_case_inputs(n):
+    """Inputs that used to make the old patterns backtrack, scaled to size n."""
+    return {
+        'unclosed_commands': '\\textbf{a ' * (n // 10),
+        'deep_nesting': '\\a{' * (n // 4) + 'x' + '}' * (n // 4),
+        'dollar_run': '$^{1' + '$ a, ' * (n // 5),
+        'orcid_no_close': '\\orcidlink{0000-' * (n // 16),
+        'long_author_list': ', '.join(f'A. Author$^{{{i}}}$\\inst{{{i}}}' for i in range(n // 25)),
+    }
+
+
+PATTERNS_UNDER_TEST = {
+    'strip_commands_with_args': strip_commands_with_args,
+    'strip_name_marks': strip_name_marks,
+    'SUPERSCRIPT_MARK_RE': lambda s: SUPERSCRIPT_MARK_RE.sub('', s),
+    'LEGACY_SUPERSCRIPT_MARK_RE': lambda s: LEGACY_SUPERSCRIPT_MARK_RE.sub('', s),
+    'unwrap_nested_commands': unwrap_nested_commands,
+    'unwrap_commands': unwrap_commands,
+}
+
+
+def _time(func, text, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(sizes=(2000, 4000, 8000), growth_limit=3.0):
+    """
+    Times every pattern on every worst-case input at increasing sizes.
+    A pattern is flagged when doubling the input more than `growth_limit`-folds the time.
+    Returns a list of (pattern, case, seconds_at_largest, growth, flagged).
+    """
+    rows = []
+    for name, func in PATTERNS_UNDER_TEST.items():
+        for case in _worst_case_inputs(sizes[0]):
+            timings = [_time(func, _worst_case_inputs(n)[case]) for n in sizes]
+            growth = max(b / a for a, b in zip(timings, timings[1:]) if a > 0) if timings[0] > 0 else 0.0
+            rows.append((name, case, timings[-1], growth, growth > growth_limit and timings[-1] > 1e-3))
+    return rows
+
+
+def _content(text):
+    """Text left once commands, braces and whitespace are dropped, as clean_latex_text does."""
+    return re.sub(r'\\[a-zA-Z]+|[{}\s]', '', text)
+
+
+def fuzz_unwrap(trials=2000, seed=0):
+    """
+    Checks that the tokenizer and the regex unwrap loop leave the same text content on random
+    balanced inputs. (The tokenizer also unwraps groups nested deeper than the regex reaches,
+    so the raw strings may differ in leftover commands and braces. Line breaks are followed by
+    a space because the regex loop glues `\\\\` onto unwrapped text to form new commands.)
+    Returns the list of mismatching inputs.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(trials):
+        parts, depth = [], 0
+        for _ in range(rng.randint(1, 30)):
+            r = rng.random()
+            if r < 0.2 and depth < 3:
+                parts.append(rng.choice(['\\textbf{', '\\it{', '{'])); depth += 1
+            elif r < 0.4 and depth > 0:
+                parts.append('}'); depth -= 1
+            else:
+                parts.append(rng.choice(['a', ' ', ',', '$^1$', '\\\\ ', 'Univ.']))
+        text = ''.join(parts) + '}' * depth
+        expected = text
+        while True:
+            new_text = NESTED_CMD_RE.sub(r'\1', expected)
+            if new_text == expected: break
+            expected = new_text
+        if _content(unwrap_commands(text)) != _content(expected):
+            mismatches.append(text)
+    return mismatches
+
+
+def main():
+    print(f"{'pattern':<28} {'input':<18} {'time (s)':>10} {'growth':>8}")
+    for name, case, seconds, growth, flagged in benchmark():
+        flag = "  <-- superlinear" if flagged else ""
+        print(f"{name:<28} {case:<18} {seconds:>10.5f} {growth:>8.2f}{flag}")
+
+    mismatches = fuzz_unwrap()
+    print(f"\nTokenizer fuzz: {len(mismatches)} mismatches")
+    for text in mismatches[:5]:
+        print(f"  {text!r}")
+
+
+if __name__ == "__main__":
+    main()
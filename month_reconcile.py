@@ -0,0 +1,219 @@
+"""
+Month-by-month reconciliation of the dataset against arXiv's own astro-ph listings.
+
+The ground truth is a per-month manifest of pure astro-ph papers (primary subject astro-ph.*;
+cross-lists are left out), fetched once from the monthly /list/astro-ph/YYYY-MM pages and stored
+in MANIFEST_CSV. This replaces the hard-coded target counts in string_checking_names.py,
+old/finalize_dataset.py and analyze_diffs.py. Reconciling a dataset is then an offline set
+difference on arXiv ids:
+
+- missing:    in the manifest, not in the dataset
+- ghost:      in the dataset, not in any manifest month (reason: Year 2024 / Ghost/Extra / Malformed)
+- duplicate:  the same id on more than one row (first row kept)
+- migrated:   in both, but filed under a different month than arXiv lists it in
+
+Outputs: SYNC_REPORT.md, GHOST_CSV, MIGRATION_CSV, MISSING_CSV, STATS_CSV, and with --apply the
+reconciled dataset (ghosts and duplicates dropped, migrated dates moved) at OUTPUT_CSV.
+
+Usage:
+    python month_reconcile.py --fetch 2025-01 2025-02   # (re)fetch manifests for some months
+    python month_reconcile.py --fetch-all               # fetch every month in MONTHS
+    python month_reconcile.py                           # reconcile CSV_PATH offline
+    python month_reconcile.py --csv other.csv --apply
+"""
+
+import argparse
+import os
+import re
+import time
+import urllib.request
+
+import pandas as pd
+
+from arxiv_listing import entry_arxiv_id, iter_entries, parse_listing_html, record_from_entry
+
+# ========================
+# CONFIG
+# ========================
+
+CSV_PATH = "arxiv_papers_copy.csv"
+OUTPUT_CSV = "FINAL_ARXIV_2025.csv"
+MANIFEST_CSV = "datasets/month_manifests.csv"
+GHOST_CSV = "datasets/ghost_and_2024_papers.csv"
+MIGRATION_CSV = "datasets/month_migrations.csv"
+MISSING_CSV = "datasets/months_missing_papers.csv"
+STATS_CSV = "datasets/missing_papers_stats.csv"
+REPORT_PATH = "SYNC_REPORT.md"
+
+MONTHS = [f"2025-{i:02d}" for i in range(1, 13)]
+LISTING_URL = "https://arxiv.org/list/astro-ph/{month}?skip={skip}&show={show}"
+PAGE_SIZE = 2000
+REQUEST_DELAY = 3  # Seconds between listing pages
+
+ARXIV_ID_RE = r'(\d{4}\.\d{4,5})'
+PURE_SUBJECT_RE = re.compile(r'\(astro-ph(?:\.[A-Z]{2})?\)')
+
+
+# ========================
+# MANIFESTS
+# ========================
+
+def iter_month_entries(month):
+    """(dt, dd) of every entry in a monthly listing, paging through it PAGE_SIZE at a time."""
+    skip = 0
+    while True:
+        url = LISTING_URL.format(month=month, skip=skip, show=PAGE_SIZE)
+        with urllib.request.urlopen(url, timeout=60) as response:
+            entries = list(iter_entries(parse_listing_html(response.read())))
+        yield from entries
+        if len(entries) < PAGE_SIZE:
+            return
+        skip += PAGE_SIZE
+        time.sleep(REQUEST_DELAY)
+
+
+def fetch_month_manifest(month):
+    """[(id, month, title)] for every pure astro-ph paper in one monthly listing."""
+    rows = []
+    for dt, dd in iter_month_entries(month):
+        arxiv_id = entry_arxiv_id(dt)
+        record = record_from_entry(dt, dd)
+        if arxiv_id and PURE_SUBJECT_RE.search(record['primary_subject'] or ''):
+            rows.append((arxiv_id, month, record['title']))
+    return rows
+
+
+def load_manifest(path=MANIFEST_CSV):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['id', 'month', 'title'])
+    return pd.read_csv(path, dtype={'id': str, 'month': str})
+
+
+def update_manifest(months, path=MANIFEST_CSV):
+    """Re-fetches the given months and replaces their rows in the stored manifest."""
+    manifest = load_manifest(path)
+    for i, month in enumerate(months):
+        rows = fetch_month_manifest(month)
+        print(f"  {month}: {len(rows)} pure astro-ph papers")
+        manifest = pd.concat([manifest[manifest['month'] != month],
+                              pd.DataFrame(rows, columns=['id', 'month', 'title'])], ignore_index=True)
+        manifest.to_csv(path, index=False)
+        if i < len(months) - 1:
+            time.sleep(REQUEST_DELAY)
+    return manifest
+
+
+# ========================
+# RECONCILE
+# ========================
+
+def reconcile(data, manifest):
+    """
+    Set differences between the dataset and the manifest. Returns a dict of DataFrames:
+    verified, ghost, duplicate, migrated, missing, stats.
+    """
+    ids = data['pdf_link'].astype(str).str.extract(ARXIV_ID_RE, expand=False)
+    months = data['date'].astype(str).str[:7]
+    listed_month = ids.map(manifest.drop_duplicates('id').set_index('id')['month'])
+
+    duplicate_mask = ids.notna() & ids.duplicated(keep='first')
+    ghost_mask = listed_month.isna() & ~duplicate_mask
+    verified_mask = ~ghost_mask & ~duplicate_mask
+    migrated_mask = verified_mask & (months != listed_month)
+
+    ghost = data[ghost_mask].copy()
+    ghost['reason_removed'] = 'Malformed/Other'
+    ghost.loc[months[ghost_mask].str.startswith('2025'), 'reason_removed'] = 'Ghost/Extra (Not in Pure List)'
+    ghost.loc[months[ghost_mask].str.startswith('2024'), 'reason_removed'] = 'Year 2024'
+    duplicate = data[duplicate_mask].copy()
+    duplicate['reason_removed'] = 'Duplicate'
+
+    migrated = pd.DataFrame({'id': ids[migrated_mask], 'from': months[migrated_mask], 'to': listed_month[migrated_mask]})
+    missing = manifest[~manifest['id'].isin(set(ids.dropna()))][['title', 'month', 'id']]
+
+    stats = pd.DataFrame({'month': sorted(manifest['month'].unique())})
+    stats['Target'] = stats['month'].map(manifest['month'].value_counts())
+    stats['Actual'] = stats['month'].map(listed_month[verified_mask].value_counts()).fillna(0).astype(int)
+    stats['Missing_Count'] = stats['month'].map(missing['month'].value_counts()).fillna(0).astype(int)
+    stats['Shift_Count'] = stats['month'].map(migrated['to'].value_counts()).fillna(0).astype(int)
+    stats['Ghost_Count'] = stats['month'].map(months[ghost_mask].value_counts()).fillna(0).astype(int)
+
+    return {
+        'verified': data[verified_mask].assign(date=listed_month[verified_mask] + '-01'),
+        'ghost': ghost,
+        'duplicate': duplicate,
+        'migrated': migrated,
+        'missing': missing,
+        'stats': stats,
+    }
+
+
+def write_report(result, manifest, csv_path, path=REPORT_PATH):
+    removed = len(result['ghost']) + len(result['duplicate'])
+    migration_summary = result['migrated'].groupby(['from', 'to']).size().reset_index(name='count')
+    stats = result['stats']
+    report = f"""# ArXiv Month Reconciliation Report
+
+## Overview
+- **Target Papers (Ground Truth):** {len(manifest):,} across {manifest['month'].nunique()} months
+- **Verified in `{csv_path}`:** {len(result['verified']):,}
+- **Missing from the dataset:** {len(result['missing']):,} (`{MISSING_CSV}`)
+- **Filed under the wrong month:** {len(result['migrated']):,} (`{MIGRATION_CSV}`)
+
+## Cleaning Metrics
+- **Ghost/Duplicate/2024 Papers:** {removed:,} ({len(result['ghost']):,} ghost or other, {len(result['duplicate']):,} duplicate)
+- **Breakdown of removals saved to:** `{GHOST_CSV}`
+
+## Per Month
+```
+{stats.to_string(index=False)}
+```
+
+## Migrations
+```
+{migration_summary.to_string(index=False) if len(migration_summary) else 'None'}
+```
+"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the dataset against arXiv's monthly astro-ph listings")
+    parser.add_argument('--csv', default=CSV_PATH, help="dataset to reconcile")
+    parser.add_argument('--fetch', nargs='+', metavar='YYYY-MM', help="(re)fetch the manifest for these months")
+    parser.add_argument('--fetch-all', action='store_true', help="(re)fetch the manifest for every month in MONTHS")
+    parser.add_argument('--apply', action='store_true', help=f"write the reconciled dataset to {OUTPUT_CSV}")
+    args = parser.parse_args()
+
+    months_to_fetch = MONTHS if args.fetch_all else args.fetch
+    if months_to_fetch:
+        print(f"Fetching manifests for {len(months_to_fetch)} month(s)...")
+        manifest = update_manifest(months_to_fetch)
+    else:
+        manifest = load_manifest()
+    if manifest.empty:
+        print(f"No manifest at {MANIFEST_CSV}; run with --fetch-all first.")
+        return
+
+    data = pd.read_csv(args.csv)
+    result = reconcile(data, manifest)
+
+    pd.concat([result['ghost'], result['duplicate']]).to_csv(GHOST_CSV, index=False)
+    result['migrated'].to_csv(MIGRATION_CSV, index=False)
+    result['missing'].to_csv(MISSING_CSV, index=False)
+    result['stats'].to_csv(STATS_CSV, index=False)
+    write_report(result, manifest, args.csv)
+
+    print(result['stats'].to_string(index=False))
+    print(f"Verified {len(result['verified'])}, missing {len(result['missing'])}, ghost {len(result['ghost'])}, "
+          f"duplicate {len(result['duplicate'])}, migrated {len(result['migrated'])} -> {REPORT_PATH}")
+
+    if args.apply:
+        final_df = result['verified'].sort_values(by='date', kind='stable').reset_index(drop=True)
+        final_df.to_csv(OUTPUT_CSV, index=False)
+        print(f"Wrote {len(final_df)} papers to {OUTPUT_CSV} (missing papers still need to be fetched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,158 @@
+"""
+Affiliation extraction from arXiv's HTML (LaTeXML) renderings.
+
+Pages are fetched concurrently (CONCURRENCY workers sharing one RateLimiter from
+predictions/batch_scheduler) and kept gzip-compressed in PAGE_CACHE_DIR, so reruns and parser
+changes never refetch. The unversioned /html/{id} URL serves the latest version, and the version
+is read from the final URL (or the page's own links), so there is no v1-then-retry round trip.
+Papers without an HTML rendering are remembered as well.
+
+Only the front matter (everything before the abstract) is parsed, with lxml when installed.
+<sup> affiliation keys are split and resolved with the same latex_patterns helpers the LaTeX
+parsers use.
+"""
+
+import asyncio
+import gzip
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
-import time
+import sys
 import ast
 import re
 from tqdm import tqdm
 import os
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'predictions'))
+from batch_scheduler import RateLimiter
+from latex_patterns import resolve_affiliation_keys, split_affiliation_keys
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# ========================
+# CONFIG
+# ========================
+
+INPUT_FILE = 'test_filled_11.csv'
+OUTPUT_FILE = 'test_filled_12.csv'
+REPORT_FILE = 'missing_affiliations_report.txt'
+
+HTML_URL = "https://arxiv.org/html/{}"  # Unversioned: arXiv serves the latest version
+PAGE_CACHE_DIR = "html_cache"
+CONCURRENCY = 4
+REQUESTS_PER_MINUTE = 60
+MAX_RETRIES = 3
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+# The author/affiliation block ends where the abstract or the first section starts
+FRONT_MATTER_END_RE = re.compile(r'<div[^>]*class="ltx_abstract|<section', re.IGNORECASE)
+
+
+# ========================
+# PAGE CACHE
+# ========================
+
+class PageCache:
+    """
+    gzip pages under PAGE_CACHE_DIR as {id}v{version}.html.gz; an empty {id}.none file marks
+    a paper arXiv has no HTML rendering for.
+    """
+
+    def __init__(self, root=PAGE_CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.versions, self.missing = {}, set()
+        for name in os.listdir(root):
+            m = re.fullmatch(r'(.+?)v(\d+)\.html\.gz', name)
+            if m:
+                self.versions[m.group(1)] = max(self.versions.get(m.group(1), 0), int(m.group(2)))
+            elif name.endswith('.none'):
+                self.missing.add(name[:-len('.none')])
+
+    def __contains__(self, arxiv_id):
+        return arxiv_id in self.versions or arxiv_id in self.missing
+
+    def get(self, arxiv_id):
+        """Decoded HTML of the latest cached version, or None."""
+        if arxiv_id not in self.versions:
+            return None
+        path = os.path.join(self.root, f"{arxiv_id}v{self.versions[arxiv_id]}.html.gz")
+        with gzip.open(path, 'rb') as f:
+            return f.read().decode('utf-8', errors='replace')
+
+    def put(self, arxiv_id, version, content):
+        path = os.path.join(self.root, f"{arxiv_id}v{version}.html.gz")
+        with gzip.open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+        self.versions[arxiv_id] = max(self.versions.get(arxiv_id, 0), version)
+
+    def mark_missing(self, arxiv_id):
+        open(os.path.join(self.root, f"{arxiv_id}.none"), 'w').close()
+        self.missing.add(arxiv_id)
+
+
+# ========================
+# FETCHER
+# ========================
+
+def page_version(arxiv_id, final_url, content):
+    """Version served for an unversioned request: from the redirect target, else the page's links."""
+    m = re.search(re.escape(arxiv_id) + r'v(\d+)', final_url or '')
+    if not m:
+        m = re.search(rb'arxiv\.org/(?:html|abs|pdf)/' + re.escape(arxiv_id).encode() + rb'v(\d+)', content[:200000])
+    return int(m.group(1)) if m else 0
+
+
+async def fetch_page(session, limiter, cache, arxiv_id):
+    for _ in range(MAX_RETRIES):
+        await limiter.acquire(0)
+        try:
+            response = await asyncio.to_thread(session.get, HTML_URL.format(arxiv_id), headers=HEADERS, timeout=60)
+        except requests.RequestException:
+            continue
+        if response.status_code == 404:
+            cache.mark_missing(arxiv_id)
+            return
+        if response.status_code in (429, 503):
+            limiter.pause(int(response.headers.get('Retry-After') or 30))
+            continue
+        if response.status_code == 200:
+            cache.put(arxiv_id, page_version(arxiv_id, response.url, response.content), response.content)
+        return
+
+
+async def fetch_pages(arxiv_ids, cache):
+    """Fetches every uncached id with CONCURRENCY workers under one REQUESTS_PER_MINUTE limit."""
+    session = requests.Session()
+    limiter = RateLimiter(REQUESTS_PER_MINUTE, float('inf'))
+    pending = iter(arxiv_ids)
+    pbar = tqdm(total=len(arxiv_ids), desc="Fetching HTML")
+
+    async def worker():
+        for arxiv_id in pending:
+            await fetch_page(session, limiter, cache, arxiv_id)
+            pbar.update(1)
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    pbar.close()
+
+
+# ========================
+# PARSER
+# ========================
+
+def front_matter(html_content):
+    if isinstance(html_content, bytes):
+        html_content = html_content.decode('utf-8', errors='replace')
+    m = FRONT_MATTER_END_RE.search(html_content)
+    return html_content[:m.start()] if m else html_content
+
+
 def clean_text(text):
     if not text:
         return ""
@@ -97,7 +243,7 @@ def get_affiliations_map(soup):
                         pass
                 
                 # Reset
-                keys = [marker]
+                keys = split_affiliation_keys(marker) or [marker]
                 # Handle comma separated keys in one sup? e.g. "1,2"? usually "1" then "," then "2"
                 # But in the specific file 2501.13056, the sup id was "1"
                 # If the marker is "1,2", we might need to split.
@@ -128,7 +274,7 @@ def get_affiliations_map(soup):
     return aff_map, unmapped_affs
 
 def parse_html_for_affiliations(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = BeautifulSoup(front_matter(html_content), HTML_PARSER)
     
     authors = []
     
@@ -155,11 +301,9 @@ def parse_html_for_affiliations(html_content):
         auth_keys = []
         for sup in sups:
             # Get text, split by comma
-            t = clean_text(sup.get_text())
             # Split "1,*" -> ["1", "*"]
             # Split "2,4,5" -> ["2", "4", "5"]
-            parts = [x.strip() for x in re.split(r'[,;]', t) if x.strip()]
-            auth_keys.extend(parts)
+            auth_keys.extend(split_affiliation_keys(clean_text(sup.get_text())))
             
             # Remove sup text from full_name to clean it?
             # It's hard to do cleanly on the string.
@@ -167,10 +311,7 @@ def parse_html_for_affiliations(html_content):
             # We don't need to perfect the name, just map the index if possible.
         
         # Match keys to aff_map
-        my_affs = []
-        for k in auth_keys:
-            if k in aff_map:
-                my_affs.append(aff_map[k])
+        my_affs = resolve_affiliation_keys(auth_keys, aff_map)
                 
         # If no keys, or keys not found (maybe they are unmapped?)
         if not my_affs and unmapped_affs:
@@ -202,10 +343,16 @@ def get_row_affiliations(row_affs_str):
     except:
         return []
 
+def get_arxiv_id(pdf_link):
+    # arxiv.org/pdf/2501.12345 -> 2501.12345
+    match = re.search(r'(\d{4}\.\d{5})', str(pdf_link))
+    return match.group(0) if match else None
+
+
 def main():
-    input_file = 'test_filled_11.csv'
-    output_file = 'test_filled_12.csv'
-    report_file = 'missing_affiliations_report.txt'
+    input_file = INPUT_FILE
+    output_file = OUTPUT_FILE
+    report_file = REPORT_FILE
     
     print(f"Reading {input_file}...")
     df = pd.read_csv(input_file)
@@ -228,36 +375,28 @@ def main():
             
     print(f"Found {len(indices_to_process)} papers with missing affiliations.")
     
+    # Fetch every page not already cached (concurrently, rate limited)
+    cache = PageCache()
+    arxiv_ids = {idx: get_arxiv_id(df.at[idx, 'pdf_link']) for idx in indices_to_process}
+    to_fetch = sorted({i for i in arxiv_ids.values() if i and i not in cache})
+    print(f"{len(arxiv_ids) - len(to_fetch)} papers already cached, fetching {len(to_fetch)}...")
+    if to_fetch:
+        asyncio.run(fetch_pages(to_fetch, cache))
+
     # Process
     processed_count = 0
     updated_count = 0
     
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-    
     for idx in tqdm(indices_to_process):
-        # Rate limit
-        time.sleep(15)
-        
         try:
-            pdf_link = str(df.at[idx, 'pdf_link'])
-            # Extract ID: arxiv.org/pdf/2501.12345 -> 2501.12345
-            match = re.search(r'(\d{4}\.\d{5})', pdf_link)
-            if not match:
-                continue
-            
-            arxiv_id = match.group(0)
-            target_url = f"https://arxiv.org/html/{arxiv_id}v1"
-            
-            response = requests.get(target_url, headers=headers)
-            if response.status_code == 404:
-                # Try without version? "https://arxiv.org/html/{arxiv_id}" auto-redirects usually but prompt said v1
-                # If v1 fails, skip as per prompt instructions ("if it doesn't exist skip it")
-                continue
-            if response.status_code != 200:
+            arxiv_id = arxiv_ids[idx]
+            html = cache.get(arxiv_id) if arxiv_id else None
+            if html is None:
+                # No HTML rendering for this paper (or the fetch failed): skip it
                 continue
                 
             # Parse
-            extracted = parse_html_for_affiliations(response.content)
+            extracted = parse_html_for_affiliations(html)
             
             if not extracted:
                 continue
@@ -12,8 +12,12 @@ from tqdm import tqdm
 from IPython.display import display, Latex
 from bs4 import BeautifulSoup
 import re
-import PyPDF2
-import io
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from arxiv_listing import parse_listing_html, find_h3, new_submission_count, iter_listing_records
+from comment_metrics import normalize_journals
+from pdf_analysis import (FRONT_MATTER_PAGES, KEYWORD_PAGES, PdfTextCache, compute_pdf_metrics,
+                          merge_pdf_metrics, page_texts, pdf_metrics)
 os.environ['SSL_CERT_FILE'] = certifi.where()
 
 
@@ -23,6 +27,7 @@ class ArxivDataframe:
         self.subject = subject.lower()
         self.client = arxiv.Client()
         self.bs4_client = BeautifulSoup
+        self.pdf_cache = PdfTextCache()
     
     def _retrieve_html(self):
         base_url = f'https://arxiv.org/list/{self.subject}/new'
@@ -44,11 +49,11 @@ class ArxivDataframe:
         return df
     
     def _clean_journal(self, df):
-        """Clean journal information"""
-        df['submitted_journal'] = df['submitted_journal'].str.split(r'[,;:.]').str[0]
+        """Canonical journal names (datasets/journals.csv)"""
+        df['submitted_journal'] = normalize_journals(df['submitted_journal'])
         return df
     
-    def _extract_affiliations(self, pdf_reader, authors, max_pages=2):
+    def _extract_affiliations(self, texts, authors, max_pages=2):
         """
         Extract author affiliations from PDF using a simplified approach with better logging
         """
@@ -60,9 +65,9 @@ class ArxivDataframe:
         try:
             # Get text from first pages
             full_text = ""
-            for page_num in range(min(max_pages, len(pdf_reader.pages))):
+            for page_num in range(min(max_pages, len(texts))):
                 try:
-                    page_text = pdf_reader.pages[page_num].extract_text()
+                    page_text = texts[page_num]
                     full_text += page_text + "\n"
                     print(f"Successfully read page {page_num + 1}")
                 except Exception as e:
@@ -146,64 +151,15 @@ class ArxivDataframe:
             print(f"Error in affiliation extraction: {str(e)}")
             return [None] * len(authors)
         
-    def _extract_pdf_metrics(self, pdf_reader):
-        """Extract metrics (pages, figures, tables) from PDF"""
-        metrics = {
-            'pages': len(pdf_reader.pages),
-            'figures': 0,
-            'tables': 0
-        }
-        
-        for page in pdf_reader.pages:
-            text = page.extract_text()
-            # Find figures
-            figure_numbers = re.findall(r'(?i)(?:Figure|Fig.|Figure.|Fig})\s+(\d+)', text)
-            if figure_numbers:
-                metrics['figures'] = max(metrics['figures'], max(map(int, figure_numbers)))
-            
-            # Find tables
-            table_numbers = re.findall(r'(?i)(?:Table|Table.})\s+(\d+)', text)
-            if table_numbers:
-                metrics['tables'] = max(metrics['tables'], max(map(int, table_numbers)))
-                
-        return metrics
+    def _extract_pdf_metrics(self, texts):
+        """Extract metrics (pages, figures, tables) from the per-page PDF text"""
+        return pdf_metrics(texts)
     
-    def _process_pdf(self, pdf_link, current_metrics=None, authors=None):
-        """Process PDF to extract metrics, keywords, and affiliations"""
-        try:
-            pdf_response = libreq.urlopen('https://' + pdf_link)
-            pdf_file = pdf_response.read()
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_file))
-            
-            # Extract metrics if needed
-            metrics = self._extract_pdf_metrics(pdf_reader)
-            
-            # Only update metrics that are currently NaN
-            if current_metrics:
-                for key in metrics:
-                    if pd.isna(current_metrics[key]):
-                        current_metrics[key] = metrics[key]
-                metrics = current_metrics
-            
-            # Extract keywords
-            keywords = self._extract_keywords(pdf_reader)
-            
-            # Extract affiliations if authors are provided
-            affiliations = None
-            if authors:
-                affiliations = self._extract_affiliations(pdf_reader, authors)
-            
-            return {**metrics, 'keywords': keywords, 'affiliations': affiliations}
-            
-        except Exception as e:
-            print(f"Error processing PDF {pdf_link}: {str(e)}")
-            return None
-        
-    def _extract_keywords(self, pdf_reader, max_pages=5):
+    def _extract_keywords(self, texts, max_pages=5):
         """
         Extract keywords from PDF with improved accuracy and efficiency across subjects
         Args:
-            pdf_reader: PyPDF2.PdfReader object
+            texts: per-page PDF text (pdf_analysis.page_texts)
             max_pages: Maximum number of pages to search (default: 5, as keywords are usually at the start)
         Returns:
             list: Extracted keywords
@@ -227,10 +183,10 @@ class ArxivDataframe:
         
         try:
             # Only search first few pages for efficiency
-            pages_to_search = min(max_pages, len(pdf_reader.pages))          
+            pages_to_search = min(max_pages, len(texts))          
             for page_num in range(pages_to_search):
                 try:
-                    text = pdf_reader.pages[page_num].extract_text()
+                    text = texts[page_num]
                     if not text:
                         continue
                         
@@ -294,74 +250,6 @@ class ArxivDataframe:
             print(f"Error in keyword extraction: {str(e)}")
             return []
     
-    def _metadata(self, xml_part):
-        soup = self.bs4_client(xml_part, 'html.parser')
-        title_tag = soup.find('div', class_='list-title mathjax')
-        title = title_tag.get_text(strip=True).replace('Title:', '').strip() if title_tag else None
-
-        # abstract
-        abstract_tag = soup.find('p', class_='mathjax')
-        abstract = abstract_tag.get_text(strip=True) if abstract_tag else None
-
-        # authors
-        authors_section = soup.find('div', class_='list-authors')
-        authors = [author.get_text(strip=True) for author in authors_section.find_all('a')] if authors_section else []
-
-        # comments
-        comments_tag = soup.find('div', class_='list-comments mathjax')
-        comments = comments_tag.get_text(strip=True).replace('Comments:', '').strip() if comments_tag else ''
-        
-        # figures, pages, tables
-        figures_match = re.search(r'(\d+)\s+figures', comments)
-        figures = int(figures_match.group(1)) if figures_match else None
-        pages_match = re.search(r'(\d+)\s+pages', comments)
-        pages = int(pages_match.group(1)) if pages_match else None
-        tables_match = re.search(r'(\d+)\s+table[s]?', comments)
-        tables = int(tables_match.group(1)) if tables_match else None
-
-        # PDF link
-        pdf_tag = soup.find('a', title='Download PDF')
-        pdf_link = pdf_tag['href'] if pdf_tag else None
-
-        # primary subject
-        primary_subject_tag = soup.find('span', class_='primary-subject')
-        primary_subject = primary_subject_tag.get_text(strip=True) if primary_subject_tag else None
-
-        # secondary subjects
-        subjects_section = soup.find('div', class_='list-subjects')
-        if subjects_section:
-            subjects_text = subjects_section.get_text(strip=True)
-            subjects_split = subjects_text.split(';')
-            secondary_subjects = [subject.strip() for subject in subjects_split[1:]] if len(subjects_split) > 1 else None
-        else:
-            secondary_subjects = None
-
-        # journal
-        submitted_journal = None
-        if comments:
-            for prefix in ['Submitted to ', 'Accepted to ', 'Accepted for publication in ', 'Accepted by ', 'Submitted by ']:
-                if prefix in comments:
-                    submitted_journal = comments.split(prefix)[-1]
-                    break
-
-        # published
-        published_tag = soup.find('div', class_='list-journal-ref')
-        published_journal = published_tag.get_text(strip=True).replace('Journal-ref:', '').strip() if published_tag else None
-
-        return {
-            'title': title,
-            'abstract': abstract,
-            'authors': authors,
-            'figures': figures,
-            'pages': pages,
-            'tables': tables,
-            'pdf_link': f'arxiv.org{pdf_link}' if pdf_link else None,
-            'primary_subject': primary_subject,
-            'secondary_subjects': secondary_subjects,
-            'submitted_journal': submitted_journal,
-            'published_journal': published_journal
-        }
-    
     def process_dataframe(self, df):
         """Process the dataframe to add all additional features"""
         # Clean subjects and journal information
@@ -372,34 +260,25 @@ class ArxivDataframe:
         df['keywords'] = None
         df['affiliations'] = None
     
-        # Process each paper
-        for i in tqdm(range(len(df)), desc='Processing PDFs, for metrics, keywords and affiliations'):
-            current_metrics = {
-                'pages': df['pages'][i],
-                'figures': df['figures'][i],
-                'tables': df['tables'][i]
-            }
-            
-            # Only process PDF if we're missing any data
-            if (pd.isna(current_metrics['pages']) or 
-                pd.isna(current_metrics['figures']) or 
-                pd.isna(current_metrics['tables']) or 
-                pd.isna(df['keywords'][i]) or
-                pd.isna(df['affiliations'][i])):
-                
-                pdf_data = self._process_pdf(
-                    df['pdf_link'][i], 
-                    current_metrics,
-                    authors=df['authors'][i] if 'authors' in df else None
-                )
-                
-                if pdf_data:
-                    df.at[i, 'pages'] = pdf_data['pages']
-                    df.at[i, 'figures'] = pdf_data['figures']
-                    df.at[i, 'tables'] = pdf_data['tables']
-                    df.at[i, 'keywords'] = pdf_data['keywords']
-                    if pdf_data['affiliations']:
-                        df.at[i, 'affiliations'] = pdf_data['affiliations']
+        # Text extraction and metrics across a process pool, merged back in one step; body
+        # pages are only extracted for papers whose comments did not give the counts
+        needs_metrics = df[['pages', 'figures', 'tables']].isna().any(axis=1)
+        metrics = compute_pdf_metrics(df['pdf_link'], full=needs_metrics, cache_root=self.pdf_cache.root)
+        df = merge_pdf_metrics(df, metrics, columns=('pages', 'figures', 'tables'))
+        
+        # Keywords and affiliations from the front matter, now read from the page-text cache
+        failed = metrics['error'].notna().to_numpy()
+        for i in tqdm(df.index[~failed], desc='Processing PDFs, for keywords and affiliations'):
+            try:
+                texts = page_texts(df['pdf_link'][i], self.pdf_cache, stop=KEYWORD_PAGES)
+            except Exception as e:
+                print(f"Error processing PDF {df['pdf_link'][i]}: {str(e)}")
+                continue
+            df.at[i, 'keywords'] = self._extract_keywords(texts, max_pages=KEYWORD_PAGES)
+            if 'authors' in df:
+                affiliations = self._extract_affiliations(texts, df['authors'][i], max_pages=FRONT_MATTER_PAGES)
+                if affiliations:
+                    df.at[i, 'affiliations'] = affiliations
         
         return df
     
@@ -407,46 +286,24 @@ class ArxivDataframe:
         """Construct and process the complete dataframe"""
         # Get initial data
         html = self._retrieve_html()
-        soup = self.bs4_client(html, 'html.parser')
-        
-        h3_tag = soup.find('h3', string=lambda x: x and 'New submissions' in x)
-        
-        if not h3_tag:
+        soup = parse_listing_html(html)
+
+        if not find_h3(soup, 'New submissions'):
             print("New submissions header not found")
             return pd.DataFrame()
-            
-        try:
-            number_of_papers = int(h3_tag.string.split('(')[1].split()[1])
-            print(f"Number of papers: {number_of_papers}")
-        except (IndexError, ValueError):
+
+        number_of_papers = new_submission_count(soup)
+        if number_of_papers is None:
             print("Could not extract number of papers")
             return pd.DataFrame()
-            
-        # Get metadata for all papers
-        items = soup.find_all('a', attrs={'name': True})
-        if not items:
+        print(f"Number of papers: {number_of_papers}")
+
+        # Get metadata for all papers from their <dt>/<dd> pairs
+        all_metadata = list(tqdm(iter_listing_records(soup, number_of_papers), total=number_of_papers, desc='Processing Papers'))
+        if not all_metadata:
             print("No paper items found")
             return pd.DataFrame()
-            
-        all_metadata = []
-        
-        # Process papers except the last one
-        for i in tqdm(range(number_of_papers-1),desc='Processing Papers'):
-            start = items[i]
-            end = items[i + 1]
-            start_index = str(soup).find(str(start))
-            end_index = str(soup).find(str(end))
-            xml_part = str(soup)[start_index:end_index]
-            metadata = self._metadata(xml_part)
-            all_metadata.append(metadata)
-            
-        # Process the last paper
-        last_item = items[-1]
-        start_index = str(soup).find(str(last_item))
-        xml_part = str(soup)[start_index:]
-        metadata = self._metadata(xml_part)
-        all_metadata.append(metadata)
-        
+
         # Create and process dataframe
         df = pd.DataFrame(all_metadata) 
         return self.process_dataframe(df)
\ No newline at end of file
@@ -1,10 +1,12 @@
-import fitz
 import requests
 import io
 import json
 import google.generativeai as genai
 import os
+import sys
 import dotenv
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pdf_analysis import FRONT_MATTER_PAGES, extract_page_texts
 
 dotenv.load_dotenv()
 
@@ -30,12 +32,8 @@ def download_arxiv_pdf(url):
 
 def extract_text_from_stream(stream):
     try:
-        doc = fitz.open(stream=stream, filetype="pdf")
-        text = ""
-        for i in range(min(2, len(doc))):
-            text += doc[i].get_text()
-        doc.close()
-        return text
+        _, texts = extract_page_texts(stream.getvalue(), stop=FRONT_MATTER_PAGES)
+        return "".join(texts[i] for i in sorted(texts))
     except Exception as e:
         return f"Extraction Error: {e}"
 
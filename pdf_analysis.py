@@ -0,0 +1,413 @@
+"""
+Single-pass PDF analysis: pages, figures, tables and keywords from one download.
+
+Each of a PDF's pages is extracted at most once, lazily: consumers ask PdfTextCache for a page
+range, and only pages nobody has asked for before are extracted. Page texts are stored
+zlib-compressed in PDF_TEXT_CACHE_DIR and read back through a memory map, so metric jobs never
+re-run extraction and front-matter jobs (keywords, affiliations) never touch body pages. The
+PDF itself is deleted once the requested pages are extracted; the rare later request for other
+pages downloads it again. Text extraction uses PyMuPDF (fitz, as in old/engine.py) when installed,
+which is many times faster than PyPDF2; PyPDF2 is the fallback.
+
+    cache = PdfTextCache()
+    front = page_texts('arxiv.org/pdf/2501.00001', cache, stop=FRONT_MATTER_PAGES)
+    texts = page_texts('arxiv.org/pdf/2501.00001', cache)   # re-downloads, extracts pages 2.. only
+    metrics = pdf_metrics(texts)         # {'pages', 'figures', 'tables'}
+    keywords = extract_keywords(texts[:KEYWORD_PAGES])
+
+For many papers, compute_pdf_metrics runs extraction across a process pool and returns one
+typed table, which merge_pdf_metrics writes into the dataset in a single vectorized step:
+
+    python pdf_analysis.py --csv 2025_Data.csv --pdf-dir "/Volumes/T7 Shield/arXiv 2025"
+
+Used by missing_days.py, script2.py and old/arxiv_dataframe.py.
+"""
+
+import argparse
+import io
+import json
+import mmap
+import os
+import re
+import urllib.request
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from tqdm import tqdm
+
+from comment_metrics import COUNT_COLUMNS, backfill_from_comments
+
+try:
+    import fitz
+except ImportError:
+    fitz = None
+    import PyPDF2
+
+# ========================
+# CONFIG
+# ========================
+
+PDF_TEXT_CACHE_DIR = "pdf_text_cache"
+DOWNLOAD_TIMEOUT = 60
+FRONT_MATTER_PAGES = 2  # Title, authors and affiliations
+KEYWORD_PAGES = 5       # Keywords / subject headings sit in the front matter
+
+# Parallel metrics (set METRIC_WORKERS = 1 to run serially in this process)
+METRIC_WORKERS = os.cpu_count() or 1
+METRIC_CHUNK_SIZE = 32  # PDFs sent to a worker at a time
+METRIC_COLUMNS = {
+    'arxiv_id': 'object',
+    'pages': 'Int64',
+    'figures': 'Int64',
+    'tables': 'Int64',
+    'keywords': 'object',
+    'error': 'object',
+}
+
+FIGURE_NUMBER_RE = re.compile(r'(?i)(?:Figure|Fig.|Figure.|Fig})\s+(\d+)')
+TABLE_NUMBER_RE = re.compile(r'(?i)(?:Table|Table.})\s+(\d+)')
+KEYWORDS_RE = re.compile(
+    r'(?i)(?:keyword[s]?|Uniﬁed Astronomy Thesaurus concepts?|key words?|Key words?|Subject headings)'
+    r'[:.]?\s*(.*?)\s*(?=(?:[.;]|\n|$))', re.DOTALL)
+KEYWORD_SPLIT_RE = re.compile(r'[;,\n]')
+WHITESPACE_RE = re.compile(r'\s+')
+KEYWORD_STOP_PHRASES = ['1. Introduction', '1 Introduction']
+
+
+# ========================
+# TEXT EXTRACTION
+# ========================
+
+def get_arxiv_id(pdf_link):
+    match = re.search(r'(\d{4}\.\d{4,5}(?:v\d+)?)', str(pdf_link))
+    return match.group(1) if match else None
+
+
+def download_pdf(pdf_link):
+    url = pdf_link if pdf_link.startswith(('http://', 'https://')) else 'https://' + pdf_link
+    with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+        return response.read()
+
+
+def read_pdf(source):
+    """Bytes of a local PDF path, or of a PDF link (downloaded)."""
+    if os.path.isfile(source):
+        with open(source, 'rb') as f:
+            return f.read()
+    return download_pdf(source)
+
+
+def _page_range(start, stop, page_count):
+    return range(start, page_count if stop is None else min(stop, page_count))
+
+
+def extract_page_texts(pdf_bytes, start=0, stop=None, skip=()):
+    """
+    (page_count, {page: text}) for 0-based pages start..stop-1 (to the end when stop is None)
+    other than those in skip, opening the PDF once. Pages that fail to extract are ''.
+    """
+    texts = {}
+    if fitz is not None:
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+            page_count = doc.page_count
+            for i in _page_range(start, stop, page_count):
+                if i not in skip:
+                    try:
+                        texts[i] = doc[i].get_text()
+                    except Exception:
+                        texts[i] = ''
+        return page_count, texts
+    pages = PyPDF2.PdfReader(io.BytesIO(pdf_bytes)).pages
+    for i in _page_range(start, stop, len(pages)):
+        if i not in skip:
+            try:
+                texts[i] = pages[i].extract_text() or ''
+            except Exception:
+                texts[i] = ''
+    return len(pages), texts
+
+
+class PdfTextCache:
+    """
+    Per-page PDF text under PDF_TEXT_CACHE_DIR, keyed by arXiv id and filled lazily: a page is
+    extracted the first time some consumer asks for it and never again. For paper <id>:
+
+        <id>.pages   zlib-compressed page texts, appended as pages are extracted
+        <id>.json    {"page_count": N, "pages": {"<page>": [offset, length]}}
+        <id>.pdf     the downloaded PDF, kept only until the requested pages are extracted
+
+    Reads memory-map <id>.pages and decompress only the requested pages, so a front-matter
+    job reading pages 0-1 never touches (or extracts) the body of the paper. Downloads are
+    deleted after every extraction, front-matter-only ones included, so the cache holds page
+    texts only; asking for pages not extracted yet downloads the PDF again.
+    """
+
+    def __init__(self, root=PDF_TEXT_CACHE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, f"{key}.{ext}")
+
+    def _load_index(self, key):
+        path = self._path(key, 'json')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_index(self, key, index):
+        path = self._path(key, 'json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(path + '.tmp', path)
+
+    def _pdf_bytes(self, key, pdf_link, pdf_bytes):
+        if pdf_bytes is not None:
+            return pdf_bytes
+        path = self._path(key, 'pdf')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+        if os.path.isfile(pdf_link):
+            return read_pdf(pdf_link)
+        pdf_bytes = download_pdf(pdf_link)
+        with open(path, 'wb') as f:
+            f.write(pdf_bytes)
+        return pdf_bytes
+
+    @staticmethod
+    def _covers(index, start, stop):
+        return index is not None and all(str(i) in index['pages'] for i in _page_range(start, stop, index['page_count']))
+
+    def has_pages(self, key, start=0, stop=None):
+        return self._covers(self._load_index(key), start, stop)
+
+    def prefetch(self, key, pdf_link, start=0, stop=None):
+        """Downloads the PDF next to the cache unless it is local, already there, or not needed."""
+        if os.path.isfile(pdf_link) or os.path.exists(self._path(key, 'pdf')) or self.has_pages(key, start, stop):
+            return
+        self._pdf_bytes(key, pdf_link, None)
+
+    def _extract(self, key, index, pdf_link, pdf_bytes, start, stop):
+        """Extracts the pages of start..stop not in the index yet and appends them to <id>.pages."""
+        pdf_bytes = self._pdf_bytes(key, pdf_link, pdf_bytes)
+        done = {int(i) for i in index['pages']} if index else set()
+        try:
+            page_count, texts = extract_page_texts(pdf_bytes, start, stop, skip=done)
+        except Exception:
+            # A truncated/corrupt download must not be served again from the cache
+            if os.path.exists(self._path(key, 'pdf')):
+                os.remove(self._path(key, 'pdf'))
+            raise
+        index = index or {'page_count': page_count, 'pages': {}}
+        if texts:
+            with open(self._path(key, 'pages'), 'ab') as f:
+                offset = f.tell()
+                for i in sorted(texts):
+                    block = zlib.compress(texts[i].encode('utf-8'))
+                    f.write(block)
+                    index['pages'][str(i)] = [offset, len(block)]
+                    offset += len(block)
+        self._save_index(key, index)
+        if os.path.exists(self._path(key, 'pdf')):
+            os.remove(self._path(key, 'pdf'))
+        return index
+
+    def _read(self, key, index, page_numbers):
+        if not page_numbers:
+            return []
+        with open(self._path(key, 'pages'), 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+            texts = []
+            for i in page_numbers:
+                offset, length = index['pages'][str(i)]
+                texts.append(zlib.decompress(blob[offset:offset + length]).decode('utf-8'))
+            return texts
+
+    def pages(self, key, pdf_link, start=0, stop=None, pdf_bytes=None):
+        """Text of pages start..stop-1 (to the end when stop is None), extracting only what is missing."""
+        index = self._load_index(key)
+        if not self._covers(index, start, stop):
+            index = self._extract(key, index, pdf_link, pdf_bytes, start, stop)
+        return self._read(key, index, _page_range(start, stop, index['page_count']))
+
+
+def page_texts(pdf_link, cache=None, pdf_bytes=None, start=0, stop=None):
+    """
+    Per-page text of pages start..stop-1 of a paper (all pages by default): from the cache,
+    extracting only the pages it does not have yet, else from pdf_bytes or a fresh download.
+    Raises on download/parse errors so the caller can record the paper as unavailable.
+    """
+    key = get_arxiv_id(pdf_link)
+    if cache is not None and key:
+        return cache.pages(key, pdf_link, start, stop, pdf_bytes)
+    _, texts = extract_page_texts(pdf_bytes if pdf_bytes is not None else read_pdf(pdf_link), start, stop)
+    return [texts[i] for i in sorted(texts)]
+
+
+# ========================
+# METRICS
+# ========================
+
+def highest_number(pattern, texts):
+    """Largest number captured by pattern on any page (0 when none)."""
+    highest = 0
+    for text in texts:
+        numbers = pattern.findall(text)
+        if numbers:
+            highest = max(highest, max(map(int, numbers)))
+    return highest
+
+
+def pdf_metrics(texts):
+    return {
+        'pages': len(texts),
+        'figures': highest_number(FIGURE_NUMBER_RE, texts),
+        'tables': highest_number(TABLE_NUMBER_RE, texts),
+    }
+
+
+def extract_keywords(texts):
+    """
+    Keywords / UAT concepts / subject headings declared anywhere in the paper (as in
+    missing_days.py and script2.py). Cut at '1. Introduction' when the heading runs into it.
+    """
+    keywords = []
+    for text in texts:
+        text = WHITESPACE_RE.sub(' ', text)
+        for match in KEYWORDS_RE.findall(text):
+            keywords.extend(kw.strip() for kw in KEYWORD_SPLIT_RE.split(match) if kw.strip())
+    keywords = list(dict.fromkeys(keywords))
+
+    for stop_phrase in KEYWORD_STOP_PHRASES:
+        if any(stop_phrase in keyword for keyword in keywords):
+            return ' '.join(keywords).split(stop_phrase)[0]
+    return keywords
+
+
+# ========================
+# PARALLEL METRICS
+# ========================
+
+def base_arxiv_id(source):
+    """arXiv id without its version, the key results are merged on."""
+    match = re.search(r'(\d{4}\.\d{4,5})', str(source))
+    return match.group(1) if match else None
+
+
+def _metrics_chunk(chunk, cache_root):
+    """
+    Worker: pages/figures/tables/keywords for a list of (position, source, full) items, where
+    source is a local PDF path or a PDF link already prefetched into the cache. When full is
+    False only the keyword pages are read and the metric columns are left empty.
+    """
+    cache = PdfTextCache(cache_root)
+    rows = []
+    for pos, source, full in chunk:
+        row = {'position': pos, 'arxiv_id': base_arxiv_id(source),
+               'pages': None, 'figures': None, 'tables': None, 'keywords': None, 'error': None}
+        try:
+            texts = page_texts(source, cache, stop=None if full else KEYWORD_PAGES)
+            if full:
+                row.update(pdf_metrics(texts))
+            row['keywords'] = extract_keywords(texts[:KEYWORD_PAGES])
+        except Exception as e:
+            row['error'] = str(e) or type(e).__name__
+        rows.append(row)
+    return rows
+
+
+def compute_pdf_metrics(sources, full=None, cache_root=PDF_TEXT_CACHE_DIR,
+                        workers=METRIC_WORKERS, chunk_size=METRIC_CHUNK_SIZE):
+    """
+    Metrics for many PDFs across a process pool. sources are local PDF paths or PDF links;
+    links are downloaded first, one at a time in this process, so only the CPU-bound text
+    extraction runs in parallel. full (one bool per source, default all True) limits papers
+    whose metrics are already known to their keyword pages.
+
+    Returns a DataFrame in source order with METRIC_COLUMNS: arxiv_id (no version), pages,
+    figures, tables (nullable ints), keywords, and error (None unless the paper failed).
+    """
+    sources = [str(s) for s in sources]
+    full = [True] * len(sources) if full is None else [bool(f) for f in full]
+    cache = PdfTextCache(cache_root)
+
+    items, failed = [], []
+    for pos, (source, whole) in enumerate(tqdm(list(zip(sources, full)), desc="Downloading PDFs")):
+        key = get_arxiv_id(source)
+        try:
+            if key:
+                cache.prefetch(key, source, stop=None if whole else KEYWORD_PAGES)
+            items.append((pos, source, whole))
+        except Exception as e:
+            failed.append({'position': pos, 'arxiv_id': base_arxiv_id(source), 'error': str(e) or type(e).__name__})
+
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    rows = []
+    if workers <= 1:
+        for chunk in tqdm(chunks, desc="Analysing PDFs"):
+            rows.extend(_metrics_chunk(chunk, cache_root))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(_metrics_chunk, chunks, [cache_root] * len(chunks))
+            for chunk_rows in tqdm(results, total=len(chunks), desc="Analysing PDFs"):
+                rows.extend(chunk_rows)
+
+    table = pd.DataFrame(rows + failed, columns=['position'] + list(METRIC_COLUMNS))
+    return table.sort_values('position').drop(columns='position').reset_index(drop=True).astype(METRIC_COLUMNS)
+
+
+def merge_pdf_metrics(df, metrics, columns=('pages', 'figures', 'tables', 'keywords'), overwrite=False):
+    """
+    Writes a compute_pdf_metrics table into df in one vectorized step, matching rows on the
+    arXiv id of df['pdf_link']. Existing values are kept unless overwrite; failed papers
+    change nothing.
+    """
+    found = metrics[metrics['error'].isna() & metrics['arxiv_id'].notna()]
+    found = found.drop_duplicates('arxiv_id', keep='last').set_index('arxiv_id')
+    ids = df['pdf_link'].map(base_arxiv_id)
+    for column in columns:
+        values = ids.map(found[column])
+        if column not in df:
+            df[column] = None
+        df[column] = values.combine_first(df[column]) if overwrite else df[column].combine_first(values)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute PDF metrics for a dataset across a process pool")
+    parser.add_argument('--csv', required=True, help="dataset with a pdf_link column; updated in place unless --output")
+    parser.add_argument('--pdf-dir', help="directory of local <arxiv_id>.pdf files (others are downloaded)")
+    parser.add_argument('--output', help="where to write the merged dataset")
+    parser.add_argument('--workers', type=int, default=METRIC_WORKERS)
+    parser.add_argument('--overwrite', action='store_true', help="replace existing values instead of filling gaps")
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.csv)
+    for column in ('pages', 'figures', 'tables', 'keywords'):
+        if column not in data:
+            data[column] = None
+    if 'comments' in data:
+        # Counts stated in the comments never need the PDF
+        data = backfill_from_comments(data, columns=COUNT_COLUMNS)
+    needs_metrics = data[COUNT_COLUMNS].isna().any(axis=1) | args.overwrite
+    todo = needs_metrics | data['keywords'].isna() | args.overwrite
+    print(f"{int(todo.sum())} of {len(data)} papers need their PDF ({int(needs_metrics.sum())} for page/figure/table counts)")
+
+    sources = data['pdf_link'].astype(str)
+    if args.pdf_dir:
+        local = data['pdf_link'].map(base_arxiv_id).map(
+            lambda i: os.path.join(args.pdf_dir, f"{i}.pdf") if i else None)
+        sources = local.where(local.map(lambda path: bool(path) and os.path.isfile(path)), sources)
+
+    metrics = compute_pdf_metrics(sources[todo], full=needs_metrics[todo], workers=args.workers)
+    data = merge_pdf_metrics(data, metrics, overwrite=args.overwrite)
+    data.to_csv(args.output or args.csv, index=False)
+    print(f"{metrics['error'].isna().sum()} PDFs analysed, {metrics['error'].notna().sum()} failed "
+          f"-> {args.output or args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Async batch scheduler for LLM affiliation extraction.
+
+Keeps several batch requests in flight at once while staying under a requests-per-minute
+and a tokens-per-minute budget. Batches are packed by estimated token count instead of a
+fixed number of papers, and every paper's state is journalled to a JSONL file so retries
+and partial results survive restarts.
+
+The scheduler knows nothing about a particular model: it is given an async
+`send_batch(batch) -> {paper_id: result}` callable. Papers missing from the returned
+dict (unparseable, dropped by the model) are retried on their own in a later batch.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+
+# =======================
+# CONFIGURATION
+# =======================
+CHARS_PER_TOKEN = 4               # Rough chars/token for LaTeX-heavy English text
+PROMPT_OVERHEAD_TOKENS = 800      # System prompt + output schema instructions
+PER_PAPER_OVERHEAD_TOKENS = 40    # "--- PAPER i --- / ArXiv ID / Title" header per paper
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (no API call)."""
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+# =======================
+# ERROR CLASSIFICATION
+# =======================
+def error_status(e):
+    """HTTP status code of an API exception, if it carries one."""
+    for attr in ("status_code", "code"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None)
+
+
+# Whole phrases only: a bare "rate" also matches "generate", "separate", "accurate", ...
+RATE_LIMIT_PHRASES = ("rate limit", "rate-limit", "ratelimit", "resource_exhausted", "resource exhausted",
+                      "quota exceeded", "exceeded your current quota", "too many requests")
+
+
+def classify_error(e):
+    """Returns 'rate_limit' (429), 'overloaded' (5xx) or 'fatal'."""
+    status = error_status(e)
+    msg = str(e).lower()
+    if status == 429 or any(phrase in msg for phrase in RATE_LIMIT_PHRASES):
+        return "rate_limit"
+    if status in (500, 502, 503, 504) or "unavailable" in msg or "overloaded" in msg or "503" in msg:
+        return "overloaded"
+    return "fatal"
+
+
+# =======================
+# RATE LIMITER
+# =======================
+class RateLimiter:
+    """
+    Sliding 60 s window over requests and tokens, shared by all in-flight batches.
+    A 429 from the server pauses every caller; a 503 only delays the batch that hit it.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute, window=60.0):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self.window = window
+        self.events = deque()  # (timestamp, tokens)
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _purge(self, now):
+        while self.events and now - self.events[0][0] >= self.window:
+            self.events.popleft()
+
+    def _wait_time(self, tokens, now):
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._purge(now)
+        used = sum(t for _, t in self.events)
+        if len(self.events) < self.rpm and (used + tokens <= self.tpm or not self.events):
+            return 0.0
+        # Wait until the oldest request leaves the window
+        return self.window - (now - self.events[0][0]) + 0.01
+
+    async def acquire(self, tokens):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(tokens, now)
+                if wait <= 0:
+                    self.events.append((now, tokens))
+                    return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+# =======================
+# PERSISTENT QUEUE
+# =======================
+class PersistentQueue:
+    """
+    Append-only JSONL journal of work items. Each line is one state change
+    ({"id", "status", "attempts", "meta"}); replaying the file gives the current state.
+    Items still 'pending' or 'retry' after a crash are picked up again on the next run.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.items = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from a crash
+                    item = self.items.setdefault(event["id"], {"meta": {}})
+                    item.update(event)
+
+    def _write(self, event):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def _set(self, item_id, status, **extra):
+        item = self.items.setdefault(item_id, {"meta": {}, "attempts": 0})
+        item.update({"id": item_id, "status": status, **extra})
+        self._write({"id": item_id, "status": status, "attempts": item.get("attempts", 0), **extra})
+
+    def enqueue(self, item_id, meta):
+        """Adds an item unless it is already known. Returns True if it was added."""
+        if item_id in self.items:
+            return False
+        self.items[item_id] = {"meta": meta, "attempts": 0}
+        self._set(item_id, "pending", meta=meta)
+        return True
+
+    def pending(self):
+        """(id, meta, attempts) for every item not yet done or failed."""
+        return [(i, it.get("meta", {}), it.get("attempts", 0))
+                for i, it in self.items.items() if it.get("status") in ("pending", "retry")]
+
+    def mark_done(self, item_id):
+        self._set(item_id, "done")
+
+    def mark_retry(self, item_id, attempts, reason=""):
+        self.items[item_id]["attempts"] = attempts
+        self._set(item_id, "retry", reason=reason)
+
+    def mark_failed(self, item_id, reason=""):
+        self._set(item_id, "failed", reason=reason)
+
+    def counts(self):
+        counts = {}
+        for it in self.items.values():
+            counts[it.get("status")] = counts.get(it.get("status"), 0) + 1
+        return counts
+
+
+# =======================
+# SCHEDULER
+# =======================
+class BatchScheduler:
+    """
+    Packs papers into token-budgeted batches and keeps up to `max_in_flight` of them
+    running under a shared RateLimiter.
+
+    load_paper(item_id, meta) -> dict with at least 'text' (or None to skip the paper)
+    send_batch(batch)         -> awaitable {item_id: result}; batch is a list of paper dicts
+    on_result(paper, result)  -> called once per paper that came back
+    lookup(paper)             -> optional; a cached result (or None), checked before batching
+    """
+
+    def __init__(self, send_batch, load_paper, on_result, queue, limiter,
+                 max_in_flight=4, max_batch_tokens=100_000, max_batch_papers=50,
+                 max_attempts=5, base_backoff=30, max_backoff=300, logger=None, lookup=None):
+        self.send_batch = send_batch
+        self.load_paper = load_paper
+        self.on_result = on_result
+        self.lookup = lookup
+        self.queue = queue
+        self.limiter = limiter
+        self.max_in_flight = max_in_flight
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_papers = max_batch_papers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.logger = logger or logging.getLogger(__name__)
+        self.saved = 0
+        self.cached = 0
+
+    def _complete(self, item, result):
+        self.on_result(item, result)
+        self.queue.mark_done(item["id"])
+        self.saved += 1
+
+    def _load(self, item):
+        if "text" not in item:
+            paper = self.load_paper(item["id"], item["meta"])
+            if not paper:
+                self.queue.mark_failed(item["id"], "no input")
+                return None
+            item.update(paper)
+            item["tokens"] = estimate_tokens(item["text"]) + PER_PAPER_OVERHEAD_TOKENS
+        return item
+
+    def _take_batch(self, pending):
+        """Greedy packing from the front of `pending`; a paper over budget goes alone."""
+        batch, tokens = [], PROMPT_OVERHEAD_TOKENS
+        while pending and len(batch) < self.max_batch_papers:
+            item = self._load(pending[0])
+            if item is None:
+                pending.popleft()
+                continue
+            cached = self.lookup(item) if self.lookup else None
+            if cached is not None:
+                self._complete(pending.popleft(), cached)
+                self.cached += 1
+                continue
+            if batch and tokens + item["tokens"] > self.max_batch_tokens:
+                break
+            batch.append(pending.popleft())
+            tokens += item["tokens"]
+        return batch, tokens
+
+    def _backoff(self, attempts):
+        delay = min(self.base_backoff * (2 ** attempts), self.max_backoff)
+        return delay * random.uniform(0.8, 1.2)
+
+    def _retry(self, papers, reason):
+        """Bumps attempts; returns the papers that should go back to the pending pool."""
+        retry = []
+        for p in papers:
+            p["attempts"] = p.get("attempts", 0) + 1
+            if p["attempts"] >= self.max_attempts:
+                self.queue.mark_failed(p["id"], reason)
+                self.logger.error(f"Giving up on {p['id']} after {p['attempts']} attempts ({reason})")
+            else:
+                self.queue.mark_retry(p["id"], p["attempts"], reason)
+                retry.append(p)
+        return retry
+
+    async def _run_batch(self, batch, tokens):
+        await self.limiter.acquire(tokens)
+        ids = [p["id"] for p in batch]
+        self.logger.info(f"Sending batch of {len(batch)} papers (~{tokens} tokens): {ids}")
+        try:
+            results = await self.send_batch(batch)
+        except Exception as e:
+            kind = classify_error(e)
+            attempts = max(p.get("attempts", 0) for p in batch)
+            if kind == "rate_limit":
+                delay = self._backoff(attempts)
+                self.logger.warning(f"Rate limit hit (429). Pausing all requests for {delay:.0f}s")
+                self.limiter.pause(delay)
+            elif kind == "overloaded":
+                delay = self._backoff(attempts)
+                self.logger.warning(f"Service unavailable ({error_status(e)}). Retrying this batch in {delay:.0f}s")
+                await asyncio.sleep(delay)
+            else:
+                self.logger.error(f"API error: {e}")
+            return self._retry(batch, kind)
+
+        missing = []
+        for p in batch:
+            result = (results or {}).get(p["id"])
+            if result is None:
+                missing.append(p)
+                continue
+            self._complete(p, result)
+        if missing:
+            self.logger.warning(f"{len(missing)}/{len(batch)} papers missing from response, re-queueing them")
+        return self._retry(missing, "missing from response")
+
+    async def run(self):
+        pending = deque({"id": i, "meta": meta, "attempts": attempts}
+                        for i, meta, attempts in self.queue.pending())
+        self.logger.info(f"Scheduler starting with {len(pending)} pending papers, {self.max_in_flight} in flight")
+        in_flight = set()
+        while pending or in_flight:
+            while pending and len(in_flight) < self.max_in_flight:
+                batch, tokens = self._take_batch(pending)
+                if not batch:
+                    break
+                in_flight.add(asyncio.create_task(self._run_batch(batch, tokens)))
+            if not in_flight:
+                break
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.extend(task.result())
+        self.logger.info(f"Scheduler finished: {self.saved} saved ({self.cached} from cache), "
+                         f"queue state {self.queue.counts()}")
+        return self.saved
@@ -1,8 +1,10 @@
 """
 Gemini API-based Author Affiliation Extractor
 Uses Gemini for batch processing of papers with structured JSON output.
+Any OpenAI-compatible endpoint (Kimi/Moonshot, ...) can be swapped in with BACKEND, see llm_backends.py.
 """
 
+import asyncio
 import json
 import logging
 import os
@@ -17,10 +19,15 @@ from typing import List, Optional
 import dotenv
 import pandas as pd
 import requests
-from google import genai
 from pydantic import BaseModel, Field
 from tqdm import tqdm
 
+from batch_scheduler import BatchScheduler, PersistentQueue, RateLimiter, estimate_tokens
+from json_stream import PaperStream, parse_papers
+from latex_condenser import CondenseReport, condense_latex
+from llm_backends import make_backend
+from llm_cache import LLMCache, cache_key
+
 
 # =======================
 # PYDANTIC MODELS FOR STRUCTURED OUTPUT
@@ -74,6 +81,7 @@ OUTPUT_JSON = "gemini_output.json"
 # Batch configuration
 BATCH_SIZE = 15 # Number of papers per batch
 MAX_LATEX_CHARS = 25000  # Max chars of LaTeX per paper
+CONDENSE_LATEX = True  # Send only author/affiliation constructs (see latex_condenser.py)
 
 # Rate limiting for free tier: 15 requests per minute
 RATE_LIMIT_SECONDS = 5  # ~4 seconds between requests
@@ -82,6 +90,36 @@ RETRY_DELAY = 60  # seconds to wait on quota error
 SERVICE_UNAVAILABLE_BASE_DELAY = 30  # Base delay for 503 errors (exponential backoff)
 MAX_SERVICE_UNAVAILABLE_DELAY = 300  # Max 5 minutes wait for 503 errors
 
+# Async mode: several batches in flight under shared RPM/TPM budgets (see batch_scheduler.py)
+ASYNC_MODE = True
+MOCK_ENDPOINT = "http://127.0.0.1:8765/generate"
+
+# Model backends (see llm_backends.py); BACKEND picks one. "openai" is any OpenAI-compatible endpoint.
+# For "mock", start predictions/mock_model_server.py first.
+BACKEND = "gemini"
+BACKENDS = {
+    "gemini": {"type": "gemini", "model": MODEL_ID, "api_key_env": "GEMINI_API_KEY"},
+    "kimi": {"type": "openai", "model": "kimi-k2-turbo-preview",
+             "base_url": "https://api.moonshot.ai/v1", "api_key_env": "KIMI_API"},
+    "mock": {"type": "mock", "endpoint": MOCK_ENDPOINT},
+}
+MAX_IN_FLIGHT = 4  # Concurrent batch requests
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1_000_000
+MAX_BATCH_TOKENS = 120_000  # Batches are packed up to this estimated input size
+MAX_BATCH_PAPERS = 50
+QUEUE_PATH = "gemini_queue.jsonl"  # Persistent per-paper state, survives restarts
+STREAM_RESPONSES = True  # Parse and validate each paper as the async response streams in
+
+# Result cache keyed by (model, PROMPT_VERSION, normalized LaTeX input), see llm_cache.py.
+# Bump PROMPT_VERSION whenever build_batch_prompt changes so stale answers are not reused.
+LLM_CACHE_PATH = "llm_cache.jsonl"
+PROMPT_VERSION = "gemini-batch-v1"
+
+# Set to the llm_queue.csv written by affiliation_router.py to only send the papers the
+# rule-based parsers could not resolve (None sends every unprocessed paper)
+LLM_QUEUE_CSV = None
+
 # NOTE: 503 errors ("model is overloaded") are SERVER-SIDE issues, not context memory issues.
 # The Gemini API service itself is overloaded. Each API call using generate_content() is 
 # stateless - there's no conversation history or model context memory maintained between 
@@ -125,11 +163,13 @@ def setup_logging():
 logger = setup_logging()
 
 # =======================
-# INIT GEMINI CLIENT
+# INIT MODEL BACKEND
 # =======================
 dotenv.load_dotenv()
 
-client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+backend = make_backend(BACKENDS[BACKEND])
+cache = LLMCache(LLM_CACHE_PATH)
+condense_report = CondenseReport()
 
 
 # =======================
@@ -218,6 +258,20 @@ def read_latex_from_folder(arxiv_id):
     return None
 
 
+def prepare_latex(latex_text):
+    """
+    The LaTeX that goes into the prompt: the condensed author/affiliation constructs, or the
+    raw text (truncated by build_batch_prompt) if the condenser finds none.
+    """
+    if not CONDENSE_LATEX:
+        return latex_text
+    condensed, stats = condense_latex(latex_text)
+    sent = condensed or latex_text[:MAX_LATEX_CHARS]
+    condense_report.add(stats, estimate_tokens(sent))
+    logger.debug(f"Condensed LaTeX ~{stats['tokens_before']} -> ~{estimate_tokens(sent)} tokens")
+    return sent
+
+
 def cleanup(arxiv_id):
     """No cleanup needed when reading from local folders."""
     pass
@@ -431,6 +485,113 @@ def clean_json_response(response_text: str) -> str:
     return fixed_text
 
 
+def log_paper_errors(errors: list):
+    """Per-paper parse failures; those papers are simply missing from the result."""
+    for arxiv_id, reason in errors:
+        logger.warning(f"Dropped paper {arxiv_id or '(unknown id)'} from response: {reason}")
+
+
+def parse_batch_response(response_text: str) -> Optional[BatchResponse]:
+    """
+    Parse a raw batch response paper by paper (json_stream.parse_papers), keeping every paper
+    that validates. Falls back to whole-document repair only if no paper object is found.
+    """
+    papers, errors = parse_papers(response_text, Paper)
+    log_paper_errors(errors)
+    if papers:
+        logger.info(f"✅ Parsed {len(papers)} papers ({len(errors)} dropped)")
+        return BatchResponse(papers=papers)
+    if errors:
+        return None
+    return parse_batch_response_whole(response_text)
+
+
+def parse_batch_response_whole(response_text: str) -> Optional[BatchResponse]:
+    """
+    Parse a raw batch response into a BatchResponse, trying several repair strategies.
+    Returns None if every strategy fails (the response is saved for debugging).
+    """
+    # Clean the response to fix escape character issues
+    cleaned_response = clean_json_response(response_text)
+
+    # Try parsing with Pydantic - multiple strategies
+    parse_attempts = [
+        ("Pydantic validate_json", lambda: BatchResponse.model_validate_json(cleaned_response)),
+        ("Manual JSON + Pydantic validate", lambda: BatchResponse.model_validate(json.loads(cleaned_response))),
+    ]
+
+    for attempt_name, parse_func in parse_attempts:
+        try:
+            batch_response = parse_func()
+            logger.info(f"✅ Successfully parsed {len(batch_response.papers)} papers using {attempt_name}")
+            return batch_response
+        except json.JSONDecodeError as json_err:
+            logger.debug(f"{attempt_name} failed (JSON error): {json_err}")
+            # Try to extract JSON from the response if it's wrapped
+            try:
+                # Look for JSON object boundaries
+                start_idx = cleaned_response.find('{')
+                end_idx = cleaned_response.rfind('}')
+                if start_idx >= 0 and end_idx > start_idx:
+                    extracted_json = cleaned_response[start_idx:end_idx+1]
+                    batch_response = BatchResponse.model_validate(json.loads(extracted_json))
+                    logger.info(f"✅ Successfully parsed {len(batch_response.papers)} papers (extracted JSON)")
+                    return batch_response
+            except:
+                pass
+        except Exception as parse_error:
+            logger.debug(f"{attempt_name} failed: {parse_error}")
+            # Try to fix common Pydantic validation errors
+            try:
+                # Parse JSON manually first
+                data = json.loads(cleaned_response)
+                # Fix common issues in the data structure
+                if "papers" in data:
+                    for paper in data["papers"]:
+                        # Ensure required fields exist
+                        if "arxiv_id" not in paper:
+                            paper["arxiv_id"] = ""
+                        if "authors" not in paper:
+                            paper["authors"] = []
+                        if "first_author_countries" not in paper:
+                            paper["first_author_countries"] = []
+                        # Fix authors
+                        for author in paper.get("authors", []):
+                            if "name" not in author or author["name"] is None:
+                                author["name"] = ""
+                            if "affiliations" not in author:
+                                author["affiliations"] = []
+                            if "countries" not in author:
+                                author["countries"] = []
+                            # Ensure lists are actually lists
+                            if not isinstance(author.get("affiliations"), list):
+                                author["affiliations"] = []
+                            if not isinstance(author.get("countries"), list):
+                                author["countries"] = []
+
+                    batch_response = BatchResponse.model_validate(data)
+                    logger.info(f"✅ Successfully parsed {len(batch_response.papers)} papers (with data fixes)")
+                    return batch_response
+            except Exception as fix_error:
+                logger.debug(f"Data fix attempt failed: {fix_error}")
+
+    # All parsing attempts failed
+    logger.error(f"All parsing attempts failed. Response length: {len(cleaned_response)}")
+    logger.debug(f"Cleaned response (first 2000 chars): {cleaned_response[:2000]}")
+    logger.debug(f"Cleaned response (last 500 chars): {cleaned_response[-500:]}")
+
+    # Try to save problematic response for debugging
+    try:
+        debug_file = f"failed_response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        with open(debug_file, "w", encoding='utf-8') as f:
+            f.write(cleaned_response)
+        logger.warning(f"Saved failed response to {debug_file} for debugging")
+    except:
+        pass
+
+    return None
+
+
 def query_gemini_batch(papers_data: list, retry_count: int = 0) -> Optional[BatchResponse]:
     """
     Send a batch of papers to Gemini and get structured extraction results.
@@ -452,99 +613,10 @@ def query_gemini_batch(papers_data: list, retry_count: int = 0) -> Optional[Batc
         # Each API call is stateless - no conversation history or context memory.
         # The 'contents' parameter is just the current prompt, not a chat history.
         # This ensures complete isolation between batches.
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=user_prompt,  # Single prompt, no history
-            config={
-                "system_instruction": system_prompt,
-                "temperature": 0,
-                "response_mime_type": "application/json",
-                "response_json_schema": BatchResponse.model_json_schema(),
-            }
-        )
-        
-        response_text = response.text
+        response_text = backend.generate(system_prompt, user_prompt, BatchResponse.model_json_schema())
         logger.debug(f"Received raw response ({len(response_text)} chars)")
         
-        # Clean the response to fix escape character issues
-        cleaned_response = clean_json_response(response_text)
-        
-        # Try parsing with Pydantic - multiple strategies
-        parse_attempts = [
-            ("Pydantic validate_json", lambda: BatchResponse.model_validate_json(cleaned_response)),
-            ("Manual JSON + Pydantic validate", lambda: BatchResponse.model_validate(json.loads(cleaned_response))),
-        ]
-        
-        for attempt_name, parse_func in parse_attempts:
-            try:
-                batch_response = parse_func()
-                logger.info(f"✅ Successfully parsed {len(batch_response.papers)} papers using {attempt_name}")
-                return batch_response
-            except json.JSONDecodeError as json_err:
-                logger.debug(f"{attempt_name} failed (JSON error): {json_err}")
-                # Try to extract JSON from the response if it's wrapped
-                try:
-                    # Look for JSON object boundaries
-                    start_idx = cleaned_response.find('{')
-                    end_idx = cleaned_response.rfind('}')
-                    if start_idx >= 0 and end_idx > start_idx:
-                        extracted_json = cleaned_response[start_idx:end_idx+1]
-                        batch_response = BatchResponse.model_validate(json.loads(extracted_json))
-                        logger.info(f"✅ Successfully parsed {len(batch_response.papers)} papers (extracted JSON)")
-                        return batch_response
-                except:
-                    pass
-            except Exception as parse_error:
-                logger.debug(f"{attempt_name} failed: {parse_error}")
-                # Try to fix common Pydantic validation errors
-                try:
-                    # Parse JSON manually first
-                    data = json.loads(cleaned_response)
-                    # Fix common issues in the data structure
-                    if "papers" in data:
-                        for paper in data["papers"]:
-                            # Ensure required fields exist
-                            if "arxiv_id" not in paper:
-                                paper["arxiv_id"] = ""
-                            if "authors" not in paper:
-                                paper["authors"] = []
-                            if "first_author_countries" not in paper:
-                                paper["first_author_countries"] = []
-                            # Fix authors
-                            for author in paper.get("authors", []):
-                                if "name" not in author or author["name"] is None:
-                                    author["name"] = ""
-                                if "affiliations" not in author:
-                                    author["affiliations"] = []
-                                if "countries" not in author:
-                                    author["countries"] = []
-                                # Ensure lists are actually lists
-                                if not isinstance(author.get("affiliations"), list):
-                                    author["affiliations"] = []
-                                if not isinstance(author.get("countries"), list):
-                                    author["countries"] = []
-                        
-                        batch_response = BatchResponse.model_validate(data)
-                        logger.info(f"✅ Successfully parsed {len(batch_response.papers)} papers (with data fixes)")
-                        return batch_response
-                except Exception as fix_error:
-                    logger.debug(f"Data fix attempt failed: {fix_error}")
-        
-        # All parsing attempts failed
-        logger.error(f"All parsing attempts failed. Response length: {len(cleaned_response)}")
-        logger.debug(f"Cleaned response (first 2000 chars): {cleaned_response[:2000]}")
-        logger.debug(f"Cleaned response (last 500 chars): {cleaned_response[-500:]}")
-        
-        # Try to save problematic response for debugging
-        try:
-            debug_file = f"failed_response_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(debug_file, "w", encoding='utf-8') as f:
-                f.write(cleaned_response)
-            logger.warning(f"Saved failed response to {debug_file} for debugging")
-        except:
-            pass
-        
-        return None
+        return parse_batch_response(response_text)
         
     except Exception as e:
         error_msg = str(e).lower()
@@ -634,6 +706,61 @@ def format_paper_for_csv(paper: Paper) -> tuple:
     )
 
 
+# =======================
+# RESULT CACHE
+# =======================
+def paper_cache_key(paper_data: dict) -> str:
+    """Cache key for the LaTeX that build_batch_prompt would send for this paper."""
+    return cache_key(backend.name, PROMPT_VERSION, paper_data['latex_text'][:MAX_LATEX_CHARS])
+
+
+def lookup_cached(paper_data: dict) -> Optional[Paper]:
+    """Cached Paper for this input, re-labelled with this paper's arxiv_id."""
+    paper_data.setdefault('cache_key', paper_cache_key(paper_data))
+    paper = cache.get(paper_data['cache_key'], Paper)
+    if paper is None:
+        return None
+    return paper.model_copy(update={'arxiv_id': paper_data['arxiv_id']})
+
+
+def split_cached(papers_data: list, lookup: bool = True) -> tuple:
+    """
+    Returns ({arxiv_id: Paper} answered from the cache, papers that still need the model).
+    Papers whose input matches an earlier paper in the same batch are not sent twice;
+    store_results fills them in from that paper's answer. lookup=False only deduplicates,
+    for batches whose papers were already looked up (the scheduler's lookup hook).
+    """
+    hits, to_send, seen = {}, [], set()
+    for p in papers_data:
+        if not lookup:
+            p.setdefault('cache_key', paper_cache_key(p))
+        paper = lookup_cached(p) if lookup else None
+        if paper is not None:
+            hits[p['arxiv_id']] = paper
+        elif p['cache_key'] not in seen:
+            seen.add(p['cache_key'])
+            to_send.append(p)
+    if len(to_send) < len(papers_data):
+        logger.info(f"Cache: {len(hits)} cached, {len(papers_data) - len(hits) - len(to_send)} duplicate inputs, "
+                    f"{len(to_send)} to send")
+    return hits, to_send
+
+
+def store_results(papers_data: list, results: dict) -> dict:
+    """Caches fresh results and copies them to same-input papers. Updates `results` in place."""
+    by_key = {}
+    for p in papers_data:
+        paper = results.get(p['arxiv_id'])
+        if paper is not None and p['cache_key'] not in by_key:
+            by_key[p['cache_key']] = paper
+            if p['cache_key'] not in cache:
+                cache.put(p['cache_key'], paper)
+    for p in papers_data:
+        if p['arxiv_id'] not in results and p['cache_key'] in by_key:
+            results[p['arxiv_id']] = by_key[p['cache_key']].model_copy(update={'arxiv_id': p['arxiv_id']})
+    return results
+
+
 # =======================
 # BATCH PROCESSING
 # =======================
@@ -662,6 +789,8 @@ def collect_batch(df, indices, link_col):
         read_start = time.time()
         latex_text = read_latex_from_folder(arxiv_id)
         read_end = time.time()
+        if latex_text:
+            latex_text = prepare_latex(latex_text)
         
         if latex_text:
             batch_data.append({
@@ -701,42 +830,129 @@ def process_batch_results(batch_response: BatchResponse, batch_data: list, outpu
             logger.warning(f"Could not match arxiv_id: {arxiv_id}")
             continue
         
-        original_index = original_data['original_index']
-        
-        # Log to JSON (serialize Pydantic model to dict)
-        with open(OUTPUT_JSON, "a", encoding='utf-8') as f:
-            entry = {
-                "index": original_index,
-                "arxiv_id": arxiv_id,
-                "data": paper.model_dump()
-            }
-            f.write(json.dumps(entry) + "\n")
-        
-        # Format for CSV
-        authors, affils, countries, first_country = format_paper_for_csv(paper)
-        
-        # Append to CSV
-        res_df = pd.DataFrame([{
-            "original_index": original_index,
-            "arxiv_id": arxiv_id,
-            "extracted_authors": authors,
-            "extracted_affiliations": affils,
-            "extracted_countries": countries,
-            "first_author_country": first_country,
-        }])
-        res_df.to_csv(output_csv, mode="a", header=False, index=False)
-        
-        logger.info(f"[{original_index}] Saved result for {arxiv_id}")
+        save_paper_result(original_data['original_index'], arxiv_id, paper, output_csv)
         saved_count += 1
     
     return saved_count
 
 
+def save_paper_result(original_index, arxiv_id: str, paper: Paper, output_csv: str):
+    """Append one extracted paper to the JSON log and the output CSV."""
+    # Log to JSON (serialize Pydantic model to dict)
+    with open(OUTPUT_JSON, "a", encoding='utf-8') as f:
+        entry = {
+            "index": original_index,
+            "arxiv_id": arxiv_id,
+            "data": paper.model_dump()
+        }
+        f.write(json.dumps(entry) + "\n")
+    
+    # Format for CSV
+    authors, affils, countries, first_country = format_paper_for_csv(paper)
+    
+    # Append to CSV
+    res_df = pd.DataFrame([{
+        "original_index": original_index,
+        "arxiv_id": arxiv_id,
+        "extracted_authors": authors,
+        "extracted_affiliations": affils,
+        "extracted_countries": countries,
+        "first_author_country": first_country,
+    }])
+    res_df.to_csv(output_csv, mode="a", header=False, index=False)
+    
+    logger.info(f"[{original_index}] Saved result for {arxiv_id}")
+
+
+# =======================
+# ASYNC BATCH PIPELINE
+# =======================
+async def stream_papers_async(system_prompt: str, user_prompt: str) -> list:
+    """Streams a model response through PaperStream; each paper is validated as it completes."""
+    stream = PaperStream(Paper)
+    papers = []
+    async for text in backend.stream_async(system_prompt, user_prompt, BatchResponse.model_json_schema()):
+        papers.extend(stream.feed(text))
+    stream.close()
+    log_paper_errors(stream.errors)
+    return papers
+
+
+async def send_batch_async(batch: list) -> dict:
+    """
+    Scheduler hook: query the model for a batch and return {arxiv_id: Paper}.
+    Papers that fail to parse or validate are left out and re-queued by the scheduler.
+    """
+    results, to_send = split_cached(batch, lookup=False)  # The scheduler already ran lookup_cached
+    if to_send:
+        system_prompt, user_prompt = build_batch_prompt(to_send)
+        if STREAM_RESPONSES:
+            papers = await stream_papers_async(system_prompt, user_prompt)
+        else:
+            response_text = await backend.generate_async(system_prompt, user_prompt, BatchResponse.model_json_schema())
+            logger.debug(f"Received raw response ({len(response_text)} chars)")
+            batch_response = parse_batch_response(response_text)
+            papers = batch_response.papers if batch_response else []
+
+        ids = {p['arxiv_id'] for p in to_send}
+        results.update({paper.arxiv_id: paper for paper in papers if paper.arxiv_id in ids})
+    return store_results(batch, results)
+
+
+def load_paper_for_queue(arxiv_id: str, meta: dict) -> Optional[dict]:
+    """Scheduler hook: read the LaTeX for a queued paper."""
+    latex_text = read_latex_from_folder(arxiv_id)
+    if not latex_text:
+        return None
+    latex_text = prepare_latex(latex_text)
+    return {
+        'arxiv_id': arxiv_id,
+        'original_index': meta['index'],
+        'title': meta.get('title', 'Unknown'),
+        'latex_text': latex_text,
+        'text': latex_text[:MAX_LATEX_CHARS],  # What build_batch_prompt will actually send
+    }
+
+
+def run_async_pipeline(df, indices_to_process, link_col) -> int:
+    """Queue the papers and run them through the BatchScheduler. Returns papers saved."""
+    queue = PersistentQueue(QUEUE_PATH)
+    added = 0
+    for index in indices_to_process:
+        _, arxiv_id = get_eprint_url(df.loc[index][link_col])
+        if not arxiv_id:
+            logger.warning(f"[{index}] No valid arXiv ID extracted from {df.loc[index][link_col]}")
+            continue
+        title = df.loc[index].get('title', 'Unknown')
+        added += queue.enqueue(arxiv_id, {'index': int(index), 'title': str(title)})
+    logger.info(f"Queued {added} new papers; queue state: {queue.counts()}")
+
+    scheduler = BatchScheduler(
+        send_batch=send_batch_async,
+        load_paper=load_paper_for_queue,
+        on_result=lambda p, paper: save_paper_result(p['original_index'], p['arxiv_id'], paper, OUTPUT_CSV_PATH),
+        queue=queue,
+        limiter=RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE),
+        max_in_flight=MAX_IN_FLIGHT,
+        max_batch_tokens=MAX_BATCH_TOKENS,
+        max_batch_papers=MAX_BATCH_PAPERS,
+        max_attempts=MAX_RETRIES,
+        base_backoff=SERVICE_UNAVAILABLE_BASE_DELAY,
+        max_backoff=MAX_SERVICE_UNAVAILABLE_DELAY,
+        logger=logger,
+        lookup=lookup_cached,
+    )
+    saved = asyncio.run(scheduler.run())
+    logger.info(f"Cache: {cache.stats()}")
+    logger.info(f"Condenser: {condense_report.summary()}")
+    return saved
+
+
 def main():
     logger.info("=" * 60)
     logger.info("GEMINI AUTHOR AFFILIATION EXTRACTOR")
-    logger.info(f"Model: {MODEL_ID}")
-    logger.info(f"Batch Size: {BATCH_SIZE}")
+    logger.info(f"Model: {backend.name}")
+    logger.info(f"Batch Size: {BATCH_SIZE}" if not ASYNC_MODE else f"Batch budget: {MAX_BATCH_TOKENS} tokens, {MAX_IN_FLIGHT} in flight")
     logger.info(f"Max LaTeX chars per paper: {MAX_LATEX_CHARS}")
     logger.info("=" * 60)
     
@@ -793,12 +1009,26 @@ def main():
     # Filter to unprocessed entries
     indices_to_process = [i for i in df.index if i not in processed_indices]
     
+    if LLM_QUEUE_CSV and os.path.exists(LLM_QUEUE_CSV):
+        routed = set(pd.read_csv(LLM_QUEUE_CSV)["original_index"])
+        indices_to_process = [i for i in indices_to_process if i in routed]
+        logger.info(f"Restricted to {len(indices_to_process)} papers routed to the LLM by {LLM_QUEUE_CSV}")
+    
     if not indices_to_process:
         logger.info("No new entries to process.")
         return
     
     logger.info(f"Papers to process: {len(indices_to_process)}")
     
+    if ASYNC_MODE:
+        total_saved = run_async_pipeline(df, indices_to_process, link_col)
+        logger.info("=" * 60)
+        logger.info(f"PROCESSING COMPLETE")
+        logger.info(f"Total papers saved: {total_saved}")
+        logger.info(f"Output CSV: {OUTPUT_CSV_PATH}")
+        logger.info("=" * 60)
+        return
+    
     # Process in batches
     total_saved = 0
     total_batches = (len(indices_to_process) + BATCH_SIZE - 1) // BATCH_SIZE
@@ -834,9 +1064,15 @@ def main():
             logger.warning("No valid papers in this batch, skipping...")
             continue
         
-        # Query Gemini with batch
-        logger.info(f"Sending batch of {len(batch_data)} papers to Gemini...")
-        batch_response = query_gemini_batch(batch_data)
+        # Answer what we can from the cache, then query Gemini for the rest
+        results, to_send = split_cached(batch_data)
+        if to_send:
+            logger.info(f"Sending batch of {len(to_send)} papers to {backend.name}...")
+            batch_response = query_gemini_batch(to_send)
+            if batch_response:
+                results.update({p.arxiv_id: p for p in batch_response.papers})
+        store_results(batch_data, results)
+        batch_response = BatchResponse(papers=list(results.values())) if results else None
         
         if batch_response:
             saved = process_batch_results(batch_response, batch_data, OUTPUT_CSV_PATH)
@@ -846,6 +1082,9 @@ def main():
         else:
             logger.error("Failed to get response for batch")
         
+        if not to_send:
+            continue  # Nothing was sent, no need to wait
+        
         # Rate limiting - increased wait time to reduce load on API
         elapsed = time.time() - start_time
         # Add extra buffer time to reduce chance of 503 errors
@@ -862,6 +1101,8 @@ def main():
     logger.info(f"Total papers saved: {total_saved}")
     logger.info(f"Output CSV: {OUTPUT_CSV_PATH}")
     logger.info(f"Output JSON: {OUTPUT_JSON}")
+    logger.info(f"Cache: {cache.stats()}")
+    logger.info(f"Condenser: {condense_report.summary()}")
     logger.info("=" * 60)
 
 
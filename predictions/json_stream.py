@@ -0,0 +1,173 @@
+"""
+Incremental, per-paper parser for LLM batch responses.
+
+A batch reply is {"papers": [{...}, {...}, ...]}. Instead of repairing and re-parsing the whole
+document until it loads, PaperStream scans the text once (chunk by chunk, as it streams in),
+cuts out each paper object as soon as its closing brace arrives, repairs and validates that
+object on its own, and keeps the valid ones. A malformed or truncated paper only loses itself;
+the caller re-queues the ids that did not come back.
+
+    stream = PaperStream(Paper)
+    for chunk in response_chunks:
+        for paper in stream.feed(chunk):
+            ...
+    stream.close()
+    stream.errors  # [(arxiv_id or None, reason)]
+"""
+
+import json
+import re
+
+from pydantic import ValidationError
+
+VALID_ESCAPES = set('"\\/bfnrtu')
+HEX_DIGITS = set('0123456789abcdefABCDEF')
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+ARXIV_ID_RE = re.compile(r'"arxiv_id"\s*:\s*"([^"]*)"')
+
+
+# =======================
+# PER-OBJECT REPAIR
+# =======================
+def repair_object(raw):
+    """
+    One pass over a single JSON object: doubles backslashes that do not start a valid escape
+    (LaTeX such as \\'e or \\alpha), replaces raw control characters inside strings with a
+    space, then drops trailing commas.
+    """
+    out, in_string, i, n = [], False, 0, len(raw)
+    while i < n:
+        c = raw[i]
+        if in_string:
+            if c == '\\':
+                nxt = raw[i + 1] if i + 1 < n else ''
+                if nxt == 'u' and all(ch in HEX_DIGITS for ch in raw[i + 2:i + 6]) and i + 6 <= n:
+                    out.append(raw[i:i + 6]); i += 6
+                    continue
+                if nxt in VALID_ESCAPES and nxt != 'u':
+                    out.append(c + nxt); i += 2
+                    continue
+                out.append('\\\\'); i += 1
+                continue
+            if c == '"':
+                in_string = False
+            elif c < ' ':
+                c = ' '
+        elif c == '"':
+            in_string = True
+        out.append(c)
+        i += 1
+    return TRAILING_COMMA_RE.sub(r'\1', ''.join(out))
+
+
+def fill_paper_defaults(data):
+    """Missing or null fields become empty strings/lists, as the batch prompt asks for."""
+    if not isinstance(data, dict):
+        return data
+    data.setdefault("arxiv_id", "")
+    if not isinstance(data.get("authors"), list):
+        data["authors"] = []
+    if not isinstance(data.get("first_author_countries"), list):
+        data["first_author_countries"] = []
+    for author in data["authors"]:
+        if not isinstance(author, dict): continue
+        if author.get("name") is None:
+            author["name"] = ""
+        for key in ("affiliations", "countries"):
+            if not isinstance(author.get(key), list):
+                author[key] = []
+    return data
+
+
+def parse_paper_object(raw, model_cls):
+    """Validated model for one paper object, or raises ValueError with the reason."""
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        try:
+            data = json.loads(repair_object(raw))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"invalid JSON: {e.msg}")
+    try:
+        return model_cls.model_validate(fill_paper_defaults(data))
+    except ValidationError as e:
+        raise ValueError(f"schema: {e.errors()[0].get('msg', e)}")
+
+
+# =======================
+# STREAM SCANNER
+# =======================
+class PaperStream:
+    """
+    Feeds response text in any chunk sizes; yields each paper as soon as it is complete.
+    Paper objects are the objects opened directly inside the top-level "papers" array
+    (or inside a bare top-level array).
+    """
+
+    def __init__(self, model_cls):
+        self.model_cls = model_cls
+        self.stack = []         # Open brackets outside strings
+        self.in_string = False
+        self.escape = False
+        self.current = None     # Chunks of the paper object being read
+        self.errors = []
+        self.count = 0
+
+    def _at_paper_level(self):
+        return self.stack == ['{', '['] or self.stack == ['[']
+
+    def feed(self, chunk):
+        papers = []
+        start = 0 if self.current is not None else None
+        for i, c in enumerate(chunk):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == '\\':
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                continue
+            if c == '"':
+                self.in_string = True
+            elif c in '{[':
+                if c == '{' and self._at_paper_level():
+                    self.current, start = [], i
+                self.stack.append(c)
+            elif c in '}]':
+                if self.stack:
+                    self.stack.pop()
+                if c == '}' and self.current is not None and self._at_paper_level():
+                    self.current.append(chunk[start:i + 1])
+                    paper = self._finish(''.join(self.current))
+                    if paper is not None:
+                        papers.append(paper)
+                    self.current, start = None, None
+        if self.current is not None and start is not None:
+            self.current.append(chunk[start:])
+        return papers
+
+    def _finish(self, raw):
+        self.count += 1
+        try:
+            return parse_paper_object(raw, self.model_cls)
+        except ValueError as e:
+            m = ARXIV_ID_RE.search(raw)
+            self.errors.append((m.group(1) if m else None, str(e)))
+            return None
+
+    def close(self):
+        """Records a paper cut off by the end of the response."""
+        if self.current is not None:
+            raw = ''.join(self.current)
+            m = ARXIV_ID_RE.search(raw)
+            self.errors.append((m.group(1) if m else None, "truncated response"))
+            self.current = None
+
+
+def parse_papers(text, model_cls):
+    """Whole-response convenience wrapper. Returns (papers, errors)."""
+    stream = PaperStream(model_cls)
+    papers = stream.feed(text or '')
+    stream.close()
+    return papers, stream.errors
@@ -0,0 +1,201 @@
+"""
+Deterministic LaTeX condenser for LLM prompts.
+
+Most of what the extractors used to send (preamble, macro definitions, comments, abstract,
+the start of the body) says nothing about authors. condense_latex keeps only the author /
+affiliation constructs, with comments stripped and zero-argument macros resolved, so a batch
+can hold several times more papers for the same number of tokens.
+
+Kept constructs, in source order (top level only; a \\thanks inside \\author is not repeated):
+    \\author, \\affiliation, \\altaffiliation, \\affil, \\altaffiltext, \\institute, \\address,
+    \\thanks, \\parbox blocks with superscript / \\aff markers (MNRAS-like author and affiliation
+    boxes), and the contents of \\begin{affiliations} ... \\end{affiliations}
+
+Constructs are not deduplicated: in AASTeX a repeated \\affiliation{X} belongs to the \\author
+before it. Only exact repeats of a labelled affiliation (\\affiliation[a]{..}, \\altaffiltext{1}{..})
+are dropped, since authors point at those by label.
+
+Usage (prints the before/after token counts for some files):
+    python latex_condenser.py paper1.tex paper2.tex
+"""
+
+import re
+import sys
+
+from batch_scheduler import estimate_tokens
+
+# =======================
+# CONFIGURATION
+# =======================
+CONDENSE_COMMANDS = ['author', 'affiliation', 'altaffiliation', 'affil', 'altaffiltext',
+                     'institute', 'address', 'thanks', 'parbox']
+CONDENSE_ENVIRONMENTS = ['affiliations']
+MAX_ARGS = 2             # \altaffiltext{1}{...} has two
+MAX_ARG_CHARS = 5000     # Cap for an argument whose closing brace is missing
+MACRO_PASSES = 3         # Rounds of macro expansion (macros defined via other macros)
+
+COMMENT_RE = re.compile(r'(?<!\\)%.*$', re.MULTILINE)
+CONSTRUCT_RE = re.compile(
+    r'\\(?:(' + '|'.join(sorted(CONDENSE_COMMANDS, key=len, reverse=True)) + r')(?![a-zA-Z])\*?'
+    r'|begin\{(' + '|'.join(CONDENSE_ENVIRONMENTS) + r')\})'
+)
+# \newcommand{\foo}{...}, \newcommand\foo{...}, \renewcommand, \providecommand, \def\foo{...}
+MACRO_DEF_RE = re.compile(
+    r'\\(?:(?:re)?newcommand\*?|providecommand\*?)\s*\{?\\([a-zA-Z]+)\}?\s*(?=\{)'
+    r'|\\def\s*\\([a-zA-Z]+)\s*(?=\{)'
+)
+# Affiliations referenced by label; an exact repeat of one adds nothing
+LABELLED_RE = re.compile(r'\\(?:(?:affiliation|affil|address)\*?\s*\[|altaffiltext\s*\{)')
+# A \parbox is kept only when it looks like an author or affiliation block
+PARBOX_AUTHOR_RE = re.compile(r'\$\^|\\textsuperscript|\\aff\b|\\inst\b')
+BLANK_RE = re.compile(r'[ \t]*\n\s*')
+SPACES_RE = re.compile(r'[ \t]+')
+
+
+# =======================
+# SCANNING
+# =======================
+def read_group(text, start, open_char='{', close_char='}'):
+    """
+    Index just past the group opening at text[start], honouring nesting and \\{ escapes.
+    An unclosed group ends after MAX_ARG_CHARS.
+    """
+    depth, i, n = 0, start, len(text)
+    limit = min(n, start + MAX_ARG_CHARS)
+    while i < limit:
+        c = text[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == open_char:
+            depth += 1
+        elif c == close_char:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return limit
+
+
+def read_command_args(text, pos):
+    """End of an optional [..] followed by up to MAX_ARGS adjacent {..} groups."""
+    while pos < len(text) and text[pos] in ' \t':
+        pos += 1
+    if pos < len(text) and text[pos] == '[':
+        pos = read_group(text, pos, '[', ']')
+    for _ in range(MAX_ARGS):
+        if pos >= len(text) or text[pos] != '{':
+            break
+        pos = read_group(text, pos)
+    return pos
+
+
+def find_macros(text):
+    """{name: body} for every argument-free macro definition."""
+    macros = {}
+    for m in MACRO_DEF_RE.finditer(text):
+        name = m.group(1) or m.group(2)
+        end = read_group(text, m.end())
+        macros[name] = text[m.end() + 1:end - 1]
+    return macros
+
+
+def resolve_macros(text, macros):
+    """Expands every known macro in text, MACRO_PASSES rounds deep."""
+    if not macros:
+        return text
+    macro_re = re.compile(r'\\(' + '|'.join(re.escape(n) for n in sorted(macros, key=len, reverse=True))
+                          + r')(?![a-zA-Z])\s*(?:\{\})?')
+    for _ in range(MACRO_PASSES):
+        new_text = macro_re.sub(lambda m: macros[m.group(1)], text)
+        if new_text == text: break
+        text = new_text
+    return text
+
+
+# =======================
+# CONDENSER
+# =======================
+def extract_constructs(text):
+    """Top-level author/affiliation constructs in document order."""
+    parts, pos = [], 0
+    while True:
+        m = CONSTRUCT_RE.search(text, pos)
+        if not m: break
+        if m.group(2):
+            end_tag = f'\\end{{{m.group(2)}}}'
+            end = text.find(end_tag, m.end())
+            end = end + len(end_tag) if end != -1 else min(len(text), m.end() + MAX_ARG_CHARS)
+        else:
+            end = read_command_args(text, m.end())
+        part = text[m.start():end]
+        if m.group(1) != 'parbox' or PARBOX_AUTHOR_RE.search(part):
+            parts.append(part)
+        pos = max(end, m.end())
+    return parts
+
+
+def condense_latex(text):
+    """
+    Returns (condensed_text, stats). condensed_text is '' when no author or affiliation
+    construct was found, so the caller can fall back to its own slice of the raw LaTeX.
+    stats: chars/tokens before and after.
+    """
+    stripped = COMMENT_RE.sub('', text or '')
+    parts = extract_constructs(stripped)
+    macros = find_macros(stripped) if parts else {}
+    lines, labelled = [], set()
+    for part in parts:
+        part = resolve_macros(part, macros)
+        part = SPACES_RE.sub(' ', BLANK_RE.sub('\n', part)).strip()
+        if LABELLED_RE.match(part):
+            if part in labelled:
+                continue
+            labelled.add(part)
+        lines.append(part)
+    condensed = '\n'.join(lines)
+    stats = {
+        'chars_before': len(text or ''),
+        'chars_after': len(condensed),
+        'tokens_before': estimate_tokens(text),
+        'tokens_after': estimate_tokens(condensed) if condensed else 0,
+    }
+    return condensed, stats
+
+
+class CondenseReport:
+    """Running before/after token totals across papers."""
+
+    def __init__(self):
+        self.papers = 0
+        self.condensed = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def add(self, stats, sent_tokens=None):
+        """sent_tokens: what was finally sent, if the caller fell back to raw LaTeX."""
+        self.papers += 1
+        self.condensed += stats['chars_after'] > 0
+        self.tokens_before += stats['tokens_before']
+        self.tokens_after += stats['tokens_after'] if sent_tokens is None else sent_tokens
+
+    def summary(self):
+        ratio = self.tokens_before / self.tokens_after if self.tokens_after else 0.0
+        return (f"{self.condensed}/{self.papers} papers condensed, ~{self.tokens_before} -> "
+                f"~{self.tokens_after} tokens (x{ratio:.1f} smaller)")
+
+
+def main():
+    report = CondenseReport()
+    for path in sys.argv[1:]:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            condensed, stats = condense_latex(f.read())
+        report.add(stats)
+        print(f"{path}: ~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens")
+        print(condensed or "  (no author/affiliation constructs found)")
+        print()
+    print(report.summary())
+
+
+if __name__ == "__main__":
+    main()
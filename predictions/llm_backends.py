@@ -0,0 +1,130 @@
+"""
+Swappable model backends for the LLM extraction pipeline.
+
+Every backend takes a system prompt, a user prompt and the JSON schema of the expected
+answer, and returns the raw response text, so batching, caching, rate limiting and per-paper
+validation stay in one place (gemini_api_t2 + batch_scheduler + json_stream) whatever model
+answers.
+
+- GeminiBackend:        google-genai client
+- OpenAICompatBackend:  any OpenAI-compatible chat endpoint (Kimi/Moonshot, vLLM, OpenRouter, ...)
+- MockBackend:          predictions/mock_model_server.py
+
+Backends are built from a config dict with make_backend, e.g.
+    make_backend({"type": "openai", "model": "kimi-k2-turbo-preview",
+                  "base_url": "https://api.moonshot.ai/v1", "api_key_env": "KIMI_API"})
+Client libraries are imported only when their backend is built.
+"""
+
+import asyncio
+import json
+import os
+import urllib.request
+
+
+class GeminiBackend:
+    def __init__(self, model, api_key_env="GEMINI_API_KEY", temperature=0):
+        from google import genai
+        self.model = model
+        self.name = f"gemini:{model}"
+        self.temperature = temperature
+        self.client = genai.Client(api_key=os.environ.get(api_key_env))
+
+    def _config(self, system_prompt, schema):
+        return {
+            "system_instruction": system_prompt,
+            "temperature": self.temperature,
+            "response_mime_type": "application/json",
+            "response_json_schema": schema,
+        }
+
+    def generate(self, system_prompt, user_prompt, schema):
+        response = self.client.models.generate_content(
+            model=self.model, contents=user_prompt, config=self._config(system_prompt, schema))
+        return response.text
+
+    async def generate_async(self, system_prompt, user_prompt, schema):
+        response = await self.client.aio.models.generate_content(
+            model=self.model, contents=user_prompt, config=self._config(system_prompt, schema))
+        return response.text
+
+    async def stream_async(self, system_prompt, user_prompt, schema):
+        """Yields response text chunks as they arrive."""
+        async for chunk in await self.client.aio.models.generate_content_stream(
+                model=self.model, contents=user_prompt, config=self._config(system_prompt, schema)):
+            yield chunk.text or ""
+
+
+class OpenAICompatBackend:
+    """
+    Chat-completions endpoint in JSON mode. The schema is not enforced server-side by every
+    provider, so it is appended to the system prompt; json_stream validates the answer.
+    """
+
+    def __init__(self, model, base_url, api_key_env, temperature=0.3):
+        from openai import AsyncOpenAI, OpenAI
+        self.model = model
+        self.name = f"openai:{base_url}:{model}"
+        self.temperature = temperature
+        api_key = os.environ.get(api_key_env)
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.aclient = AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    def _request(self, system_prompt, user_prompt, schema):
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": f"{system_prompt}\n\nJSON schema of the answer:\n{json.dumps(schema)}"},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"},
+        }
+
+    def generate(self, system_prompt, user_prompt, schema):
+        completion = self.client.chat.completions.create(**self._request(system_prompt, user_prompt, schema))
+        return completion.choices[0].message.content
+
+    async def generate_async(self, system_prompt, user_prompt, schema):
+        completion = await self.aclient.chat.completions.create(**self._request(system_prompt, user_prompt, schema))
+        return completion.choices[0].message.content
+
+    async def stream_async(self, system_prompt, user_prompt, schema):
+        stream = await self.aclient.chat.completions.create(**self._request(system_prompt, user_prompt, schema), stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class MockBackend:
+    def __init__(self, endpoint="http://127.0.0.1:8765/generate"):
+        self.endpoint = endpoint
+        self.name = "mock"
+
+    def generate(self, system_prompt, user_prompt, schema):
+        body = json.dumps({"system": system_prompt, "prompt": user_prompt}).encode("utf-8")
+        req = urllib.request.Request(self.endpoint, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=600) as resp:
+            return json.loads(resp.read())["text"]
+
+    async def generate_async(self, system_prompt, user_prompt, schema):
+        return await asyncio.to_thread(self.generate, system_prompt, user_prompt, schema)
+
+    async def stream_async(self, system_prompt, user_prompt, schema):
+        yield await self.generate_async(system_prompt, user_prompt, schema)
+
+
+BACKEND_TYPES = {
+    "gemini": GeminiBackend,
+    "openai": OpenAICompatBackend,
+    "mock": MockBackend,
+}
+
+
+def make_backend(config):
+    """Builds a backend from {"type": ..., **constructor kwargs}."""
+    config = dict(config)
+    backend_type = config.pop("type")
+    if backend_type not in BACKEND_TYPES:
+        raise ValueError(f"Unknown backend type {backend_type!r}; expected one of {sorted(BACKEND_TYPES)}")
+    return BACKEND_TYPES[backend_type](**config)
@@ -0,0 +1,91 @@
+"""
+Result cache for LLM affiliation extraction.
+
+Entries are keyed by (model, prompt template version, hash of the normalized LaTeX input), so
+a re-run after a crash, or a second paper that shares its front matter with an earlier one
+(collaboration papers with identical \\affiliation blocks), is answered without an API call.
+Changing the prompt template means bumping its version string, which makes old entries miss.
+
+The cache is an append-only JSONL file loaded into memory on start; the last entry for a key
+wins. Values are stored as plain dicts and re-validated against the caller's Pydantic model on
+read, so an entry that no longer fits the schema is treated as a miss.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+
+from pydantic import ValidationError
+
+# =======================
+# NORMALIZATION
+# =======================
+COMMENT_RE = re.compile(r'(?<!\\)%.*$', re.MULTILINE)  # LaTeX comments, keeping \%
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_input(text):
+    """Drops LaTeX comments and collapses whitespace, so cosmetic edits hash the same."""
+    text = COMMENT_RE.sub('', text or '')
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def cache_key(model, prompt_version, text):
+    digest = hashlib.sha256(normalize_input(text).encode('utf-8')).hexdigest()
+    return f"{model}|{prompt_version}|{digest}"
+
+
+# =======================
+# CACHE
+# =======================
+class LLMCache:
+    """
+    JSONL-backed {key: result} store.
+
+    get(key, model_cls) -> validated model (or the raw dict if model_cls is None), None on a miss
+    put(key, result)    -> stores a Pydantic model or dict
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line from a crash
+                    self.entries[entry["key"]] = entry["result"]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, model_cls=None):
+        data = self.entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        if model_cls is not None:
+            try:
+                data = model_cls.model_validate(data)
+            except ValidationError:
+                self.misses += 1
+                return None
+        self.hits += 1
+        return data
+
+    def put(self, key, result):
+        data = result.model_dump() if hasattr(result, "model_dump") else result
+        self.entries[key] = data
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "created": time.time(), "result": data}) + "\n")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return f"{self.hits} hits / {lookups} lookups ({rate:.0%}), {len(self.entries)} entries"
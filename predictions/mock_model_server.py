@@ -0,0 +1,105 @@
+"""
+Local mock model endpoint that stands in for Gemini when testing the batch pipeline.
+
+POST /generate with {"system": ..., "prompt": ...} returns {"text": "<json>"} where the JSON
+has one paper per "ArXiv ID:" line in the prompt, in the BatchResponse shape. Latency,
+429/503 failures and malformed papers can be injected to exercise the scheduler's rate
+limiting and backoff and the per-paper response parser.
+
+Usage:
+    python mock_model_server.py --port 8765 --latency 2 --fail-429 0.05 --fail-503 0.1
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockConfig:
+    latency = 1.0      # Seconds per request
+    fail_429 = 0.0     # Probability of a rate-limit error
+    fail_503 = 0.0     # Probability of an overloaded error
+    drop_paper = 0.0   # Probability of leaving a paper out of the response
+    corrupt_paper = 0.0  # Probability of emitting a paper as invalid JSON (unescaped quotes)
+
+
+def mock_batch_response(prompt, config=MockConfig):
+    papers = []
+    for arxiv_id in re.findall(r'ArXiv ID:\s*(\S+)', prompt):
+        if random.random() < config.drop_paper:
+            continue
+        papers.append({
+            "arxiv_id": arxiv_id,
+            "authors": [{
+                "name": "Mock Author",
+                "affiliations": ["Mock Institute of Astronomy"],
+                "countries": ["Mockland"],
+            }],
+            "first_author_countries": ["Mockland"],
+        })
+    return {"papers": papers}
+
+
+def mock_batch_text(prompt, config=MockConfig):
+    """mock_batch_response serialized by hand so single papers can be corrupted."""
+    parts = []
+    for paper in mock_batch_response(prompt, config)["papers"]:
+        text = json.dumps(paper)
+        if random.random() < config.corrupt_paper:
+            text = text.replace('"Mock Author"', '"Mock "Quoted" Author"')
+        parts.append(text)
+    return '{"papers": [' + ', '.join(parts) + ']}'
+
+
+class MockModelHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(MockConfig.latency)
+
+        roll = random.random()
+        if roll < MockConfig.fail_429:
+            return self._send(429, {"error": "Resource has been exhausted (e.g. check quota)."})
+        if roll < MockConfig.fail_429 + MockConfig.fail_503:
+            return self._send(503, {"error": "The model is overloaded. Please try again later."})
+
+        self._send(200, {"text": mock_batch_text(body.get("prompt", ""))})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock LLM endpoint for the extraction pipeline.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--fail-429", type=float, default=MockConfig.fail_429)
+    parser.add_argument("--fail-503", type=float, default=MockConfig.fail_503)
+    parser.add_argument("--drop-paper", type=float, default=MockConfig.drop_paper)
+    parser.add_argument("--corrupt-paper", type=float, default=MockConfig.corrupt_paper)
+    args = parser.parse_args()
+
+    MockConfig.latency = args.latency
+    MockConfig.fail_429 = args.fail_429
+    MockConfig.fail_503 = args.fail_503
+    MockConfig.drop_paper = args.drop_paper
+    MockConfig.corrupt_paper = args.corrupt_paper
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockModelHandler)
+    print(f"Mock model listening on http://127.0.0.1:{args.port}/generate")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
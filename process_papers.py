@@ -5,6 +5,8 @@ import re
 import sys
 from collections import defaultdict
 
+from latex_patterns import COMMENT_RE, strip_commands_with_args
+
 def clean_latex_text(text):
     """
     Removes common LaTeX commands, resolves simple accents, and cleans up a string for plain text output.
@@ -12,16 +14,10 @@ def clean_latex_text(text):
     if not text:
         return ""
     # Remove comments that might be on the same line
-    text = re.sub(r'%.*$', '', text, flags=re.MULTILINE)
+    text = COMMENT_RE.sub('', text)
     
-    # Remove commands with arguments first
-    commands_with_args = [
-        'orcidlink', 'orcid', 'thanks', 'email', 'corref', 'cortext', 'fnref', 'tnoteref', 
-        'inst', 'label', 'altaffiliation', 'altaffilmark', 'affil', 'titlerunning', 
-        'authorrunning', 'emailAdd', 'href', 'url'
-    ]
-    for cmd in commands_with_args:
-        text = re.sub(r'\\' + cmd + r'(?:\[[^\]]*\])?\{.*?\}', '', text, flags=re.DOTALL)
+    # Remove commands with arguments first (all of COMMANDS_WITH_ARGS in one pass)
+    text = strip_commands_with_args(text)
 
     # Handle simple replacements for accents and symbols
     replacements = {
@@ -1,81 +1,133 @@
+"""
+Backfills the `comments` and `journals` (journal-ref) columns.
+
+Bulk first: every monthly astro-ph listing the papers could appear in (the month of their
+`date` and of their arXiv id) is read once with month_reconcile.iter_month_entries, and the
+comments / journal-ref of every entry are kept in a dict keyed by arXiv id. That is a few dozen
+requests for the whole year instead of one /abs/ page per paper. Only papers that no listing
+covered (withdrawn, cross-listed under another archive, ...) are then fetched one by one from
+their /abs/ page.
+"""
+
+import os
+import re
+import sys
+import time
+
+import bs4
 import pandas as pd
 import requests
-import bs4
-import time
 
-data = pd.read_csv('2025_Data_missing.csv')
-
-# Initialize new columns if they don't exist
-if 'comments' not in data.columns:
-    data['comments'] = None
-if 'journals' not in data.columns:
-    data['journals'] = None
-
-base_url = "https://arxiv.org/abs/{}"
-
-for index, row in data.iterrows():
-    # Extract ID from pdf_link (assumes format like http://arxiv.org/pdf/2501.00001v1)
-    pdf_link = str(row['pdf_link'])
-    arxiv_id = pdf_link.split('/')[-1].replace('.pdf', '')
-    
-    # Skip if comments already collected (optional optimization)
-    if pd.notna(row['comments']):
-        print(f"[{index + 1}/{len(data)}] Skipping {arxiv_id}, comments already present.")
-        continue
-
-    url = base_url.format(arxiv_id)
-    print(f"[{index + 1}/{len(data)}] Fetching {arxiv_id}...")
-    
-    try:
-        response = requests.get(url, timeout=30)
-        if response.status_code == 200:
-            soup = bs4.BeautifulSoup(response.content, 'html.parser')
-            
-            # --- Strategy 1: Look for "Comments:" label specifically (Most reliable across layouts) ---
-            # Finds <td class="tablecell label">Comments:</td> and gets the next sibling
-            comments_label = soup.find('td', class_='tablecell label', string='Comments:')
-            if comments_label:
-                comments_value = comments_label.find_next_sibling('td', class_='tablecell arx-comment')
-                # Sometimes the class isn't 'arx-comment', just the next td
-                if not comments_value:
-                     comments_value = comments_label.find_next_sibling('td')
-                
-                if comments_value:
-                    data.at[index, 'comments'] = comments_value.text.strip()
-
-            # --- Strategy 2: Look for "Journal-ref:" label ---
-            journal_label = soup.find('td', class_='tablecell label', string='Journal-ref:')
-            if journal_label:
-                journal_value = journal_label.find_next_sibling('td', class_='tablecell jref')
-                if not journal_value:
-                     journal_value = journal_label.find_next_sibling('td')
-                
-                if journal_value:
-                    data.at[index, 'journals'] = journal_value.text.strip()
-            
-            # --- Strategy 3: Fallback for newer CSS (div-based) layout ---
-            if pd.isna(data.at[index, 'comments']):
-               div_comments_label = soup.find('span', class_='descriptor', string='Comments:')
-               if div_comments_label and div_comments_label.parent:
-                   data.at[index, 'comments'] = div_comments_label.parent.text.replace('Comments:', '', 1).strip()
-
-            if pd.isna(data.at[index, 'journals']):
-               div_journal_label = soup.find('span', class_='descriptor', string='Journal-ref:')
-               if div_journal_label and div_journal_label.parent:
-                   data.at[index, 'journals'] = div_journal_label.parent.text.replace('Journal-ref:', '', 1).strip()
-                   
-        else:
-            print(f"  Failed! Status code: {response.status_code}")
-
-    except Exception as e:
-        print(f"Error processing {arxiv_id}: {e}")
-
-    # Be polite to the server
-    time.sleep(1)
-
-    # Periodic save
-    if index % 50 == 0:
-        data.to_csv('2025_Data_missing.csv', index=False)
-
-# Final save
-data.to_csv('2025_Data_missing.csv', index=False)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from arxiv_listing import entry_notes
+from comment_metrics import COUNT_COLUMNS, backfill_from_comments
+from month_reconcile import iter_month_entries
+
+CSV_PATH = '2025_Data_missing.csv'
+ABS_URL = "https://arxiv.org/abs/{}"
+ABS_DELAY = 1      # Seconds between per-paper /abs/ fetches
+SAVE_EVERY = 50    # Per-paper fetches between saves
+
+
+def get_arxiv_id(pdf_link):
+    match = re.search(r'(\d{4}\.\d{4,5})', str(pdf_link))
+    return match.group(1) if match else None
+
+
+def listing_months(dates, ids):
+    """Monthly listings to read: the month of each paper's date and of its id (YYMM)."""
+    months = set(dates.dropna().astype(str).str[:7])
+    months |= {f"20{i[:2]}-{i[2:4]}" for i in ids.dropna()}
+    return sorted(m for m in months if re.fullmatch(r'\d{4}-\d{2}', m))
+
+
+def bulk_notes(months, wanted):
+    """{arxiv_id: entry_notes} for the wanted ids found in the monthly listings."""
+    notes = {}
+    for month in months:
+        found = 0
+        try:
+            for dt, dd in iter_month_entries(month):
+                entry = entry_notes(dt, dd)
+                if entry['arxiv_id'] in wanted and entry['arxiv_id'] not in notes:
+                    notes[entry['arxiv_id']] = entry
+                    found += 1
+        except Exception as e:
+            print(f"  Error reading listing {month}: {e}")
+        print(f"  {month}: {found} papers matched")
+        time.sleep(3)
+    return notes
+
+
+def fetch_abs_notes(arxiv_id):
+    """(comments, journal_ref) from the paper's /abs/ page, either layout."""
+    response = requests.get(ABS_URL.format(arxiv_id), timeout=30)
+    if response.status_code != 200:
+        print(f"  Failed! Status code: {response.status_code}")
+        return None, None
+    soup = bs4.BeautifulSoup(response.content, 'html.parser')
+
+    def labelled(label, value_class):
+        # Table layout: <td class="tablecell label">Comments:</td><td class="tablecell arx-comment">
+        label_td = soup.find('td', class_='tablecell label', string=label)
+        if label_td:
+            value = label_td.find_next_sibling('td', class_=value_class) or label_td.find_next_sibling('td')
+            if value:
+                return value.text.strip()
+        # Div layout: <span class="descriptor">Comments:</span> ...
+        descriptor = soup.find('span', class_='descriptor', string=label)
+        if descriptor and descriptor.parent:
+            return descriptor.parent.text.replace(label, '', 1).strip()
+        return None
+
+    return labelled('Comments:', 'tablecell arx-comment'), labelled('Journal-ref:', 'tablecell jref')
+
+
+def main():
+    data = pd.read_csv(CSV_PATH)
+    for column in ('comments', 'journals'):
+        if column not in data.columns:
+            data[column] = None
+
+    ids = data['pdf_link'].map(get_arxiv_id)
+    todo = data['comments'].isna() & ids.notna()
+    wanted = set(ids[todo])
+    print(f"{len(wanted)} papers without comments")
+
+    months = listing_months(data.loc[todo, 'date'], ids[todo])
+    print(f"Reading {len(months)} monthly listing(s)...")
+    notes = bulk_notes(months, wanted)
+
+    found = todo & ids.isin(notes)
+    data.loc[found, 'comments'] = ids[found].map(lambda i: notes[i]['comments'])
+    journal_found = found & data['journals'].isna()
+    data.loc[journal_found, 'journals'] = ids[journal_found].map(lambda i: notes[i]['journal_ref'])
+    data.to_csv(CSV_PATH, index=False)
+    print(f"Filled from listings: {int(found.sum())}")
+
+    leftovers = data.index[todo & ~found]
+    print(f"Fetching {len(leftovers)} leftover paper(s) from /abs/...")
+    for n, index in enumerate(leftovers, 1):
+        arxiv_id = ids[index]
+        print(f"[{n}/{len(leftovers)}] Fetching {arxiv_id}...")
+        try:
+            comments, journal = fetch_abs_notes(arxiv_id)
+            if comments:
+                data.at[index, 'comments'] = comments
+            if journal and pd.isna(data.at[index, 'journals']):
+                data.at[index, 'journals'] = journal
+        except Exception as e:
+            print(f"Error processing {arxiv_id}: {e}")
+
+        # Be polite to the server
+        time.sleep(ABS_DELAY)
+        if n % SAVE_EVERY == 0:
+            data.to_csv(CSV_PATH, index=False)
+
+    # Page/figure/table counts stated in the new comments no longer need the PDF
+    data = backfill_from_comments(data, columns=COUNT_COLUMNS)
+    data.to_csv(CSV_PATH, index=False)
+
+
+if __name__ == "__main__":
+    main()
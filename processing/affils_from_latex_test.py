@@ -1,13 +1,36 @@
+import asyncio
+import csv
 import json
+import os
+import sys
 from typing import List, Optional
-from pydantic import BaseModel
-from ollama import chat
+from pydantic import BaseModel, ValidationError
+from ollama import AsyncClient
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "predictions"))
+from batch_scheduler import estimate_tokens
+from latex_condenser import CondenseReport, condense_latex
+from llm_cache import LLMCache, cache_key
+
 # --- CONFIGURATION ---
 INPUT_FILE = "papers_data.txt"
-OUTPUT_FILE = "extracted_affiliations.json"
+OUTPUT_FILE = "extracted_affiliations.jsonl"  # Append-only, one paper per line; re-runs skip papers already in it
 MODEL = "llama3.2" 
+MAX_LATEX_CHARS = 4000
+
+# Requests kept in flight. The Ollama server batches concurrent requests when started with
+# OLLAMA_NUM_PARALLEL >= CONCURRENCY (e.g. `OLLAMA_NUM_PARALLEL=4 ollama serve`).
+CONCURRENCY = 4
+OLLAMA_HOST = None  # None = default http://localhost:11434
+
+# Result cache keyed by (model, prompt version, normalized LaTeX), see predictions/llm_cache.py.
+# Bump PROMPT_VERSION whenever the prompt in extract_from_latex changes.
+LLM_CACHE_PATH = "llm_cache.jsonl"
+PROMPT_VERSION = "ollama-v1"
+
+# Set to the llm_queue.csv written by affiliation_router.py to only send papers the rule parsers missed
+LLM_QUEUE_CSV = None
 
 # --- DATA STRUCTURES ---
 class Author(BaseModel):
@@ -77,10 +100,40 @@ def paper_generator(file_path):
             
     print(f"\n[Info] Skipped {skipped_count} papers due to download errors.")
 
+# --- RESULT SINK ---
+def load_done_ids(path):
+    """Paper IDs (titles) already in the JSONL sink without an error; those are skipped."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Torn last line from an interrupted run
+            if "error" not in record:
+                done.add(record.get("paper_id"))
+    return done
+
+
+def append_result(sink, paper_id, data):
+    sink.write(json.dumps({"paper_id": paper_id, **data}, ensure_ascii=False) + "\n")
+    sink.flush()
+
 # --- LLM INFERENCE ---
-def extract_from_latex(title, latex_content):
-    # Truncate to first 4000 chars to save speed/memory
-    truncated_latex = latex_content[:4000]
+async def extract_from_latex(client, title, latex_content, cache=None, report=None):
+    # Keep only author/affiliation constructs, then truncate to save speed/memory
+    condensed, stats = condense_latex(latex_content)
+    truncated_latex = (condensed or latex_content)[:MAX_LATEX_CHARS]
+    if report is not None:
+        report.add(stats, estimate_tokens(truncated_latex))
+
+    key = cache_key(MODEL, PROMPT_VERSION, truncated_latex)
+    if cache is not None:
+        cached = cache.get(key, PaperData)
+        if cached is not None:
+            return {**cached.model_dump(), "title": title}
 
     prompt = f"""
     Analyze the following LaTeX header to extract Author Affiliations.
@@ -99,19 +152,51 @@ def extract_from_latex(title, latex_content):
     """
 
     try:
-        response = chat(
+        response = await client.chat(
             model=MODEL,
             messages=[{'role': 'user', 'content': prompt}],
             format=PaperData.model_json_schema(),
             options={'temperature': 0} 
         )
-        return json.loads(response.message.content)
+        data = json.loads(response.message.content)
     except Exception as e:
         return {"title": title, "authors": [], "error": str(e)}
 
+    # Only answers that fit the schema are cached
+    if cache is not None:
+        try:
+            cache.put(key, PaperData.model_validate(data))
+        except ValidationError:
+            pass
+    return data
+
 # --- MAIN LOOP ---
+async def run_papers(papers, sink, cache, report, total):
+    """CONCURRENCY workers pull from the shared paper iterator and append results as they finish."""
+    client = AsyncClient(host=OLLAMA_HOST)
+    pbar = tqdm(total=total)
+    counts = {"saved": 0, "errors": 0}
+
+    async def worker():
+        for title, latex in papers:
+            data = await extract_from_latex(client, title, latex, cache, report)
+            append_result(sink, title, data)
+            counts["errors" if "error" in data else "saved"] += 1
+            pbar.update(1)
+
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    pbar.close()
+    return counts
+
+
 def main():
-    results = []
+    cache = LLMCache(LLM_CACHE_PATH)
+    report = CondenseReport()
+    routed_titles = None
+    if LLM_QUEUE_CSV and os.path.exists(LLM_QUEUE_CSV):
+        with open(LLM_QUEUE_CSV, 'r', encoding='utf-8') as f:
+            routed_titles = {row['title'] for row in csv.DictReader(f)}
+        print(f"Only sending the {len(routed_titles)} papers routed to the LLM by {LLM_QUEUE_CSV}")
     
     # 1. Quick Count for Progress Bar
     print("Scanning file to count papers...")
@@ -122,26 +207,23 @@ def main():
                 total_entries += 1
     print(f"Found {total_entries} total entries (including errors).")
 
-    # 2. Process
-    generator = paper_generator(INPUT_FILE)
+    # 2. Resume: skip papers already extracted in an earlier run
+    done_ids = load_done_ids(OUTPUT_FILE)
+    if done_ids:
+        print(f"Resuming: {len(done_ids)} papers already in {OUTPUT_FILE}.")
+
+    # 3. Process (lazily; the generator also skips the download errors)
+    papers = ((title, latex) for title, latex in paper_generator(INPUT_FILE)
+              if title not in done_ids and (routed_titles is None or title in routed_titles))
     
     # We use total_entries for the bar, though it will finish 'early' 
-    # because the generator skips the error ones invisibly.
-    for title, latex in tqdm(generator, total=total_entries):
-        
-        data = extract_from_latex(title, latex)
-        results.append(data)
-
-        # Autosave every 50 VALID papers
-        if len(results) % 2 == 0:
-            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2)
-
-    # 3. Final Save
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2)
+    # because skipped papers never reach it.
+    with open(OUTPUT_FILE, 'a', encoding='utf-8') as sink:
+        counts = asyncio.run(run_papers(papers, sink, cache, report, total_entries - len(done_ids)))
         
-    print(f"Done. Processed {len(results)} valid papers.")
+    print(f"Done. Saved {counts['saved']} papers, {counts['errors']} errors (retried on the next run).")
+    print(f"Cache: {cache.stats()}")
+    print(f"Condenser: {report.summary()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,409 @@
+"""
+Keyword recommendation against the Unified Astronomy Thesaurus (uat.json) or any keyword list.
+
+A KeywordMatcher compiles its labels once: every label becomes a token set, and an inverted
+index maps each label's rarest token (the one fewest labels share) to the labels it belongs to.
+Matching a paper tokenizes its title and abstract once and only checks the labels filed under
+tokens the text actually contains, instead of re-tokenizing the whole vocabulary per paper:
+
+    matcher = uat_matcher()                              # parsed and compiled once per path
+    matcher.recommend(title, abstract, limit=3)          # sorted labels, as add_smart_keywords did
+    matcher.match_many(titles, abstracts, limit=3)       # a whole dataset
+
+The compiled matcher is stored in UAT_ARTIFACT (a pickle stamped with the SHA-256 of uat.json),
+so scripts and the labelling app load it instead of re-parsing 3.5 MB of JSON-LD. It is rebuilt
+only when uat.json changes (size/mtime first, then the hash), or explicitly with
+
+    python uat_keywords.py
+
+Two match modes, kept from the scripts they replace:
+- tokens (default): every token of the label appears somewhere in the text, in any order
+  (add_smart_keywords.py, data_labelling.py);
+- phrase=True: the label appears as a whole-word phrase (add_smart_keywords_2.py); the index
+  narrows the candidates and only those are checked with their precompiled regex.
+
+Ranking (ConceptRanker, needs scipy) scores UAT concepts instead of listing the first matches
+alphabetically. For a whole corpus at once, as sparse-matrix products:
+- a concept is a candidate when all tokens of one of its labels are in the title + abstract;
+- its score is the BM25 weight (idf and length normalisation over the corpus) of those tokens,
+  taken from its best complete label, so concepts with many synonyms are not favoured;
+- ancestors (skos:broader, transitively) of another candidate of the same paper are dropped,
+  so "Bondi accretion" is kept and "Accretion" is not;
+- the top k per paper are read off the score matrix, ties broken alphabetically.
+
+    uat_ranker().rank_many(titles, abstracts, k=3)      # preferred labels, best first
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# ========================
+# CONFIG
+# ========================
+
+UAT_JSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uat.json')
+UAT_ARTIFACT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uat_keywords.pkl')
+ARTIFACT_VERSION = 2  # Bump whenever KeywordMatcher's or ConceptRanker's attributes change
+
+# Keys for labels in UAT (SKOS/RDF)
+LABEL_KEYS = [
+    "http://www.w3.org/2004/02/skos/core#prefLabel",
+    "http://www.w3.org/2004/02/skos/core#altLabel",
+    "http://www.w3.org/2000/01/rdf-schema#label",
+]
+
+PREF_LABEL = "http://www.w3.org/2004/02/skos/core#prefLabel"
+BROADER = "http://www.w3.org/2004/02/skos/core#broader"
+DEPRECATED = "http://www.w3.org/2002/07/owl#deprecated"
+
+TOKEN_RE = re.compile(r'\b\w+\b')
+
+# BM25 term saturation and length normalisation
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+# ========================
+# KEYWORD BANKS
+# ========================
+
+def read_uat(path=UAT_JSON):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _literals(properties, key):
+    return [item["value"] for item in properties.get(key, ())
+            if isinstance(item, dict) and item.get("type") == "literal" and item.get("value")]
+
+
+def load_uat_labels(path=UAT_JSON, data=None):
+    """Every literal label (preferred, alternative, rdfs) of the thesaurus, sorted."""
+    data = read_uat(path) if data is None else data
+    keywords = set()
+    for properties in data.values():
+        for key in LABEL_KEYS:
+            for item in properties.get(key, ()):
+                if isinstance(item, dict) and item.get("type") == "literal" and item.get("value"):
+                    keywords.add(item["value"])
+    return sorted(keywords)
+
+
+def load_uat_concepts(path=UAT_JSON, data=None):
+    """{uri: (preferred label, all labels, broader uris)} of the concepts that are not deprecated."""
+    data = read_uat(path) if data is None else data
+    concepts = {}
+    for uri, properties in data.items():
+        pref = _literals(properties, PREF_LABEL)
+        if not pref or any(item.get("value") in (True, "true") for item in properties.get(DEPRECATED, ())):
+            continue
+        labels = list(dict.fromkeys(label for key in LABEL_KEYS for label in _literals(properties, key)))
+        broader = [item["value"] for item in properties.get(BROADER, ()) if item.get("type") == "uri"]
+        concepts[uri] = (pref[0], labels, broader)
+    return concepts
+
+
+def load_keyword_list(path):
+    """One keyword per line (e.g. top_500_keywords.dat), sorted and de-duplicated."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return sorted({line.strip() for line in f if line.strip()})
+
+
+# ========================
+# MATCHER
+# ========================
+
+class KeywordMatcher:
+    def __init__(self, labels):
+        self.labels = []
+        self.label_tokens = []
+        for label in labels:
+            tokens = frozenset(TOKEN_RE.findall(label.lower()))
+            if tokens:
+                self.labels.append(label)
+                self.label_tokens.append(tokens)
+
+        # Each label is filed under its rarest token: a text without it cannot contain the label
+        frequency = Counter(token for tokens in self.label_tokens for token in tokens)
+        self.index = {}
+        for i, tokens in enumerate(self.label_tokens):
+            rarest = min(tokens, key=lambda token: (frequency[token], token))
+            self.index.setdefault(rarest, []).append(i)
+        self._phrases = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_phrases'] = {}  # Phrase regexes are compiled lazily again after loading
+        return state
+
+    def _phrase_re(self, i):
+        pattern = self._phrases.get(i)
+        if pattern is None:
+            pattern = self._phrases[i] = re.compile(r'\b' + re.escape(self.labels[i].lower()) + r'\b')
+        return pattern
+
+    def match(self, text, phrase=False):
+        """Sorted labels found in text (all tokens present, or the whole phrase when phrase)."""
+        text = str(text).lower()
+        text_tokens = set(TOKEN_RE.findall(text))
+        found = set()
+        for token in text_tokens & self.index.keys():
+            for i in self.index[token]:
+                if self.label_tokens[i] <= text_tokens and (not phrase or self._phrase_re(i).search(text)):
+                    found.add(self.labels[i])
+        return sorted(found)
+
+    def recommend(self, title, abstract, limit=None, phrase=False):
+        """Labels matching the title and abstract, alphabetically, at most limit of them."""
+        return self.match(f"{str(title)} {str(abstract)}", phrase=phrase)[:limit]
+
+    def match_many(self, titles, abstracts, limit=None, phrase=False):
+        return [self.recommend(title, abstract, limit, phrase) for title, abstract in zip(titles, abstracts)]
+
+
+class ConceptRanker:
+    def __init__(self, concepts):
+        """concepts: {uri: (preferred label, labels, broader uris)}, as load_uat_concepts returns."""
+        uris = sorted(concepts, key=lambda uri: concepts[uri][0])
+        position = {uri: i for i, uri in enumerate(uris)}
+        self.concepts = [concepts[uri][0] for uri in uris]
+
+        # Transitive skos:broader closure of every concept
+        parents = [[position[b] for b in concepts[uri][2] if b in position] for uri in uris]
+        ancestors = {}
+
+        def collect(i, seen):
+            if i not in ancestors:
+                found = set()
+                for parent in parents[i]:
+                    if parent not in seen:
+                        found.add(parent)
+                        found |= collect(parent, seen | {parent})
+                ancestors[i] = found
+            return ancestors[i]
+
+        self.ancestors = [sorted(collect(i, {i})) for i in range(len(uris))]
+
+        # Every label of every concept, as sorted token lists over one vocabulary
+        self.label_tokens, self.label_concept = [], []
+        for i, uri in enumerate(uris):
+            for label in concepts[uri][1]:
+                tokens = sorted(set(TOKEN_RE.findall(label.lower())))
+                if tokens:
+                    self.label_tokens.append(tokens)
+                    self.label_concept.append(i)
+        self.vocabulary = {token: j for j, token in enumerate(sorted({t for tokens in self.label_tokens for t in tokens}))}
+        self._matrices = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_matrices'] = None  # Sparse matrices are rebuilt on first use after loading
+        return state
+
+    def matrices(self):
+        """(labels x vocabulary, label lengths, concept of every label, concepts x ancestors)."""
+        if self._matrices is None:
+            if sparse is None:
+                raise ImportError("Keyword ranking needs scipy (pip install scipy)")
+            rows = [i for i, tokens in enumerate(self.label_tokens) for _ in tokens]
+            cols = [self.vocabulary[t] for tokens in self.label_tokens for t in tokens]
+            labels = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                       shape=(len(self.label_tokens), len(self.vocabulary)))
+            lengths = np.array([len(tokens) for tokens in self.label_tokens], dtype=float)
+            label_concepts = np.array(self.label_concept, dtype=np.int64)
+            rows = [i for i, found in enumerate(self.ancestors) for _ in found]
+            cols = [a for found in self.ancestors for a in found]
+            ancestors = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                                          shape=(len(self.concepts), len(self.concepts)))
+            self._matrices = labels, lengths, label_concepts, ancestors
+        return self._matrices
+
+    def _term_matrix(self, texts):
+        """Papers x vocabulary term counts, and the token length of every paper."""
+        rows, cols, counts, lengths = [], [], [], []
+        for i, text in enumerate(texts):
+            tokens = TOKEN_RE.findall(str(text).lower())
+            lengths.append(len(tokens))
+            for token, count in Counter(t for t in tokens if t in self.vocabulary).items():
+                rows.append(i)
+                cols.append(self.vocabulary[token])
+                counts.append(count)
+        tf = sparse.csr_matrix((np.array(counts, dtype=float), (rows, cols)), shape=(len(lengths), len(self.vocabulary)))
+        return tf, np.array(lengths, dtype=float)
+
+    def score(self, texts):
+        """Papers x concepts CSR matrix of BM25 scores, ancestors of other candidates removed."""
+        labels, label_lengths, label_concepts, ancestors = self.matrices()
+        tf, lengths = self._term_matrix(texts)
+        n = tf.shape[0]
+        if n == 0 or tf.nnz == 0:
+            return sparse.csr_matrix((n, len(self.concepts)))
+
+        # BM25 weight of every (paper, token) present
+        df = np.bincount(tf.indices, minlength=tf.shape[1])
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        paper = np.repeat(np.arange(n), np.diff(tf.indptr))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[paper] / max(lengths.mean(), 1.0))
+        weights = tf.copy()
+        weights.data = idf[tf.indices] * tf.data * (BM25_K1 + 1) / (tf.data + norm)
+
+        # Labels whose tokens are all present, scored by the sum of their token weights
+        present = tf.copy()
+        present.data[:] = 1
+        complete = (present @ labels.T).tocsr()
+        complete.data = (complete.data == label_lengths[complete.indices]).astype(float)
+        complete.eliminate_zeros()
+        label_scores = (weights @ labels.T).multiply(complete).tocoo()
+
+        # A concept scores as its best label: synonyms sharing tokens must not add up
+        keys = label_scores.row.astype(np.int64) * len(self.concepts) + label_concepts[label_scores.col]
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else keys
+        best = np.maximum.reduceat(label_scores.data[order], starts) if len(keys) else label_scores.data
+        concept_scores = sparse.csr_matrix((best, np.divmod(keys[starts], len(self.concepts))),
+                                           shape=(n, len(self.concepts)))
+
+        # Drop every concept that is an ancestor of another candidate of the same paper
+        candidates = concept_scores.copy()
+        candidates.data[:] = 1
+        covered = (candidates @ ancestors).tocsr()
+        covered.data[:] = 1
+        concept_scores = (concept_scores - concept_scores.multiply(covered)).tocsr()
+        concept_scores.eliminate_zeros()
+        return concept_scores
+
+    def top_k(self, scores, k=3):
+        """Preferred labels of the k best concepts of every row of scores, best first."""
+        scores = scores.tocoo()
+        order = np.lexsort((scores.col, -scores.data, scores.row))
+        rows, cols = scores.row[order], scores.col[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < k
+        ranked = [[] for _ in range(scores.shape[0])]
+        for row, col in zip(rows[keep], cols[keep]):
+            ranked[row].append(self.concepts[col])
+        return ranked
+
+    def rank_many(self, titles, abstracts, k=3):
+        """Top k concepts of every paper, scored against the whole batch as the corpus."""
+        texts = [f"{str(title)} {str(abstract)}" for title, abstract in zip(titles, abstracts)]
+        return self.top_k(self.score(texts), k)
+
+
+# ========================
+# COMPILED ARTIFACT
+# ========================
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _write_artifact(artifact, payload):
+    tmp_path = f"{artifact}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, artifact)
+
+
+def build_artifact(path=UAT_JSON, artifact=UAT_ARTIFACT):
+    """Compiles uat.json (matcher and ranker) and stores it, stamped with the source hash, in artifact."""
+    data = read_uat(path)
+    payload = {'version': ARTIFACT_VERSION, 'sha256': file_digest(path), 'stamp': _source_stamp(path),
+               'matcher': KeywordMatcher(load_uat_labels(data=data)),
+               'ranker': ConceptRanker(load_uat_concepts(data=data))}
+    try:
+        _write_artifact(artifact, payload)
+    except OSError as e:
+        print(f"Could not write {artifact}: {e}")
+    return payload
+
+
+def load_artifact(path=UAT_JSON, artifact=UAT_ARTIFACT):
+    """The stored payload if it was compiled from the current uat.json, else None."""
+    try:
+        with open(artifact, 'rb') as f:
+            payload = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+    if not isinstance(payload, dict) or payload.get('version') != ARTIFACT_VERSION:
+        return None
+
+    stamp = _source_stamp(path)
+    if payload.get('stamp') == stamp:
+        return payload
+    if payload.get('sha256') != file_digest(path):
+        return None
+    # Same content, touched file: refresh the stamp so the next load skips hashing
+    payload['stamp'] = stamp
+    try:
+        _write_artifact(artifact, payload)
+    except OSError:
+        pass
+    return payload
+
+
+@lru_cache(maxsize=None)
+def compiled_uat(path=UAT_JSON, artifact=UAT_ARTIFACT):
+    """The stored artifact, rebuilt only when uat.json changed."""
+    return load_artifact(path, artifact) or build_artifact(path, artifact)
+
+
+def uat_matcher(path=UAT_JSON, artifact=UAT_ARTIFACT):
+    """Matcher over every uat.json label."""
+    return compiled_uat(path, artifact)['matcher']
+
+
+def uat_ranker(path=UAT_JSON, artifact=UAT_ARTIFACT):
+    """BM25 / hierarchy ranker over the uat.json concepts."""
+    return compiled_uat(path, artifact)['ranker']
+
+
+@lru_cache(maxsize=None)
+def keyword_list_matcher(path):
+    """Matcher over a one-keyword-per-line file, compiled once per path."""
+    return KeywordMatcher(load_keyword_list(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile uat.json into the keyword matcher artifact")
+    parser.add_argument('--uat', default=UAT_JSON)
+    parser.add_argument('--artifact', default=UAT_ARTIFACT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    payload = build_artifact(args.uat, args.artifact)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    load_artifact(args.uat, args.artifact)
+    loaded = time.perf_counter() - start
+    matcher, ranker = payload['matcher'], payload['ranker']
+    print(f"{len(matcher.labels)} labels, {len(matcher.index)} index tokens, {len(ranker.concepts)} concepts "
+          f"-> {args.artifact} (build {built:.3f}s, load {loaded:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()